@@ -1,11 +1,14 @@
 from flask import Flask, jsonify
 from routes import routes
 import os
-import os
 import json
-from dotenv import load_dotenv
+import time
 from lambda_adapter import lambda_response
+from logs import obter_log, iniciar_requisicao, encerrar_requisicao, resumo_evento
+from metricas import instrumentar
+from dotenv import load_dotenv
 
+# Também no Lambda: o .env empacotado com a função pode trazer SECRET_KEY e outras
 load_dotenv()
 
 # Configurar SECRET_KEY do stage variables do API Gateway, se existir
@@ -15,6 +18,7 @@ if 'AWS_LAMBDA_STAGE_VARIABLES' in os.environ:
 
 
 app = Flask(__name__)
+log = obter_log('lambda')
 
 # Configurações
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key-for-development')
@@ -22,6 +26,9 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key-for-deve
 # Registra as rotas do blueprint com prefixo /api
 app.register_blueprint(routes, url_prefix='/api')
 
+# Tempo por rota e por chamada AWS (EMF no Lambda, cascata com PONTO_METRICAS=local)
+instrumentar(app)
+
 # Debug: listar todas as rotas registradas
 @app.route('/debug/routes', methods=['GET'])
 def list_routes():
@@ -69,27 +76,24 @@ def internal_error(error):
 
 def lambda_handler(event, context):
     """
-    Handler melhorado para debug detalhado do API Gateway
+    Handler do API Gateway: abre o contexto de log da requisição e repassa ao Flask
     """
-    print("=== LAMBDA HANDLER DEBUG COMPLETO ===")
-    print(f"Event completo: {json.dumps(event, indent=2, default=str)}")
-    print(f"Context: {context}")
-    print("=====================================")
-    
-    # Debug específico dos campos importantes
     http_method = event.get('httpMethod', 'UNKNOWN')
     path = event.get('path', 'UNKNOWN')
+    token = iniciar_requisicao(http_method, path, getattr(context, 'aws_request_id', None))
+    try:
+        # Nomes dos headers e tamanho do corpo; o corpo só com PONTO_LOG_CORPO=1
+        if log.ativo('DEBUG'):
+            log.debug('requisicao', **resumo_evento(event))
+        return _processar(event, context, http_method, path)
+    finally:
+        encerrar_requisicao(token)
+
+def _processar(event, context, http_method, path):
     resource = event.get('resource', 'UNKNOWN')
     path_parameters = event.get('pathParameters', {})
     query_parameters = event.get('queryStringParameters', {})
-    headers = event.get('headers', {})
-    
-    print(f"HTTP Method: {http_method}")
-    print(f"Path: {path}")
-    print(f"Resource: {resource}")
-    print(f"Path Parameters: {path_parameters}")
-    print(f"Query Parameters: {query_parameters}")
-    print(f"Headers: {headers}")
+    headers = event.get('headers') or {}
     
     # Teste de rota direta para bypass do Flask (debug)
     if path in ['/api/debug-lambda', '/debug-lambda']:
@@ -144,14 +148,14 @@ def lambda_handler(event, context):
     
     # Usar o adapter para processar via Flask
     try:
-        print("Tentando processar via lambda_response...")
+        inicio = time.perf_counter()
         result = lambda_response(app, event, context)
-        print(f"Resultado lambda_response: Status={result.get('statusCode')}")
+        log.info('resposta', status=result.get('statusCode'),
+                 ms=round((time.perf_counter() - inicio) * 1000, 1))
         return result
     except Exception as e:
-        print(f"ERRO no lambda_response: {str(e)}")
+        log.erro('lambda_response', erro=e)
         import traceback
-        traceback.print_exc()
         
         # Retornar erro detalhado
         return {
@@ -1,7 +1,9 @@
-import jwt
 import hashlib
 from flask import current_app
 import os
+from logs import obter_log
+
+log = obter_log('auth')
 
 # Obter SECRET_KEY de forma mais robusta
 def get_secret_key():
@@ -13,14 +15,14 @@ def get_secret_key():
     # 1. Variável de ambiente
     secret_key = os.environ.get('SECRET_KEY')
     if secret_key:
-        print(f"[DEBUG] SECRET_KEY obtido via os.environ: {type(secret_key)}")
+        log.debug('secret_key', fonte='os.environ')
     
     # 2. Flask app config
     if not secret_key:
         try:
             secret_key = current_app.config.get('SECRET_KEY')
             if secret_key:
-                print(f"[DEBUG] SECRET_KEY obtido via Flask config: {type(secret_key)}")
+                log.debug('secret_key', fonte='flask_config')
         except RuntimeError:
             pass  # Fora do contexto da aplicação
     
@@ -33,45 +35,50 @@ def get_secret_key():
                 stage_vars = json.loads(context)
                 secret_key = stage_vars.get('SECRET_KEY')
                 if secret_key:
-                    print(f"[DEBUG] SECRET_KEY obtido via stage variables: {type(secret_key)}")
+                    log.debug('secret_key', fonte='stage_variables')
         except:
             pass
     
     # 4. Fallback hardcoded (para desenvolvimento)
     if not secret_key:
         secret_key = "frichimibu"  # Seu valor padrão
-        print("[DEBUG] Usando SECRET_KEY hardcoded")
+        log.aviso('secret_key', fonte='padrao_desenvolvimento')
     
     # Garantir que é string
     if secret_key is not None:
         secret_key = str(secret_key)
-        print(f"[DEBUG] SECRET_KEY final: tipo={type(secret_key)}, tamanho={len(secret_key)}")
     else:
         raise ValueError("SECRET_KEY não encontrado em nenhuma fonte")
     
     return secret_key
 
-def verify_token(token):
-    """Verifica e decodifica o token JWT"""
+def verify_token(token, aceitar_quiosque=False):
+    """
+    Verifica e decodifica o token JWT. Tokens de quiosque (só batem ponto)
+    valem apenas onde aceitar_quiosque=True.
+    """
+    import jwt  # Importado no primeiro token, não junto com o handler
     try:
-        print(f"[DEBUG] Verificando token: {token[:20]}...")
-        
         # Obter SECRET_KEY de forma segura
         secret_key = get_secret_key()
         
         # Decodificar o token
         payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        print(f"[DEBUG] Token decodificado com sucesso: {payload}")
+        if payload.get('quiosque') and not aceitar_quiosque:
+            log.debug('token_de_quiosque', empresa_id=payload.get('empresa_id'))
+            return None
+        # Só os ids: o payload e o token não vão para o log
+        log.debug('token_valido', usuario_id=payload.get('usuario_id'), empresa_id=payload.get('empresa_id'))
         return payload
         
     except jwt.ExpiredSignatureError:
-        print("[DEBUG] Token expirado")
+        log.debug('token_expirado')
         return None
     except jwt.InvalidTokenError as e:
-        print(f"[DEBUG] Token inválido: {str(e)}")
+        log.debug('token_invalido', erro=str(e))
         return None
     except Exception as e:
-        print(f"[DEBUG] Erro geral ao verificar token: {str(e)}")
+        log.erro('verificar_token', erro=e)
         return None
 
 def hash_password(password):
@@ -84,15 +91,10 @@ def verify_password(password, password_hash):
 
 # Função auxiliar para debug no Lambda
 def debug_environment():
-    """Função para debugar o ambiente Lambda"""
-    print("=== DEBUG ENVIRONMENT ===")
-    print(f"AWS_LAMBDA_STAGE_VARIABLES: {os.environ.get('AWS_LAMBDA_STAGE_VARIABLES')}")
-    print(f"SECRET_KEY (env): {os.environ.get('SECRET_KEY')}")
-    
-    # Listar todas as variáveis de ambiente que contenham 'SECRET'
-    for key, value in os.environ.items():
-        if 'SECRET' in key.upper():
-            print(f"{key}: {value}")
-    
-    print("=========================")
+    """Função para debugar o ambiente Lambda (só os nomes; valores secretos não vão para o log)"""
+    log.debug(
+        'ambiente',
+        stage_variables='AWS_LAMBDA_STAGE_VARIABLES' in os.environ,
+        secretas=[key for key in os.environ if 'SECRET' in key.upper()]
+    )
     return True
\ No newline at end of file
@@ -1,35 +1,501 @@
-import boto3
 import os
 import uuid
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit, unquote
+from boto3.dynamodb.conditions import Key, Attr
+from regras_ponto import ler_data_hora, estado_do_registro, chave_horas_diarias, calcular_horas_dias, dias_vizinhos
+from clientes_aws import SobDemanda, cliente, recurso, tabela
+from logs import obter_log
+from repositorios import ConflitoPonto
 
-REGIAO = "us-east-1"
 BUCKET = "ponto-eletronico-fotos-us"
+# Coleção global antiga; cada empresa tem a sua (colecao_empresa), criada no primeiro cadastro
 COLLECTION = "FuncionariosCollection"
+# Enquanto houver faces não migradas (migrar_colecoes.py), também procura na coleção global
+USAR_COLECAO_GLOBAL = os.environ.get('PONTO_COLECAO_GLOBAL', '1') == '1'
 TABELA_FUNC = "Funcionarios"
 TABELA_REG = "RegistrosPonto"
 TABELA_USUARIO_EMPRESA = "UsuarioEmpresa"
+TABELA_ESTADO_PONTO = "EstadoPonto"
+# Agregado diário: partição empresa_id, ordenação "AAAA-MM-DD#funcionario_id"
+TABELA_HORAS_DIARIAS = "HorasDiarias"
+# Contador por empresa, incrementado a cada alteração no cadastro de funcionários
+TABELA_VERSOES_EMPRESA = "VersoesEmpresa"
+# Vetores de face do comparador_faces: partição empresa_id, ordenação funcionario_id
+TABELA_EMBEDDINGS = "EmbeddingsFaces"
 
-s3 = boto3.client('s3', region_name=REGIAO)
-rekognition = boto3.client('rekognition', region_name=REGIAO)
-dynamodb = boto3.resource('dynamodb', region_name=REGIAO)
-tabela_funcionarios = dynamodb.Table(TABELA_FUNC)
-tabela_registros = dynamodb.Table(TABELA_REG)
-tabela_usuarioempresa = dynamodb.Table(TABELA_USUARIO_EMPRESA)
+# GSI de RegistrosPonto: partição empresa_id, ordenação data_hora (ver configurar_dynamodb.py)
+INDICE_REGISTROS_EMPRESA = "empresa_id-data_hora-index"
+# GSI de RegistrosPonto: partição registro_id, para localizar a chave (funcionario_id, data_hora)
+INDICE_REGISTROS_ID = "registro_id-index"
+# GSI de Funcionarios: partição empresa_id
+INDICE_FUNCIONARIOS_EMPRESA = "empresa_id-index"
+# Fila SQS das fotos de registro de ponto (evidencias.py); sem ela a fila é local
+FILA_EVIDENCIAS = os.environ.get('PONTO_FILA_EVIDENCIAS')
 
-def enviar_s3(caminho, nome_arquivo):
-    s3.upload_file(caminho, BUCKET, nome_arquivo)
+log = obter_log('aws')
+
+# Criados no primeiro uso e compartilhados (ver clientes_aws)
+s3 = SobDemanda(lambda: cliente('s3'))
+rekognition = SobDemanda(lambda: cliente('rekognition'))
+sqs = SobDemanda(lambda: cliente('sqs'))
+dynamodb = SobDemanda(lambda: recurso('dynamodb'))
+tabela_funcionarios = SobDemanda(lambda: tabela(TABELA_FUNC))
+tabela_registros = SobDemanda(lambda: tabela(TABELA_REG))
+tabela_usuarioempresa = SobDemanda(lambda: tabela(TABELA_USUARIO_EMPRESA))
+tabela_estado_ponto = SobDemanda(lambda: tabela(TABELA_ESTADO_PONTO))
+tabela_horas_diarias = SobDemanda(lambda: tabela(TABELA_HORAS_DIARIAS))
+tabela_versoes_empresa = SobDemanda(lambda: tabela(TABELA_VERSOES_EMPRESA))
+tabela_embeddings = SobDemanda(lambda: tabela(TABELA_EMBEDDINGS))
+
+def ler_imagem(imagem):
+    """Bytes da imagem, recebida como bytes ou como buffer (upload, BytesIO)"""
+    if hasattr(imagem, 'read'):
+        return imagem.read()
+    return bytes(imagem)
+
+def enviar_s3(imagem, nome_arquivo):
+    s3.put_object(Bucket=BUCKET, Key=nome_arquivo, Body=ler_imagem(imagem), ContentType='image/jpeg')
     return f"https://{BUCKET}.s3.amazonaws.com/{nome_arquivo}"
 
-def reconhecer_funcionario(caminho_foto):
+def chave_s3(foto_url):
+    """
+    Chave no BUCKET de uma URL de foto, em qualquer forma que o S3 devolve:
+    https://BUCKET.s3.amazonaws.com/k, https://BUCKET.s3.<região>.amazonaws.com/k,
+    https://BUCKET.s3-<região>.amazonaws.com/k ou https://s3.<região>.amazonaws.com/BUCKET/k.
+    None se a URL não for do BUCKET.
+    """
+    partes = urlsplit(foto_url or '')
+    host = partes.netloc.lower()
+    caminho = unquote(partes.path).lstrip('/')
+    if not host.endswith('.amazonaws.com'):
+        return None
+    if host.startswith(f"{BUCKET}.s3.") or host.startswith(f"{BUCKET}.s3-"):
+        return caminho or None
+    if host.startswith('s3.') or host.startswith('s3-'):
+        bucket, _, chave = caminho.partition('/')
+        return chave if bucket == BUCKET and chave else None
+    return None
+
+def baixar_s3(foto_url):
+    """Bytes de uma foto do BUCKET a partir da URL (ValueError se a URL for de outro lugar)"""
+    nome_arquivo = chave_s3(foto_url)
+    if not nome_arquivo:
+        raise ValueError(f"Foto fora do bucket {BUCKET}: {foto_url}")
+    return s3.get_object(Bucket=BUCKET, Key=nome_arquivo)['Body'].read()
+
+def colecao_empresa(empresa_id):
+    """Coleção do Rekognition da empresa (ids aceitam só [a-zA-Z0-9_.-])"""
+    seguro = ''.join(c if c.isalnum() or c in '_.-' else '_' for c in empresa_id)
+    return f"{COLLECTION}-{seguro}"
+
+def reconhecer_funcionario(imagem, colecao=COLLECTION):
     try:
         response = rekognition.search_faces_by_image(
-            CollectionId=COLLECTION,
-            Image={'Bytes': open(caminho_foto, 'rb').read()},
+            CollectionId=colecao,
+            Image={'Bytes': ler_imagem(imagem)},
             MaxFaces=1,
             FaceMatchThreshold=85
         )
         return response['FaceMatches'][0]['Face']['ExternalImageId'] if response['FaceMatches'] else None
+    except rekognition.exceptions.ResourceNotFoundException:
+        return None  # Empresa ainda sem nenhum cadastro
     except Exception as e:
-        print(f"Erro no reconhecimento: {str(e)}")
+        log.erro('reconhecer_face', erro=e, colecao=colecao)
         return None
+
+def consultar_tabela(tabela, **kwargs):
+    """Executa um Query seguindo LastEvaluatedKey e devolve os itens sob demanda"""
+    while True:
+        response = tabela.query(**kwargs)
+        for item in response.get('Items', []):
+            yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def paginar(operacao, atributos_chave, limite, chave_inicial=None, **kwargs):
+    """
+    Lê até `limite` itens de um scan/query a partir de chave_inicial.
+
+    Retorna (itens, proxima_chave). Com FilterExpression uma página pode vir
+    incompleta, então continua lendo; se a última leitura trouxer itens a mais,
+    a próxima chave passa a ser a do último item devolvido (atributos_chave
+    devem incluir as chaves da tabela e, em GSI, as do índice).
+    """
+    itens = []
+    if chave_inicial:
+        kwargs['ExclusiveStartKey'] = chave_inicial
+    while True:
+        response = operacao(Limit=limite, **kwargs)
+        pagina = response.get('Items', [])
+        falta = limite - len(itens)
+        if len(pagina) > falta:
+            itens.extend(pagina[:falta])
+            return itens, {atributo: itens[-1][atributo] for atributo in atributos_chave}
+        itens.extend(pagina)
+        if 'LastEvaluatedKey' not in response:
+            return itens, None
+        if len(itens) == limite:
+            return itens, response['LastEvaluatedKey']
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def varrer_tabela(tabela, segmentos=1, **kwargs):
+    """
+    Scan completo seguindo LastEvaluatedKey, devolvendo os itens sob demanda.
+
+    Com segmentos > 1 usa o scan paralelo do DynamoDB (Segment/TotalSegments),
+    um segmento por thread; os itens chegam na ordem em que as páginas terminam.
+    """
+    if segmentos <= 1:
+        while True:
+            response = tabela.scan(**kwargs)
+            for item in response.get('Items', []):
+                yield item
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return
+
+    # O client do resource é thread-safe e já converte conditions/tipos do DynamoDB
+    cliente = tabela.meta.client
+    paginas = queue.Queue(maxsize=segmentos * 2)
+    cancelado = threading.Event()
+    fim_segmento = object()
+
+    def entregar(valor):
+        while not cancelado.is_set():
+            try:
+                paginas.put(valor, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def varrer_segmento(segmento):
+        params = dict(kwargs, TableName=tabela.name, Segment=segmento, TotalSegments=segmentos)
+        try:
+            while not cancelado.is_set():
+                response = cliente.scan(**params)
+                if not entregar(response.get('Items', [])):
+                    return
+                if 'LastEvaluatedKey' not in response:
+                    break
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e:
+            entregar(e)
+        finally:
+            entregar(fim_segmento)
+
+    executor = ThreadPoolExecutor(max_workers=segmentos)
+    try:
+        for segmento in range(segmentos):
+            executor.submit(varrer_segmento, segmento)
+        ativos = segmentos
+        while ativos:
+            pagina = paginas.get()
+            if pagina is fim_segmento:
+                ativos -= 1
+            elif isinstance(pagina, Exception):
+                raise pagina
+            else:
+                yield from pagina
+    finally:
+        # Consumidor parou antes do fim (break/erro): libera as threads bloqueadas
+        cancelado.set()
+        executor.shutdown(wait=False)
+
+def consultar_funcionarios_empresa(empresa_id, nome_contem=None):
+    """Funcionários da empresa via Query no GSI empresa_id-index"""
+    kwargs = {
+        'IndexName': INDICE_FUNCIONARIOS_EMPRESA,
+        'KeyConditionExpression': Key('empresa_id').eq(empresa_id)
+    }
+    if nome_contem:
+        kwargs['FilterExpression'] = Attr('nome').contains(nome_contem)
+    return consultar_tabela(tabela_funcionarios, **kwargs)
+
+def contar_funcionarios_empresa(empresa_id):
+    """Quantidade de funcionários da empresa (Query com Select=COUNT no GSI, sem trazer os itens)"""
+    kwargs = {
+        'IndexName': INDICE_FUNCIONARIOS_EMPRESA,
+        'KeyConditionExpression': Key('empresa_id').eq(empresa_id),
+        'Select': 'COUNT'
+    }
+    total = 0
+    while True:
+        response = tabela_funcionarios.query(**kwargs)
+        total += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return total
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def obter_embeddings(empresa_id, funcionario_ids):
+    """Vetores de alguns funcionários da empresa (BatchGetItem, 100 chaves por chamada)"""
+    funcionario_ids = list(funcionario_ids)
+    for inicio in range(0, len(funcionario_ids), 100):
+        pedido = {TABELA_EMBEDDINGS: {'Keys': [
+            {'empresa_id': empresa_id, 'funcionario_id': funcionario_id}
+            for funcionario_id in funcionario_ids[inicio:inicio + 100]
+        ]}}
+        while pedido:
+            response = dynamodb.batch_get_item(RequestItems=pedido)
+            yield from response['Responses'].get(TABELA_EMBEDDINGS, [])
+            pedido = response.get('UnprocessedKeys')
+
+def obter_versao_empresa(empresa_id):
+    """
+    (versão, alterado_em) do cadastro de funcionários da empresa: (0, 0) se
+    nunca alterado; alterado_em em segundos desde a época
+    """
+    response = tabela_versoes_empresa.get_item(
+        Key={'empresa_id': empresa_id},
+        ProjectionExpression='versao, alterado_em',
+        ConsistentRead=True
+    )
+    item = response.get('Item', {})
+    return int(item.get('versao', 0)), int(item.get('alterado_em', 0)) / 1000
+
+def incrementar_versao_empresa(empresa_id):
+    response = tabela_versoes_empresa.update_item(
+        Key={'empresa_id': empresa_id},
+        UpdateExpression='ADD versao :um SET alterado_em = :agora',
+        ExpressionAttributeValues={':um': 1, ':agora': int(time.time() * 1000)},
+        ReturnValues='UPDATED_NEW'
+    )
+    return int(response['Attributes']['versao'])
+
+def _condicao_periodo(data_inicio, data_fim):
+    if data_inicio and data_fim:
+        return Key('data_hora').between(f"{data_inicio} 00:00:00", f"{data_fim} 23:59:59")
+    return None
+
+def consultar_registros_empresa(empresa_id, data_inicio=None, data_fim=None):
+    """Registros de uma empresa em ordem de data_hora, via GSI empresa_id + data_hora"""
+    condicao = Key('empresa_id').eq(empresa_id)
+    periodo = _condicao_periodo(data_inicio, data_fim)
+    if periodo is not None:
+        condicao = condicao & periodo
+    return consultar_tabela(
+        tabela_registros,
+        IndexName=INDICE_REGISTROS_EMPRESA,
+        KeyConditionExpression=condicao
+    )
+
+def _condicao_registros_funcionario(funcionario_id, data_inicio, data_fim):
+    condicao = Key('funcionario_id').eq(funcionario_id)
+    periodo = _condicao_periodo(data_inicio, data_fim)
+    if periodo is not None:
+        condicao = condicao & periodo
+    return condicao
+
+def consultar_registros_funcionario(funcionario_id, data_inicio=None, data_fim=None):
+    """Registros de um funcionário em ordem de data_hora, pela chave primária da tabela"""
+    return consultar_tabela(
+        tabela_registros,
+        KeyConditionExpression=_condicao_registros_funcionario(funcionario_id, data_inicio, data_fim)
+    )
+
+def paginar_registros_funcionario(funcionario_id, limite, chave_inicial=None, data_inicio=None, data_fim=None):
+    """Uma página dos registros de um funcionário: (itens, proxima_chave)"""
+    return paginar(
+        tabela_registros.query,
+        ('funcionario_id', 'data_hora'),
+        limite,
+        chave_inicial,
+        KeyConditionExpression=_condicao_registros_funcionario(funcionario_id, data_inicio, data_fim)
+    )
+
+def obter_registro_por_id(registro_id):
+    """Localiza um registro pelo registro_id com um único Query no GSI registro_id-index"""
+    response = tabela_registros.query(
+        IndexName=INDICE_REGISTROS_ID,
+        KeyConditionExpression=Key('registro_id').eq(registro_id),
+        Limit=1
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+def vincular_foto_registro(registro, foto_url):
+    """Grava o foto_url no registro; False se ele foi excluído ou substituído"""
+    try:
+        tabela_registros.update_item(
+            Key={'funcionario_id': registro['funcionario_id'], 'data_hora': registro['data_hora']},
+            UpdateExpression='SET foto_url = :url',
+            ConditionExpression=Attr('registro_id').eq(registro['registro_id']),
+            ExpressionAttributeValues={':url': foto_url}
+        )
+    except tabela_registros.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+def obter_estado_ponto(funcionario_id):
+    """
+    Estado do último ponto do funcionário (EstadoPonto) em uma leitura.
+
+    Funcionários sem estado gravado (anteriores a esta tabela) têm o estado
+    reconstruído e gravado a partir do registro mais recente.
+    """
+    response = tabela_estado_ponto.get_item(Key={'funcionario_id': funcionario_id}, ConsistentRead=True)
+    if 'Item' in response:
+        return response['Item']
+    return recalcular_estado_ponto(funcionario_id)
+
+def gravar_registro_com_estado(registro, estado_anterior):
+    """
+    Grava o registro e o novo estado do funcionário numa única transação.
+
+    A condição sobre ultimo_registro_id impede que dois pontos simultâneos
+    partam do mesmo estado (ex.: duas 'entrada' seguidas); nesse caso levanta
+    ConflitoPonto e o chamador deve reler o estado.
+    """
+    if estado_anterior and 'ultimo_registro_id' in estado_anterior:
+        condicao = 'ultimo_registro_id = :anterior'
+        valores = {':anterior': estado_anterior['ultimo_registro_id']}
+    else:
+        condicao = 'attribute_not_exists(funcionario_id)'
+        valores = None
+
+    atualizacao = {
+        'TableName': TABELA_ESTADO_PONTO,
+        'Item': estado_do_registro(registro),
+        'ConditionExpression': condicao
+    }
+    if valores:
+        atualizacao['ExpressionAttributeValues'] = valores
+
+    itens = [
+        # Dois pontos no mesmo segundo teriam a mesma chave (funcionario_id, data_hora)
+        {'Put': {'TableName': TABELA_REG, 'Item': registro, 'ConditionExpression': 'attribute_not_exists(data_hora)'}},
+        {'Put': atualizacao}
+    ]
+    if registro.get('empresa_id'):
+        itens.append({'Update': _incremento_horas_diarias(registro, estado_anterior)})
+
+    cliente = tabela_registros.meta.client
+    try:
+        cliente.transact_write_items(TransactItems=itens)
+    except cliente.exceptions.TransactionCanceledException as e:
+        motivos = [motivo.get('Code') for motivo in e.response.get('CancellationReasons', [])]
+        if 'ConditionalCheckFailed' in motivos:
+            raise ConflitoPonto(registro['funcionario_id'])
+        raise
+
+def atualizar_estado_ponto(registro):
+    """Avança o estado se o registro (ex.: ponto manual) for mais recente que o atual"""
+    try:
+        tabela_estado_ponto.put_item(
+            Item=estado_do_registro(registro),
+            ConditionExpression='attribute_not_exists(funcionario_id) OR ultima_data_hora <= :data_hora',
+            ExpressionAttributeValues={':data_hora': registro['data_hora']}
+        )
+    except tabela_estado_ponto.meta.client.exceptions.ConditionalCheckFailedException:
+        pass  # Registro retroativo: o estado atual continua valendo
+
+def recalcular_estado_ponto(funcionario_id):
+    """Reconstrói o estado a partir do registro mais recente (após exclusões ou para backfill)"""
+    response = tabela_registros.query(
+        KeyConditionExpression=Key('funcionario_id').eq(funcionario_id),
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    estado = estado_do_registro(items[0]) if items else None
+    if estado:
+        tabela_estado_ponto.put_item(Item=estado)
+    else:
+        tabela_estado_ponto.delete_item(Key={'funcionario_id': funcionario_id})
+    return estado
+
+def ajustar_estado_apos_exclusao(registro):
+    """Se o registro excluído era o último do funcionário, volta o estado ao anterior"""
+    response = tabela_estado_ponto.get_item(Key={'funcionario_id': registro['funcionario_id']}, ConsistentRead=True)
+    estado = response.get('Item')
+    if estado and estado.get('ultimo_registro_id') == registro.get('registro_id'):
+        recalcular_estado_ponto(registro['funcionario_id'])
+
+def _incremento_horas_diarias(registro, estado_anterior):
+    """
+    Update transacional do agregado do dia para um ponto do quiosque.
+
+    Como o quiosque só registra 'saída' logo após a 'entrada' do mesmo dia,
+    a entrada a fechar é a ultima_data_hora do estado anterior.
+    """
+    data = registro['data_hora'][:10]
+    expressao = 'SET funcionario_id = :funcionario, #data = :data'
+    valores = {':funcionario': registro['funcionario_id'], ':data': data, ':um': 1}
+    incrementos = ['total_registros :um']
+
+    if registro['tipo'] == 'entrada':
+        expressao += ', entrada_aberta = :data_hora'
+        valores[':data_hora'] = registro['data_hora']
+        remocao = ''
+    else:
+        entrada = ler_data_hora(estado_anterior['ultima_data_hora']) if estado_anterior else None
+        saida = ler_data_hora(registro['data_hora'])
+        if entrada and saida:
+            incrementos.append('segundos_trabalhados :segundos')
+            valores[':segundos'] = int((saida - entrada).total_seconds())
+        remocao = ' REMOVE entrada_aberta'
+
+    return {
+        'TableName': TABELA_HORAS_DIARIAS,
+        'Key': chave_horas_diarias(registro['empresa_id'], registro['funcionario_id'], data),
+        'UpdateExpression': f"{expressao} ADD {', '.join(incrementos)}{remocao}",
+        'ExpressionAttributeNames': {'#data': 'data'},
+        'ExpressionAttributeValues': valores
+    }
+
+def recalcular_horas_diarias(empresa_id, funcionario_id, data):
+    """
+    Recalcula o agregado de um dia a partir dos registros brutos (ponto
+    manual, exclusão), e o dos dias vizinhos que tenham registros: um turno
+    que passa da meia-noite é dividido entre dois dias
+    """
+    # Dois dias de cada lado: o vizinho também precisa do registro anterior/seguinte a ele
+    periodo = dias_vizinhos(data, 2)
+    registros = [
+        reg for reg in consultar_tabela(
+            tabela_registros,
+            KeyConditionExpression=Key('funcionario_id').eq(funcionario_id) &
+                                   Key('data_hora').between(f"{periodo[0]} 00:00:00", f"{periodo[-1]} 23:59:59")
+        )
+        if reg.get('empresa_id') == empresa_id
+    ]
+    agregados = calcular_horas_dias(empresa_id, funcionario_id, registros, dias_vizinhos(data))
+    with tabela_horas_diarias.batch_writer(overwrite_by_pkeys=['empresa_id', 'dia_funcionario']) as lote:
+        for dia, item in agregados.items():
+            if item:
+                lote.put_item(Item=item)
+            elif dia == data:
+                lote.delete_item(Key=chave_horas_diarias(empresa_id, funcionario_id, data))
+
+def _condicao_horas_diarias(empresa_id, data_inicio, data_fim):
+    condicao = Key('empresa_id').eq(empresa_id)
+    if data_inicio and data_fim:
+        # '$' vem logo após '#': o limite cobre todos os funcionários do último dia
+        condicao = condicao & Key('dia_funcionario').between(f"{data_inicio}#", f"{data_fim}$")
+    return condicao
+
+def consultar_horas_diarias(empresa_id, data_inicio=None, data_fim=None):
+    """Agregados diários de uma empresa no período (todos, se o período não for informado)"""
+    return consultar_tabela(tabela_horas_diarias, KeyConditionExpression=_condicao_horas_diarias(empresa_id, data_inicio, data_fim))
+
+def paginar_horas_diarias(empresa_id, limite, chave_inicial=None, data_inicio=None, data_fim=None, funcionario_ids=None):
+    """Uma página dos agregados diários (ordem de dia e funcionário): (itens, proxima_chave)"""
+    kwargs = {'KeyConditionExpression': _condicao_horas_diarias(empresa_id, data_inicio, data_fim)}
+    if funcionario_ids is not None:
+        # IN aceita até 100 valores por vez
+        ids = sorted(funcionario_ids)
+        filtro = None
+        for inicio in range(0, len(ids), 100):
+            parte = Attr('funcionario_id').is_in(ids[inicio:inicio + 100])
+            filtro = parte if filtro is None else filtro | parte
+        if filtro is None:
+            return [], None
+        kwargs['FilterExpression'] = filtro
+    return paginar(tabela_horas_diarias.query, ('empresa_id', 'dia_funcionario'), limite, chave_inicial, **kwargs)
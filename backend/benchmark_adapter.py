@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do lambda_adapter: custo por requisição em µs
+
+Compara o Flask despachando a requisição com o environ já pronto com o
+mesmo app atrás de lambda_response, para uma resposta JSON pequena, um upload
+em base64 e um XLSX devolvido em base64. A diferença das medianas é o
+que o adaptador acrescenta a cada requisição.
+
+Uso:
+    python benchmark_adapter.py --repeticoes 20000 --tamanho-kb 200
+"""
+import argparse
+import base64
+import io
+import os
+import statistics
+import time
+
+from flask import Flask, Response, jsonify, request
+
+from lambda_adapter import lambda_response, montar_environ, montar_resposta
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+class Contexto:
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+def criar_app(planilha):
+    app = Flask(__name__)
+
+    @app.route('/api/json')
+    def responder_json():
+        return jsonify({'status': 'OK', 'funcionario': 'Benchmark', 'tipo': 'entrada'})
+
+    @app.route('/api/upload', methods=['POST'])
+    def receber_upload():
+        return jsonify({'bytes': len(request.get_data())})
+
+    @app.route('/api/xlsx')
+    def baixar_xlsx():
+        return Response(planilha, mimetype=TIPO_XLSX)
+
+    return app
+
+def evento(metodo, caminho, corpo=None):
+    return {
+        'httpMethod': metodo,
+        'path': caminho,
+        'headers': {
+            'Host': 'api.exemplo.com', 'Accept': '*/*', 'User-Agent': 'benchmark',
+            'Content-Type': 'application/octet-stream', 'X-Forwarded-For': '10.0.0.1',
+            'Authorization': 'Bearer ' + 'x' * 180
+        },
+        'queryStringParameters': {'empresa_id': 'benchmark', 'limit': '50'},
+        'multiValueQueryStringParameters': {'empresa_id': ['benchmark'], 'limit': ['50']},
+        'requestContext': {'identity': {'sourceIp': '10.0.0.1'}},
+        'body': base64.b64encode(corpo).decode('ascii') if corpo else None,
+        'isBase64Encoded': bool(corpo)
+    }
+
+def medir(chamada, repeticoes):
+    """Mediana e p95 em µs"""
+    for _ in range(min(200, repeticoes)):
+        chamada()  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter_ns()
+        chamada()
+        tempos.append((time.perf_counter_ns() - inicio) / 1000)
+    tempos.sort()
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por requisição do lambda_adapter")
+    parser.add_argument('--repeticoes', type=int, default=5000)
+    parser.add_argument('--tamanho-kb', type=int, default=200, help="tamanho do upload e do XLSX")
+    args = parser.parse_args()
+
+    dados = os.urandom(args.tamanho_kb * 1024)
+    app = criar_app(dados)
+    contexto = Contexto()
+
+    def direto(environ, corpo):
+        # Environ pronto; só o wsgi.input precisa ser novo a cada chamada
+        environ['wsgi.input'] = io.BytesIO(corpo)
+        with app.request_context(environ):
+            return app.full_dispatch_request().get_data()
+
+    print(f"⏱️  {args.repeticoes} requisições por caso, corpo binário de {args.tamanho_kb} KB\n")
+    print(f"{'Caso':<22} {'Flask direto':>14} {'Adaptador':>14} {'Custo':>10} {'p95':>10}")
+    casos = [
+        ('GET JSON', evento('GET', '/api/json')),
+        ('POST upload base64', evento('POST', '/api/upload', dados)),
+        ('GET XLSX base64', evento('GET', '/api/xlsx'))
+    ]
+    for nome, evento_caso in casos:
+        environ = montar_environ(evento_caso, contexto)
+        corpo = environ['wsgi.input'].getvalue()
+        base, _ = medir(lambda: direto(environ, corpo), args.repeticoes)
+        total, total_p95 = medir(lambda: lambda_response(app, evento_caso, contexto), args.repeticoes)
+        print(f"{nome:<22} {base:11.1f} µs {total:11.1f} µs {total - base:7.1f} µs {total_p95 - base:7.1f} µs")
+
+        resposta = lambda_response(app, evento_caso, contexto)
+        if resposta['statusCode'] != 200:
+            raise SystemExit(f"❌ {nome}: HTTP {resposta['statusCode']} {resposta['body'][:200]}")
+        if nome == 'GET XLSX base64' and base64.b64decode(resposta['body']) != dados:
+            raise SystemExit("❌ XLSX não voltou íntegro em base64")
+
+    print()
+    environ_ms, _ = medir(lambda: montar_environ(casos[0][1], contexto), args.repeticoes)
+    resposta_ms, _ = medir(
+        lambda: montar_resposta(200, [('Content-Type', 'application/json'), ('Content-Length', '60')],
+                                b'{"status": "OK"}'),
+        args.repeticoes
+    )
+    print(f"{'montar_environ':<22} {environ_ms:11.1f} µs")
+    print(f"{'montar_resposta (JSON)':<22} {resposta_ms:11.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Custo do cold start do Lambda: importação do handler e primeira invocação
+
+Cada execução abre um interpretador novo com `python -S -X importtime`,
+PYTHONPATH=lambda_dependencies e o diretório do código, como no Lambda
+(sem os site-packages da máquina), importa o handler e chama as rotas
+pedidas com um evento do API Gateway. Mostra a árvore de importação, os
+módulos importados só na primeira invocação e o tempo próprio por pacote.
+
+Uso:
+    python benchmark_cold_start.py
+    python benchmark_cold_start.py --repeticoes 5 --orcamento-ms 800
+    python benchmark_cold_start.py --rota "GET /api/health" --rota "POST /api/registrar_ponto"
+
+Sai com código 1 se importação + primeira invocação passar do orçamento
+(PONTO_COLD_START_ORCAMENTO_MS, padrão 1000) ou se algum módulo de --proibir
+for importado junto com o handler: esses devem ser importados dentro das
+rotas que os usam. Os tempos incluem o custo do próprio -X importtime.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+ORCAMENTO_MS = float(os.environ.get('PONTO_COLD_START_ORCAMENTO_MS', 1000))
+# Só usados por algumas rotas (ou só fora do Lambda): não podem pesar em toda invocação
+PROIBIDOS = 'boto3,botocore,PIL,numpy,openpyxl,jwt'
+MARCA = '@cold-start'
+
+# Roda no interpretador novo; só sys e time, para não adiantar importações do handler
+SIMULACAO = r'''
+import sys, time
+sys.stderr.write('@cold-start inicio %r\n' % time.time())
+inicio = time.perf_counter()
+modulo, _, funcao = sys.argv[1].rpartition('.')
+__import__(modulo)
+handler = getattr(sys.modules[modulo], funcao)
+sys.stderr.write('@cold-start importado %r\n' % ((time.perf_counter() - inicio) * 1000))
+
+class Contexto:
+    function_name = 'benchmark-cold-start'
+    aws_request_id = 'benchmark-cold-start'
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+for rota in sys.argv[2:]:
+    metodo, _, caminho = rota.partition(' ')
+    evento = {'httpMethod': metodo, 'path': caminho, 'resource': caminho,
+              'headers': {'Host': 'localhost'}, 'queryStringParameters': None,
+              'pathParameters': None, 'body': None, 'isBase64Encoded': False}
+    sys.stderr.flush()
+    inicio = time.perf_counter()
+    resposta = handler(evento, Contexto())
+    ms = (time.perf_counter() - inicio) * 1000
+    sys.stderr.write('@cold-start invocado %r %s\n' % (ms, resposta.get('statusCode')))
+'''
+
+class Modulo:
+    def __init__(self, nome, proprio_us, acumulado_us, nivel):
+        self.nome = nome
+        self.proprio_ms = proprio_us / 1000
+        self.acumulado_ms = acumulado_us / 1000
+        self.nivel = nivel
+        self.filhos = []
+
+def montar_arvore(linhas):
+    """
+    Árvore a partir das linhas do -X importtime.
+
+    Cada módulo aparece depois dos que ele importou, com dois espaços a mais
+    de recuo por nível: os pendentes mais fundos que o atual são seus filhos.
+    """
+    pendentes = []
+    for linha in linhas:
+        proprio, acumulado, nome = linha.split('|')
+        try:
+            proprio, acumulado = int(proprio.split(':')[1]), int(acumulado)
+        except ValueError:
+            continue  # cabeçalho
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        modulo = Modulo(nome.strip(), proprio, acumulado, nivel)
+        while pendentes and pendentes[-1].nivel > nivel:
+            modulo.filhos.insert(0, pendentes.pop())
+        pendentes.append(modulo)
+    return pendentes
+
+def percorrer(modulos):
+    for modulo in modulos:
+        yield modulo
+        yield from percorrer(modulo.filhos)
+
+def caminho_ate(modulos, nome):
+    """Cadeia de importação do primeiro módulo com esse nome (ou do pacote)"""
+    for modulo in modulos:
+        if modulo.nome == nome or modulo.nome.startswith(nome + '.'):
+            return [modulo.nome]
+        caminho = caminho_ate(modulo.filhos, nome)
+        if caminho:
+            return [modulo.nome] + caminho
+    return None
+
+def executar(args):
+    """Um interpretador novo: {'inicio_ms', 'importacao_ms', 'invocacoes', 'arvores'}"""
+    ambiente = dict(os.environ)
+    ambiente['PYTHONPATH'] = os.path.join(PASTA, 'lambda_dependencies')
+    ambiente['PONTO_ARMAZENAMENTO'] = args.armazenamento
+    # Faz o código se comportar como no Lambda (ex.: métricas em EMF)
+    ambiente.setdefault('AWS_LAMBDA_FUNCTION_NAME', 'benchmark-cold-start')
+    opcoes = ['-X', 'importtime'] if args.site_packages else ['-S', '-X', 'importtime']
+    inicio = time.time()
+    processo = subprocess.run(
+        [sys.executable, *opcoes, '-c', SIMULACAO, args.handler, *args.rota],
+        cwd=PASTA, env=ambiente, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        print(processo.stdout[-2000:])
+        print(processo.stderr[-4000:])
+        raise SystemExit(f"❌ O interpretador terminou com código {processo.returncode}")
+
+    resultado = {'invocacoes': [], 'arvores': []}
+    fase = []
+    for linha in processo.stderr.splitlines():
+        if linha.startswith('import time:'):
+            fase.append(linha)
+        elif linha.startswith(MARCA):
+            _, evento, *valores = linha.split()
+            if evento == 'inicio':
+                resultado['inicio_ms'] = (float(valores[0]) - inicio) * 1000
+            elif evento == 'importado':
+                resultado['importacao_ms'] = float(valores[0])
+                resultado['arvores'].append(montar_arvore(fase))
+            elif evento == 'invocado':
+                resultado['invocacoes'].append((float(valores[0]), valores[1]))
+                resultado['arvores'].append(montar_arvore(fase))
+            fase = []
+    return resultado
+
+def imprimir_arvore(modulos, minimo_ms, profundidade, nivel=0):
+    for modulo in sorted(modulos, key=lambda modulo: -modulo.acumulado_ms):
+        if modulo.acumulado_ms < minimo_ms and nivel:
+            continue
+        nome = '  ' * (nivel + 1) + modulo.nome
+        print(f"{nome:<56} {modulo.acumulado_ms:9.1f} ms  (próprio {modulo.proprio_ms:.1f})")
+        if nivel + 1 < profundidade:
+            imprimir_arvore(modulo.filhos, minimo_ms, profundidade, nivel + 1)
+
+def tempo_por_pacote(modulos):
+    """Soma do tempo próprio dos módulos por pacote de primeiro nível"""
+    pacotes = {}
+    for modulo in percorrer(modulos):
+        pacote = modulo.nome.split('.')[0]
+        pacotes[pacote] = pacotes.get(pacote, 0) + modulo.proprio_ms
+    return sorted(pacotes.items(), key=lambda item: -item[1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação e primeira invocação do handler num interpretador novo")
+    parser.add_argument('--handler', default='app.lambda_handler')
+    parser.add_argument('--rota', action='append',
+                        help='"MÉTODO /caminho" invocado em ordem (padrão: "GET /api/health")')
+    parser.add_argument('--armazenamento', default='memoria',
+                        help="PONTO_ARMAZENAMENTO do interpretador (aws precisa de credenciais)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_MS,
+                        help="limite para importação + primeira invocação (mediana)")
+    parser.add_argument('--proibir', default=PROIBIDOS,
+                        help="módulos que não podem ser importados junto com o handler (vírgulas)")
+    parser.add_argument('--minimo-ms', type=float, default=5, help="esconde módulos mais rápidos na árvore")
+    parser.add_argument('--profundidade', type=int, default=4)
+    parser.add_argument('--site-packages', action='store_true',
+                        help="usa também os site-packages da máquina (não roda com -S)")
+    args = parser.parse_args()
+    args.rota = args.rota or ['GET /api/health']
+
+    execucoes = [executar(args) for _ in range(args.repeticoes)]
+    ultima = execucoes[-1]
+    inicio_ms = statistics.median(execucao['inicio_ms'] for execucao in execucoes)
+    importacao_ms = statistics.median(execucao['importacao_ms'] for execucao in execucoes)
+    invocacoes_ms = [
+        statistics.median(execucao['invocacoes'][i][0] for execucao in execucoes)
+        for i in range(len(args.rota))
+    ]
+    total_ms = importacao_ms + invocacoes_ms[0]
+
+    print(f"🧊 Cold start de {args.handler} (PYTHONPATH=lambda_dependencies, "
+          f"mediana de {args.repeticoes} interpretadores)\n")
+    print(f"{'Interpretador até o handler':<40} {inicio_ms:9.1f} ms")
+    print(f"{'Importação do handler':<40} {importacao_ms:9.1f} ms  "
+          f"({len(list(percorrer(ultima['arvores'][0])))} módulos)")
+    for i, rota in enumerate(args.rota):
+        novos = len(list(percorrer(ultima['arvores'][i + 1])))
+        print(f"{f'{i + 1}ª invocação {rota}':<40} {invocacoes_ms[i]:9.1f} ms  "
+              f"(HTTP {ultima['invocacoes'][i][1]}, {novos} módulos importados)")
+
+    print(f"\n🌳 Importação do handler (módulos a partir de {args.minimo_ms:g} ms):")
+    imprimir_arvore(ultima['arvores'][0], args.minimo_ms, args.profundidade)
+    for i, rota in enumerate(args.rota):
+        if ultima['arvores'][i + 1]:
+            print(f"\n🌱 Importado na {i + 1}ª invocação {rota}:")
+            imprimir_arvore(ultima['arvores'][i + 1], args.minimo_ms, args.profundidade)
+
+    print("\n📦 Tempo próprio por pacote na importação do handler:")
+    for pacote, ms in tempo_por_pacote(ultima['arvores'][0])[:12]:
+        print(f"  {pacote:<38} {ms:9.1f} ms")
+
+    falhas = []
+    for nome in filter(None, (nome.strip() for nome in args.proibir.split(','))):
+        caminho = caminho_ate(ultima['arvores'][0], nome)
+        if caminho:
+            falhas.append(f"{nome} importado com o handler: {' -> '.join(caminho)}")
+    if total_ms > args.orcamento_ms:
+        falhas.append(f"importação + 1ª invocação em {total_ms:.1f} ms (orçamento {args.orcamento_ms:g} ms)")
+
+    print()
+    if falhas:
+        for falha in falhas:
+            print(f"❌ {falha}")
+        sys.exit(1)
+    print(f"✅ Importação + 1ª invocação em {total_ms:.1f} ms (orçamento {args.orcamento_ms:g} ms)")
+
+if __name__ == "__main__":
+    main()
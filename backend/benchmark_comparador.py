@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do ComparadorEmbeddings contra resultados gravados do Rekognition
+
+1. Gravar o que o Rekognition responde hoje para fotos de ponto (usa AWS):
+    python benchmark_comparador.py gravar --empresa <id> --fotos pontos/ --saida rekognition.jsonl
+
+2. Comparar acerto e latência offline, com as fotos de cadastro em
+   cadastro/<funcionario_id>.jpg:
+    python benchmark_comparador.py comparar --cadastro cadastro/ --gravados rekognition.jsonl \\
+        --extrator meu_modelo:vetor_da_face
+
+3. Só a busca na matriz, com vetores aleatórios:
+    python benchmark_comparador.py escala --funcionarios 5000 --dimensao 512
+
+Cada linha do JSONL: {"foto": caminho relativo ao JSONL, "funcionario_id": id ou null,
+"ms": latência}.
+Sem --extrator é usado o extrator_miniatura, que não reconhece rostos e só
+serve para testar o próprio benchmark.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault('PONTO_ARMAZENAMENTO', 'memoria')
+
+from comparador_faces import ComparadorEmbeddings, ComparadorRekognition, carregar_extrator, extrator_miniatura
+
+def percentis(tempos):
+    tempos = sorted(tempos)
+    p95 = tempos[max(0, int(len(tempos) * 0.95) - 1)]
+    return f"mediana {statistics.median(tempos):8.2f} ms   p95 {p95:8.2f} ms"
+
+def listar_fotos(pasta):
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+
+def ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+def gravar(args):
+    from repositorios import criar_repositorios
+
+    comparador = ComparadorRekognition(criar_repositorios('aws').faces)
+    fotos = listar_fotos(args.fotos)
+    with open(args.saida, 'w', encoding='utf-8') as saida:
+        for caminho in fotos:
+            inicio = time.perf_counter()
+            funcionario_id, _ = comparador.identificar(ler(caminho), args.empresa)
+            ms = (time.perf_counter() - inicio) * 1000
+            foto = os.path.relpath(caminho, os.path.dirname(os.path.abspath(args.saida)))
+            saida.write(json.dumps({'foto': foto, 'funcionario_id': funcionario_id, 'ms': round(ms, 2)}) + '\n')
+            print(f"📷 {caminho}: {funcionario_id or 'não reconhecido'} ({ms:.0f} ms)")
+    print(f"✅ {len(fotos)} resultados gravados em {args.saida}")
+
+def montar_comparador(extrator, cadastro, limiar):
+    """ComparadorEmbeddings sobre repositórios em memória com as fotos de cadastro"""
+    from repositorios import criar_repositorios
+
+    repos = criar_repositorios('memoria')
+    empresa_id = 'benchmark'
+    comparador = ComparadorEmbeddings(extrator, repos.embeddings, repos.diretorio, limiar=limiar)
+    for funcionario_id, imagem in cadastro.items():
+        face_id = str(uuid.uuid4())
+        repos.funcionarios.salvar({'id': funcionario_id, 'nome': funcionario_id, 'empresa_id': empresa_id, 'face_id': face_id})
+        comparador.cadastrar(imagem, funcionario_id, empresa_id, face_id)
+    return comparador, empresa_id
+
+def comparar(args):
+    extrator = carregar_extrator(args.extrator) if args.extrator else extrator_miniatura
+    if not args.extrator:
+        print("⚠️  Sem --extrator: usando extrator_miniatura (não reconhece rostos)")
+    cadastro = {
+        os.path.splitext(os.path.basename(caminho))[0]: ler(caminho)
+        for caminho in listar_fotos(args.cadastro)
+    }
+    with open(args.gravados, encoding='utf-8') as arquivo:
+        gravados = [json.loads(linha) for linha in arquivo if linha.strip()]
+    # Caminhos das fotos são relativos ao arquivo gravado
+    pasta_gravados = os.path.dirname(os.path.abspath(args.gravados))
+    print(f"👥 {len(cadastro)} funcionários, {len(gravados)} fotos gravadas")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparador, empresa_id = montar_comparador(extrator, cadastro, args.limiar)
+        comparador.matriz(empresa_id)  # carga fora da medição
+
+    iguais = aceites_errados = rejeites_errados = 0
+    tempos_total, tempos_busca = [], []
+    for gravado in gravados:
+        imagem = ler(os.path.join(pasta_gravados, gravado['foto']))
+        inicio = time.perf_counter()
+        vetor = comparador.vetor(imagem)
+        meio = time.perf_counter()
+        if vetor is None:
+            funcionario_id = None
+        else:
+            funcionario_id, similaridade = comparador.matriz(empresa_id).mais_parecidos(vetor, 1)[0]
+            if similaridade < args.limiar:
+                funcionario_id = None
+        fim = time.perf_counter()
+        tempos_total.append((fim - inicio) * 1000)
+        tempos_busca.append((fim - meio) * 1000)
+
+        esperado = gravado.get('funcionario_id')
+        if funcionario_id == esperado:
+            iguais += 1
+        elif funcionario_id:
+            aceites_errados += 1
+            print(f"❌ {gravado['foto']}: {funcionario_id} (Rekognition: {esperado or 'não reconhecido'})")
+        else:
+            rejeites_errados += 1
+            print(f"⚠️  {gravado['foto']}: não reconhecido (Rekognition: {esperado})")
+
+    total = len(gravados) or 1
+    print()
+    print(f"Concordância com o Rekognition   {100 * iguais / total:6.1f}%")
+    print(f"Aceites divergentes              {aceites_errados}")
+    print(f"Rejeites divergentes             {rejeites_errados}")
+    print()
+    print(f"{'Rekognition (gravado)':<32} {percentis([g['ms'] for g in gravados if 'ms' in g] or [0])}")
+    print(f"{'Embeddings (extrator + busca)':<32} {percentis(tempos_total or [0])}")
+    print(f"{'Embeddings (só busca)':<32} {percentis(tempos_busca or [0])}")
+
+def escala(args):
+    import numpy as np
+
+    class Extrator:
+        def __init__(self):
+            self.gerador = np.random.default_rng(42)
+
+        def __call__(self, imagem):
+            return self.gerador.standard_normal(args.dimensao)
+
+    extrator = Extrator()
+    cadastro = {f"funcionario_{i:06d}": b'' for i in range(args.funcionarios)}
+    print(f"🧪 Montando {args.funcionarios} vetores de dimensão {args.dimensao}...")
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparador, empresa_id = montar_comparador(extrator, cadastro, args.limiar)
+        matriz = comparador.matriz(empresa_id)
+    print(f"✅ Carga em {(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"({matriz.dados.nbytes / 1024 / 1024:.1f} MB)")
+
+    consultas = [comparador.vetor(b'') for _ in range(args.repeticoes)]
+    tempos = []
+    for vetor in consultas:
+        inicio = time.perf_counter()
+        matriz.mais_parecidos(vetor, 5)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"{'Top-5 por cosseno':<32} {percentis(tempos)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do comparador de faces por embeddings")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_gravar = subparsers.add_parser('gravar', help="grava as respostas do Rekognition (AWS)")
+    p_gravar.add_argument('--empresa', required=True)
+    p_gravar.add_argument('--fotos', required=True, help="pasta com fotos de ponto")
+    p_gravar.add_argument('--saida', default='rekognition.jsonl')
+
+    p_comparar = subparsers.add_parser('comparar', help="compara com os resultados gravados")
+    p_comparar.add_argument('--cadastro', required=True, help="pasta com <funcionario_id>.jpg")
+    p_comparar.add_argument('--gravados', default='rekognition.jsonl')
+    p_comparar.add_argument('--extrator', help="modulo:funcao (padrão: extrator_miniatura)")
+    p_comparar.add_argument('--limiar', type=float, default=0.6)
+
+    p_escala = subparsers.add_parser('escala', help="latência da busca com vetores aleatórios")
+    p_escala.add_argument('--funcionarios', type=int, default=5000)
+    p_escala.add_argument('--dimensao', type=int, default=512)
+    p_escala.add_argument('--repeticoes', type=int, default=200)
+    p_escala.add_argument('--limiar', type=float, default=0.6)
+
+    args = parser.parse_args()
+    {'gravar': gravar, 'comparar': comparar, 'escala': escala}[args.comando](args)
+
+if __name__ == "__main__":
+    main()
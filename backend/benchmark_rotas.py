@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline das rotas reais com os repositórios em memória (sem AWS)
+
+Uso:
+    python benchmark_rotas.py --funcionarios 500 --dias 30 --repeticoes 50
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+import uuid
+
+os.environ['PONTO_ARMAZENAMENTO'] = 'memoria'
+# Só erros no console, fora da medição (PONTO_LOG_NIVEL=DEBUG mostra tudo)
+os.environ.setdefault('PONTO_LOG_NIVEL', 'ERROR')
+
+from app import app
+from repositorios import obter_repositorios
+
+def medir(nome, chamada, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        response = chamada()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{nome}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    tempos.sort()
+    p95 = tempos[max(0, int(len(tempos) * 0.95) - 1)]
+    print(f"{nome:<40} mediana {statistics.median(tempos):8.2f} ms   p95 {p95:8.2f} ms")
+
+def popular(cliente, total_funcionarios, dias):
+    """Cria empresa, funcionários e registros diretamente nos repositórios"""
+    cliente.post('/api/cadastrar_usuario_empresa', json={
+        'usuario_id': 'benchmark', 'email': 'bench@exemplo.com', 'empresa_nome': 'Benchmark', 'senha': 'benchmark'
+    })
+    token = cliente.post('/api/login', json={'usuario_id': 'benchmark', 'senha': 'benchmark'}).get_json()['token']
+    repos = obter_repositorios()
+    empresa_id = repos.usuarios.obter('benchmark')['empresa_id']
+
+    fotos = {}
+    for i in range(total_funcionarios):
+        funcionario_id = f"funcionario_{i:05d}"
+        foto = f"foto-{funcionario_id}".encode()
+        fotos[funcionario_id] = foto
+        repos.funcionarios.salvar({
+            'id': funcionario_id, 'nome': f"Funcionário {i}", 'cargo': 'Operador',
+            'empresa_id': empresa_id, 'empresa_nome': 'Benchmark',
+            'face_id': repos.faces.indexar(foto, funcionario_id, empresa_id)
+        })
+        for dia in range(1, dias + 1):
+            for hora, tipo in (('08:00:00', 'entrada'), ('12:00:00', 'saída'), ('13:00:00', 'entrada'), ('17:00:00', 'saída')):
+                repos.registros.registrar_manual({
+                    'registro_id': str(uuid.uuid4()), 'funcionario_id': funcionario_id,
+                    'data_hora': f"2024-01-{dia:02d} {hora}", 'tipo': tipo,
+                    'empresa_id': empresa_id, 'empresa_nome': 'Benchmark'
+                })
+    headers = {'Authorization': f"Bearer {token}"}
+    # O ponto é batido pelo quiosque, com o token de quiosque da empresa
+    quiosque = cliente.post('/api/quiosques/token', headers=headers, json={'dispositivo_id': 'benchmark'}).get_json()
+    return headers, {'Authorization': f"Bearer {quiosque['token']}"}, fotos
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas com armazenamento em memória")
+    parser.add_argument('--funcionarios', type=int, default=200)
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--repeticoes', type=int, default=30)
+    args = parser.parse_args()
+
+    cliente = app.test_client()
+    print(f"🧪 Populando {args.funcionarios} funcionários x {args.dias} dias...")
+    headers, headers_quiosque, fotos = popular(cliente, args.funcionarios, args.dias)
+    fim = f"2024-01-{args.dias:02d}"
+    primeiro = next(iter(fotos))
+
+    print()
+    medir("GET /api/funcionarios", lambda: cliente.get('/api/funcionarios', headers=headers), args.repeticoes)
+    medir("GET /api/funcionarios?limit=50", lambda: cliente.get('/api/funcionarios?limit=50', headers=headers), args.repeticoes)
+    medir("GET /api/registros (resumo do mês)",
+          lambda: cliente.get(f'/api/registros?inicio=2024-01-01&fim={fim}', headers=headers), args.repeticoes)
+    medir("GET /api/registros?funcionario_id",
+          lambda: cliente.get(f'/api/registros?inicio=2024-01-01&fim={fim}&funcionario_id={primeiro}', headers=headers),
+          args.repeticoes)
+    medir("GET /api/funcionarios/nome", lambda: cliente.get('/api/funcionarios/nome?nome=Func', headers=headers), args.repeticoes)
+
+    # Cada funcionário bate o ponto uma vez: evita dois pontos no mesmo segundo
+    fila = iter(fotos.items())
+    def bater_ponto():
+        _, foto = next(fila)
+        return cliente.post('/api/registrar_ponto', headers=headers_quiosque, data={'foto': (io.BytesIO(foto), 'foto.jpg')})
+    medir("POST /api/registrar_ponto", bater_ponto, min(args.repeticoes, len(fotos)))
+
+if __name__ == "__main__":
+    main()
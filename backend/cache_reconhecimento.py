@@ -0,0 +1,173 @@
+"""
+Cache curto dos últimos reconhecimentos de cada dispositivo.
+
+Na troca de turno o funcionário toca duas vezes no quiosque ou o app
+reenvia a foto. Cada foto abre uma entrada do dispositivo antes de ser
+reconhecida (iniciar), e uma segunda foto do mesmo dispositivo, enquanto a
+primeira está em andamento ou até PONTO_RECONHECIMENTO_JANELA segundos
+(padrão 5) depois dela, não registra outro ponto:
+
+- mesmos bytes (reenvio do app): espera a resposta da primeira e a devolve,
+  sem chamar o Rekognition;
+- foto quase igual (dHash 16x16 a no máximo PONTO_RECONHECIMENTO_DISTANCIA
+  bits de 256, padrão 16): espera a primeira identificar o funcionário e,
+  se identificou, reaproveita o resultado e devolve a resposta dela, também
+  sem chamar o Rekognition. Se a primeira não reconheceu ninguém, esta é
+  reconhecida normalmente. A distância precisa ser curta: num quiosque de
+  fundo fixo o próximo da fila não pode cair dentro dela.
+
+A espera vai até PONTO_RECONHECIMENTO_ESPERA segundos (padrão 10), limitada
+pelo prazo da requisição. Só respostas de sucesso ficam no cache: uma foto
+não reconhecida sempre é tentada de novo.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import deque
+
+from imagens import carregar_pillow
+from logs import obter_log
+from paralelo import prazo_da_requisicao
+
+JANELA_SEGUNDOS = float(os.environ.get('PONTO_RECONHECIMENTO_JANELA', 5))
+DISTANCIA_MAXIMA = int(os.environ.get('PONTO_RECONHECIMENTO_DISTANCIA', 16))
+ESPERA_SEGUNDOS = float(os.environ.get('PONTO_RECONHECIMENTO_ESPERA', 10))
+LADO_HASH = 16
+
+log = obter_log('reconhecimento')
+
+def hash_perceptual(imagem):
+    """dHash de LADO_HASH x LADO_HASH bits (None se a imagem não puder ser lida)"""
+    Image = carregar_pillow()
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(imagem)) as foto:
+            foto.draft('L', (LADO_HASH * 4, LADO_HASH * 4))
+            pixels = list(foto.convert('L').resize((LADO_HASH + 1, LADO_HASH), Image.BILINEAR).getdata())
+    except (OSError, ValueError):
+        return None
+    valor = 0
+    for linha in range(LADO_HASH):
+        inicio = linha * (LADO_HASH + 1)
+        for coluna in range(LADO_HASH):
+            valor = (valor << 1) | (pixels[inicio + coluna] > pixels[inicio + coluna + 1])
+    return valor
+
+def tempo_de_espera():
+    """Segundos que uma repetição pode esperar pela primeira foto"""
+    prazo = prazo_da_requisicao()
+    if prazo is None:
+        return ESPERA_SEGUNDOS
+    return max(0.0, min(ESPERA_SEGUNDOS, prazo - time.monotonic()))
+
+class Assinatura:
+    def __init__(self, imagem):
+        self.digest = hashlib.sha256(imagem).digest()
+        self.hash = hash_perceptual(imagem)
+
+    def parecida(self, outra, distancia_maxima):
+        if self.digest == outra.digest:
+            return True
+        if self.hash is None or outra.hash is None:
+            return False
+        return bin(self.hash ^ outra.hash).count('1') <= distancia_maxima
+
+class Reconhecimento:
+    """Uma foto do dispositivo: em andamento até encerrar(), depois a resposta dada"""
+
+    def __init__(self, assinatura):
+        self.instante = time.monotonic()
+        self.assinatura = assinatura
+        self.funcionario_id = None
+        self.resposta = None
+        self.status = None
+        self._identificado = threading.Event()
+        self._concluido = threading.Event()
+
+    def em_andamento(self):
+        return not self._concluido.is_set()
+
+    def identificar(self, funcionario_id):
+        """Funcionário reconhecido na foto (None se ninguém)"""
+        self.funcionario_id = funcionario_id
+        self._identificado.set()
+
+    def aguardar_identificacao(self, timeout):
+        """Espera o reconhecimento da foto; False se ele não terminou a tempo"""
+        return self._identificado.wait(timeout)
+
+    def encerrar(self, resposta, status):
+        self.resposta = resposta
+        self.status = status
+        self.instante = time.monotonic()
+        if not self._identificado.is_set():
+            self.identificar(None)
+        self._concluido.set()
+
+    def aguardar(self, timeout):
+        """(resposta, status) da foto; resposta None se falhou ou não terminou a tempo"""
+        self._concluido.wait(timeout)
+        return self.resposta, self.status
+
+class CacheReconhecimento:
+    def __init__(self, janela=None, distancia_maxima=None, max_por_dispositivo=8, max_dispositivos=1024):
+        self._janela = JANELA_SEGUNDOS if janela is None else janela
+        self._distancia_maxima = DISTANCIA_MAXIMA if distancia_maxima is None else distancia_maxima
+        self._max_por_dispositivo = max_por_dispositivo
+        self._max_dispositivos = max_dispositivos
+        self._recentes = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self, imagem, dispositivo):
+        """
+        Retorna (parecidas, proprio).
+
+        parecidas são as fotos parecidas do dispositivo, em andamento ou dentro
+        da janela, da mais recente para a mais antiga. proprio é a entrada
+        desta foto, que deve ser encerrada com concluir(); é None quando
+        parecidas[0] tem os mesmos bytes, e então basta devolver a resposta dela.
+        """
+        assinatura = Assinatura(imagem)
+        limite = time.monotonic() - self._janela
+        proprio = None
+        with self._lock:
+            parecidas = [
+                recente for recente in reversed(self._recentes.get(dispositivo, ()))
+                if (recente.em_andamento() or recente.instante >= limite)
+                and assinatura.parecida(recente.assinatura, self._distancia_maxima)
+            ]
+            iguais = [recente for recente in parecidas if recente.assinatura.digest == assinatura.digest]
+            if iguais:
+                parecidas = iguais[:1]
+            else:
+                proprio = Reconhecimento(assinatura)
+                if dispositivo not in self._recentes and len(self._recentes) >= self._max_dispositivos:
+                    self._remover_expirados()
+                self._recentes.setdefault(dispositivo, deque(maxlen=self._max_por_dispositivo)).append(proprio)
+        log.debug('cache', parecidas=len(parecidas), mesmos_bytes=proprio is None, dispositivo=dispositivo)
+        return parecidas, proprio
+
+    def concluir(self, dispositivo, reconhecimento, resposta, status):
+        """Libera quem espera pela foto; sem sucesso a entrada sai do cache"""
+        if status != 200:
+            with self._lock:
+                recentes = self._recentes.get(dispositivo)
+                if recentes and reconhecimento in recentes:
+                    recentes.remove(reconhecimento)
+        reconhecimento.encerrar(resposta, status)
+
+    def _remover_expirados(self):
+        # Chamado com o lock
+        limite = time.monotonic() - self._janela
+        for dispositivo in [
+            d for d, recentes in self._recentes.items()
+            if not recentes or (recentes[-1].instante < limite and not recentes[-1].em_andamento())
+        ]:
+            del self._recentes[dispositivo]
+        while len(self._recentes) >= self._max_dispositivos:
+            del self._recentes[next(iter(self._recentes))]
+
+reconhecimentos_recentes = CacheReconhecimento()
@@ -0,0 +1,198 @@
+"""
+Cadastro de funcionários em lote (POST /api/funcionarios/lote).
+
+O lote é um CSV com as colunas nome, cargo e foto (nome do arquivo) mais
+as fotos, num ZIP ou como vários arquivos "fotos" do multipart. Sem a
+coluna foto, as linhas são associadas às fotos na ordem em que chegaram.
+
+Os itens rodam no pool compartilhado da requisição (paralelo.py) e os
+funcionários são gravados em lote conforme terminam. Cada foto é indexada
+no Rekognition antes de ir para o S3, então foto sem rosto não deixa
+arquivo órfão.
+O id de cada funcionário é derivado da empresa, do nome e da foto: reenviar
+o mesmo lote depois de uma falha parcial pula quem já foi cadastrado, então
+lotes grandes podem ser mandados em partes e repetidos sem duplicar ninguém.
+Se a gravação de um grupo falha, as faces recém-indexadas dele são removidas
+do Rekognition, para o reenvio não deixar faces órfãs com o mesmo
+ExternalImageId. Pelo mesmo motivo, um item que termina depois do prazo da
+requisição remove a própria face e sai como erro: só fica indexado quem é
+gravado, e o reenvio retoma dali.
+"""
+import csv
+import hashlib
+import io
+import os
+import time
+import zipfile
+from datetime import datetime
+
+from imagens import normalizar_imagem
+from logs import obter_log
+from paralelo import PrazoEsgotado, conforme_terminam, prazo_da_requisicao
+
+MAXIMO_ITENS = int(os.environ.get('PONTO_LOTE_MAXIMO', 200))
+# Limite por arquivo descompactado do ZIP
+TAMANHO_MAXIMO_FOTO = 15 * 1024 * 1024
+# Quantos funcionários gravar por vez enquanto os itens terminam
+GRAVAR_A_CADA = 25
+
+log = obter_log('cadastro_lote')
+
+class LoteInvalido(Exception):
+    """CSV/fotos ausentes ou mal formados"""
+
+def ler_csv(arquivo):
+    """Linhas do CSV como dicts com chaves em minúsculas (aceita ',' ou ';')"""
+    texto = arquivo.read().decode('utf-8-sig')
+    try:
+        dialeto = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    linhas = []
+    for linha in csv.DictReader(io.StringIO(texto), dialect=dialeto):
+        linhas.append({(chave or '').strip().lower(): (valor or '').strip() for chave, valor in linha.items()})
+    if not linhas:
+        raise LoteInvalido('CSV vazio')
+    if 'nome' not in linhas[0] or 'cargo' not in linhas[0]:
+        raise LoteInvalido('O CSV precisa das colunas nome e cargo')
+    return linhas
+
+def ler_zip(arquivo):
+    """Fotos do ZIP em ordem: [(nome_arquivo, bytes)]"""
+    try:
+        pacote = zipfile.ZipFile(io.BytesIO(arquivo.read()))
+    except zipfile.BadZipFile:
+        raise LoteInvalido('ZIP inválido')
+    fotos = []
+    for info in pacote.infolist():
+        nome = os.path.basename(info.filename)
+        if info.is_dir() or not nome or nome.startswith('.') or info.filename.startswith('__MACOSX'):
+            continue
+        if info.file_size > TAMANHO_MAXIMO_FOTO:
+            raise LoteInvalido(f'Foto muito grande no ZIP: {nome}')
+        fotos.append((nome, pacote.read(info)))
+    return fotos
+
+def montar_itens(linhas, fotos):
+    """Associa cada linha do CSV à sua foto: [{'linha', 'nome', 'cargo', 'arquivo', 'imagem'}]"""
+    if len(linhas) > MAXIMO_ITENS:
+        raise LoteInvalido(f'No máximo {MAXIMO_ITENS} funcionários por lote; envie em partes')
+    por_nome = dict(fotos)
+    itens = []
+    for posicao, linha in enumerate(linhas):
+        if linha.get('foto'):
+            arquivo = os.path.basename(linha['foto'])
+            imagem = por_nome.get(arquivo)
+        elif posicao < len(fotos):
+            arquivo, imagem = fotos[posicao]
+        else:
+            arquivo, imagem = None, None
+        itens.append({
+            'linha': posicao + 2,  # linha 1 é o cabeçalho
+            'nome': linha.get('nome'),
+            'cargo': linha.get('cargo'),
+            'arquivo': arquivo,
+            'imagem': imagem
+        })
+    return itens
+
+def id_funcionario(empresa_id, nome, imagem):
+    """Mesmo formato do cadastro individual, mas estável para o mesmo nome e foto"""
+    digest = hashlib.sha256(f"{empresa_id}\0{nome}\0".encode() + imagem).hexdigest()
+    return f"{nome.lower().replace(' ', '_')}_{digest[:6]}"
+
+def _processar_item(repos, item, empresa_id, empresa_nome, prazo=None):
+    resultado = {'linha': item['linha'], 'nome': item['nome'], 'arquivo': item['arquivo']}
+    if not item['nome'] or not item['cargo']:
+        return dict(resultado, status='erro', erro='Nome e cargo são obrigatórios'), None
+    if not item['imagem']:
+        return dict(resultado, status='erro', erro='Foto não encontrada no lote'), None
+
+    funcionario_id = id_funcionario(empresa_id, item['nome'], item['imagem'])
+    resultado['id'] = funcionario_id
+    existente = repos.funcionarios.obter(funcionario_id)
+    if existente and existente.get('face_id'):
+        return dict(resultado, status='existente'), None
+
+    imagem = normalizar_imagem(item['imagem'])
+    face_id = repos.faces.indexar(imagem, funcionario_id, empresa_id)
+    if not face_id:
+        return dict(resultado, status='erro', erro='Nenhum rosto detectado na imagem'), None
+    try:
+        foto_url = repos.fotos.enviar(imagem, f"funcionarios/{funcionario_id}.jpg")
+        if prazo is not None and time.monotonic() >= prazo:
+            # A resposta já saiu sem este item e ele não será gravado
+            raise PrazoEsgotado('Item terminou depois do prazo da requisição')
+    except Exception:
+        try:
+            repos.faces.remover([face_id], empresa_id)
+        except Exception as e:
+            log.erro('remover_face_lote', erro=e, funcionario_id=funcionario_id)
+        raise
+
+    funcionario = {
+        'id': funcionario_id,
+        'nome': item['nome'],
+        'cargo': item['cargo'],
+        'foto_url': foto_url,
+        'face_id': face_id,
+        'empresa_nome': empresa_nome,
+        'empresa_id': empresa_id,
+        'data_cadastro': datetime.now().strftime('%Y-%m-%d')
+    }
+    return dict(resultado, status='cadastrado', foto_url=foto_url), funcionario
+
+def cadastrar_lote(repos, itens, empresa_id, empresa_nome):
+    """Processa os itens em paralelo até o prazo da requisição; retorna os resultados na ordem do CSV"""
+    resultados = []
+    pendentes = []
+
+    def gravar_pendentes():
+        try:
+            repos.funcionarios.salvar_lote(funcionario for _, funcionario in pendentes)
+        except Exception as e:
+            log.erro('gravar_lote', erro=e, funcionarios=len(pendentes))
+            for resultado, funcionario in pendentes:
+                resultado.update(status='erro', erro='Falha ao gravar; reenvie o lote')
+                try:
+                    repos.faces.remover_do_funcionario(funcionario)
+                except Exception as erro_remocao:
+                    log.erro('remover_face_lote', erro=erro_remocao, funcionario_id=funcionario['id'])
+        else:
+            repos.diretorio.aplicar(empresa_id, salvos=[funcionario for _, funcionario in pendentes])
+        pendentes.clear()
+
+    # A mesma pessoa/foto repetida no lote geraria o mesmo id em duas threads
+    vistos = set()
+    unicos = []
+    for item in itens:
+        chave = (item['nome'], hashlib.sha256(item['imagem'] or b'').digest())
+        if item['imagem'] and chave in vistos:
+            resultados.append({
+                'linha': item['linha'], 'nome': item['nome'], 'arquivo': item['arquivo'],
+                'status': 'erro', 'erro': 'Linha repetida no lote'
+            })
+            continue
+        vistos.add(chave)
+        unicos.append(item)
+
+    prazo = prazo_da_requisicao()
+    for item, retorno, erro in conforme_terminam(
+        lambda item: _processar_item(repos, item, empresa_id, empresa_nome, prazo), unicos, prazo
+    ):
+        if erro:
+            log.erro('item_lote', erro=erro, linha=item['linha'])
+            mensagem = 'Tempo limite excedido; reenvie o lote' if isinstance(erro, PrazoEsgotado) else str(erro)
+            retorno = {
+                'linha': item['linha'], 'nome': item['nome'], 'arquivo': item['arquivo'],
+                'status': 'erro', 'erro': mensagem
+            }, None
+        resultado, funcionario = retorno
+        resultados.append(resultado)
+        if funcionario:
+            pendentes.append((resultado, funcionario))
+            if len(pendentes) >= GRAVAR_A_CADA:
+                gravar_pendentes()
+    if pendentes:
+        gravar_pendentes()
+    return sorted(resultados, key=lambda resultado: resultado['linha'])
@@ -72,6 +72,26 @@ def reinstall_dependencies():
     else:
         print(f"❌ Erro ao instalar passlib: {result.stderr}")
 
+def install_nativo(pacote, aviso):
+    """Pacotes com binários nativos: baixa a wheel do Linux/Python do Lambda"""
+    print(f"Instalando {pacote}...")
+    cmd = [
+        sys.executable, '-m', 'pip', 'install', pacote, '-t', 'lambda_dependencies',
+        '--platform', 'manylinux2014_x86_64', '--python-version', '3.11', '--implementation', 'cp',
+        '--only-binary=:all:', '--upgrade', '--no-cache-dir'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode == 0:
+        print(f"✅ {pacote} instalado")
+    else:
+        print(f"⚠️  {pacote} falhou, {aviso}: {result.stderr}")
+
+def install_pillow():
+    install_nativo('Pillow==10.4.0', 'as fotos seguirão sem normalização')
+
+def install_numpy():
+    install_nativo('numpy==1.26.4', 'PONTO_COMPARADOR=embeddings não poderá ser usado')
+
 def create_requirements_lambda():
     """Cria um requirements.txt específico para lambda"""
     requirements_content = """Flask==3.0.2
@@ -80,7 +100,9 @@ boto3==1.34.108
 python-dotenv==1.0.1
 requests==2.31.0
 PyJWT==2.8.0
-passlib==1.7.4"""
+passlib==1.7.4
+Pillow==10.4.0
+numpy==1.26.4"""
     
     with open('requirements_lambda.txt', 'w', encoding='utf-8') as f:
         f.write(requirements_content)
@@ -92,6 +114,8 @@ def main():
     clean_problematic_files()
     create_requirements_lambda()
     reinstall_dependencies()
+    install_pillow()
+    install_numpy()
     
     print("\n" + "="*50)
     print("✅ Limpeza concluída!")
@@ -104,6 +128,12 @@ def main():
         print("\n✅ Flask encontrado")
     if os.path.exists('lambda_dependencies/boto3'):
         print("✅ Boto3 encontrado") 
+    if os.path.exists('lambda_dependencies/PIL'):
+        print("✅ Pillow encontrado")
+    else:
+        print("❌ Pillow não encontrado - as fotos irão sem normalização para o Rekognition e o S3")
+    if os.path.exists('lambda_dependencies/numpy'):
+        print("✅ NumPy encontrado")
     if os.path.exists('lambda_dependencies/passlib'):
         print("✅ Passlib encontrado")
     else:
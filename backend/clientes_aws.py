@@ -0,0 +1,100 @@
+"""
+Clientes AWS compartilhados pelo processo, criados no primeiro uso.
+
+Todos saem da mesma sessão boto3 e da mesma configuração do botocore, lida
+das variáveis de ambiente:
+
+    PONTO_AWS_MAX_CONEXOES     conexões por cliente (padrão 32: threads das
+                               requisições + do cadastro em lote)
+    PONTO_AWS_TIMEOUT_CONEXAO  segundos para abrir a conexão (padrão 2)
+    PONTO_AWS_TIMEOUT_LEITURA  segundos esperando a resposta (padrão 10)
+    PONTO_AWS_TENTATIVAS       tentativas por chamada (padrão 3)
+    PONTO_AWS_MODO_RETRY       standard ou adaptive (padrão adaptive)
+
+aws_utils expõe s3, rekognition, sqs, dynamodb e as tabelas como objetos
+SobDemanda: importar o módulo não cria nada, e uma requisição a /login só
+paga pelo DynamoDB. O tempo de criação de cada cliente é registrado
+(evento cliente_criado no log e tempos_inicializacao()), e cada chamada feita
+por eles é cronometrada pelos hooks do metricas na sessão.
+"""
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+from logs import obter_log
+from metricas import registrar_chamadas_aws
+
+REGIAO = "us-east-1"
+
+log = obter_log('aws')
+
+CONFIG = Config(
+    region_name=REGIAO,
+    max_pool_connections=int(os.environ.get('PONTO_AWS_MAX_CONEXOES', 32)),
+    connect_timeout=float(os.environ.get('PONTO_AWS_TIMEOUT_CONEXAO', 2)),
+    read_timeout=float(os.environ.get('PONTO_AWS_TIMEOUT_LEITURA', 10)),
+    retries={
+        'total_max_attempts': int(os.environ.get('PONTO_AWS_TENTATIVAS', 3)),
+        'mode': os.environ.get('PONTO_AWS_MODO_RETRY', 'adaptive')
+    },
+    tcp_keepalive=True
+)
+
+_objetos = {}
+_tempos = {}
+_lock = threading.RLock()
+
+def _criar(chave, criar):
+    """Cria e guarda o objeto da chave uma única vez, registrando o tempo gasto"""
+    objeto = _objetos.get(chave)
+    if objeto is not None:
+        return objeto
+    with _lock:
+        if chave not in _objetos:
+            inicio = time.perf_counter()
+            _objetos[chave] = criar()
+            _tempos[chave] = (time.perf_counter() - inicio) * 1000
+            log.info('cliente_criado', chave=chave, ms=round(_tempos[chave], 1))
+        return _objetos[chave]
+
+def _nova_sessao():
+    nova = boto3.session.Session()
+    # Os clientes copiam os hooks da sessão ao serem criados: registrar antes deles
+    registrar_chamadas_aws(nova.events)
+    return nova
+
+def sessao():
+    # A sessão padrão do boto3 não é segura entre threads; esta é criada uma vez, com o lock
+    return _criar('sessao', _nova_sessao)
+
+def cliente(servico):
+    if servico == 'dynamodb':
+        # O resource já tem um cliente; não abre um segundo pool de conexões
+        return recurso('dynamodb').meta.client
+    return _criar(f"cliente {servico}", lambda: sessao().client(servico, config=CONFIG))
+
+def recurso(servico):
+    return _criar(f"recurso {servico}", lambda: sessao().resource(servico, config=CONFIG))
+
+def tabela(nome):
+    return _criar(f"tabela {nome}", lambda: recurso('dynamodb').Table(nome))
+
+def tempos_inicializacao():
+    """ms gastos criando cada cliente/recurso/tabela neste processo"""
+    with _lock:
+        return dict(_tempos)
+
+class SobDemanda:
+    """Repassa atributos ao objeto criado por obter() na primeira vez que é usado"""
+
+    def __init__(self, obter):
+        self._obter = obter
+
+    def __getattr__(self, nome):
+        return getattr(self._obter(), nome)
+
+    def __repr__(self):
+        return f"<SobDemanda {self._obter}>"
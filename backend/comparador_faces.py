@@ -0,0 +1,325 @@
+"""
+Comparadores de faces usados no reconhecimento do registro de ponto.
+
+Interface comum (duck typing, como os repositórios):
+
+    identificar(imagem, empresa_id)  -> (funcionario_id, similaridade) ou
+                                        (None, similaridade); SEM_BASE quando
+                                        não há com o que comparar
+    cadastrar(imagem, funcionario_id, empresa_id, face_id)
+    descartar(funcionario_id, empresa_id)
+
+ComparadorRekognition usa search_faces_by_image (o comportamento de sempre).
+ComparadorEmbeddings guarda os vetores de cada empresa numa matriz NumPy
+contígua e compara por similaridade de cosseno (top-k vetorizado), sem
+chamada de rede por ponto. Os vetores vêm de um extrator configurável
+(PONTO_EXTRATOR_FACES=modulo:funcao, imagem -> vetor ou None sem rosto)
+e ficam guardados por empresa (EmbeddingsFaces). A matriz de uma empresa é
+carregada no primeiro ponto e, quando o cadastro muda (versão do
+diretorio_funcionarios), só os funcionários com face_id diferente são
+relidos; quem saiu do cadastro sai da matriz.
+
+Ligado com PONTO_COMPARADOR=embeddings, para pontos com a empresa do
+token (da empresa ou do quiosque); sem empresa não há reconhecimento. Com PONTO_COMPARADOR_RESERVA=1
+(padrão), foto sem correspondência ainda é procurada no Rekognition, o que
+cobre funcionários cadastrados antes dos vetores. Para gerar os que faltam
+a partir das fotos já enviadas:
+
+    python comparador_faces.py --empresa <id> --extrator modulo:funcao
+"""
+import argparse
+import importlib
+import io
+import os
+import threading
+
+from logs import obter_log
+
+# O NumPy só é importado quando um ComparadorEmbeddings é criado (carregar_numpy)
+np = None
+
+COMPARADOR = os.environ.get('PONTO_COMPARADOR', 'rekognition')
+EXTRATOR = os.environ.get('PONTO_EXTRATOR_FACES')
+# Similaridade de cosseno mínima para aceitar o mais parecido
+LIMIAR_SIMILARIDADE = float(os.environ.get('PONTO_COMPARADOR_LIMIAR', 0.6))
+USAR_RESERVA = os.environ.get('PONTO_COMPARADOR_RESERVA', '1') == '1'
+TOP_K = 5
+
+SEM_BASE = (None, None)
+
+log = obter_log('comparador')
+
+def carregar_numpy():
+    """Módulo numpy, importado no primeiro uso (None se não estiver instalado)"""
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:  # NumPy não instalado: só o ComparadorRekognition funciona
+            return None
+    return np
+
+def carregar_extrator(caminho=None):
+    """Função 'modulo:funcao' que transforma os bytes da foto num vetor"""
+    caminho = caminho or EXTRATOR
+    if not caminho:
+        return None
+    modulo, _, funcao = caminho.partition(':')
+    return getattr(importlib.import_module(modulo), funcao)
+
+def extrator_miniatura(imagem):
+    """
+    Miniatura 32x32 em tons de cinza centrada na média.
+
+    Não reconhece rostos: serve só para testes e benchmarks offline com o
+    repositório em memória, sem um modelo de faces instalado.
+    """
+    from PIL import Image
+    carregar_numpy()
+    with Image.open(io.BytesIO(imagem)) as foto:
+        foto.draft('L', (128, 128))
+        pixels = np.asarray(foto.convert('L').resize((32, 32)), dtype=np.float32).ravel()
+    return pixels - pixels.mean()
+
+def para_bytes(vetor):
+    """Vetor normalizado (norma 1) em float32, como é guardado"""
+    vetor = np.asarray(vetor, dtype=np.float32).ravel()
+    norma = float(np.linalg.norm(vetor))
+    return (vetor / norma if norma else vetor).tobytes()
+
+def de_bytes(dados):
+    # Atributos binários do DynamoDB chegam como boto3 Binary
+    return np.frombuffer(bytes(getattr(dados, 'value', dados)), dtype=np.float32)
+
+class ComparadorRekognition:
+    def __init__(self, faces):
+        self._faces = faces
+
+    def identificar(self, imagem, empresa_id):
+        return self._faces.reconhecer(imagem, empresa_id), None
+
+    def cadastrar(self, imagem, funcionario_id, empresa_id, face_id):
+        pass  # index_faces já foi feito pelo repositório de faces
+
+    def descartar(self, funcionario_id, empresa_id):
+        pass
+
+class _Matriz:
+    """Vetores de uma empresa em linhas contíguas; remoção troca com a última linha"""
+
+    def __init__(self):
+        self.dados = None
+        self.tamanho = 0
+        self.ids = []
+        self.face_ids = {}
+        self.posicao = {}
+        self.cadastro = None  # dict do diretório usado na última sincronização
+
+    def colocar(self, funcionario_id, face_id, vetor):
+        if self.dados is None:
+            self.dados = np.empty((16, len(vetor)), dtype=np.float32)
+        elif len(vetor) != self.dados.shape[1]:
+            log.aviso('dimensao_invalida', funcionario_id=funcionario_id, dimensao=len(vetor),
+                      esperada=self.dados.shape[1])
+            return
+        linha = self.posicao.get(funcionario_id)
+        if linha is None:
+            if self.tamanho == len(self.dados):
+                self.dados = np.concatenate([self.dados, np.empty_like(self.dados)])
+            linha = self.tamanho
+            self.tamanho += 1
+            self.ids.append(funcionario_id)
+            self.posicao[funcionario_id] = linha
+        self.dados[linha] = vetor
+        self.face_ids[funcionario_id] = face_id
+
+    def tirar(self, funcionario_id):
+        linha = self.posicao.pop(funcionario_id, None)
+        if linha is None:
+            return
+        self.face_ids.pop(funcionario_id, None)
+        ultima = self.tamanho - 1
+        if linha != ultima:
+            self.dados[linha] = self.dados[ultima]
+            self.ids[linha] = self.ids[ultima]
+            self.posicao[self.ids[linha]] = linha
+        self.ids.pop()
+        self.tamanho = ultima
+
+    def mais_parecidos(self, vetor, k):
+        """[(funcionario_id, similaridade)] dos k mais parecidos, do maior para o menor"""
+        similaridades = self.dados[:self.tamanho] @ vetor
+        k = min(k, self.tamanho)
+        melhores = np.argpartition(similaridades, -k)[-k:]
+        melhores = melhores[np.argsort(similaridades[melhores])[::-1]]
+        return [(self.ids[linha], float(similaridades[linha])) for linha in melhores]
+
+class ComparadorEmbeddings:
+    def __init__(self, extrator, armazenamento, diretorio, limiar=None, k=TOP_K):
+        if carregar_numpy() is None:
+            raise RuntimeError('PONTO_COMPARADOR=embeddings precisa do NumPy (pip install -r requirements.txt)')
+        self._extrator = extrator
+        self._armazenamento = armazenamento
+        self._diretorio = diretorio
+        self._limiar = LIMIAR_SIMILARIDADE if limiar is None else limiar
+        self._k = k
+        self._matrizes = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def vetor(self, imagem):
+        """Vetor normalizado da foto, ou None se o extrator não achou rosto"""
+        vetor = self._extrator(imagem)
+        return None if vetor is None else de_bytes(para_bytes(vetor))
+
+    def _lock_empresa(self, empresa_id):
+        with self._lock:
+            return self._locks.setdefault(empresa_id, threading.Lock())
+
+    def matriz(self, empresa_id):
+        """Matriz da empresa sincronizada com o cadastro atual"""
+        cadastro = self._diretorio.funcionarios(empresa_id)
+        matriz = self._matrizes.get(empresa_id)
+        if matriz is not None and matriz.cadastro is cadastro:
+            return matriz
+        with self._lock_empresa(empresa_id):
+            matriz = self._matrizes.get(empresa_id)
+            if matriz is None:
+                matriz = _Matriz()
+                for item in self._armazenamento.listar(empresa_id):
+                    matriz.colocar(item['funcionario_id'], item['face_id'], de_bytes(item['vetor']))
+                log.info('matriz_carregada', empresa_id=empresa_id, vetores=matriz.tamanho)
+            elif matriz.cadastro is not cadastro:
+                self._atualizar(matriz, empresa_id, cadastro)
+            # Fora do cadastro, ou vetor de uma face que já foi trocada
+            for funcionario_id in [
+                f for f in matriz.ids
+                if f not in cadastro or cadastro[f].get('face_id') != matriz.face_ids[f]
+            ]:
+                matriz.tirar(funcionario_id)
+            matriz.cadastro = cadastro
+            self._matrizes[empresa_id] = matriz
+        return matriz
+
+    def _atualizar(self, matriz, empresa_id, cadastro):
+        alterados = [
+            funcionario_id for funcionario_id, funcionario in cadastro.items()
+            if funcionario.get('face_id') and matriz.face_ids.get(funcionario_id) != funcionario['face_id']
+        ]
+        if not alterados:
+            return
+        for item in self._armazenamento.obter_varios(empresa_id, alterados):
+            matriz.colocar(item['funcionario_id'], item['face_id'], de_bytes(item['vetor']))
+        log.info('matriz_atualizada', empresa_id=empresa_id, relidos=len(alterados))
+
+    def identificar(self, imagem, empresa_id):
+        matriz = self.matriz(empresa_id)
+        if not matriz.tamanho:
+            return SEM_BASE
+        vetor = self.vetor(imagem)
+        if vetor is None:
+            return None, None
+        with self._lock_empresa(empresa_id):
+            # colocar() pode trocar o array; a busca usa a matriz inteira de uma vez
+            candidatos = matriz.mais_parecidos(vetor, self._k)
+        funcionario_id, similaridade = candidatos[0]
+        if similaridade < self._limiar:
+            return None, similaridade
+        return funcionario_id, similaridade
+
+    def cadastrar(self, imagem, funcionario_id, empresa_id, face_id):
+        vetor = self._extrator(imagem)
+        if vetor is None:
+            log.aviso('sem_rosto', funcionario_id=funcionario_id)
+            return
+        self._armazenamento.salvar(empresa_id, funcionario_id, face_id, para_bytes(vetor))
+
+    def descartar(self, funcionario_id, empresa_id):
+        self._armazenamento.remover(empresa_id, funcionario_id)
+
+class FacesComComparador:
+    """
+    Repositório de faces cujo reconhecer() passa pelo comparador; indexação
+    e remoção continuam no repositório original (e no Rekognition)
+    """
+
+    def __init__(self, faces, comparador, usar_reserva=None):
+        self._faces = faces
+        self.comparador = comparador
+        self._usar_reserva = USAR_RESERVA if usar_reserva is None else usar_reserva
+
+    def __getattr__(self, nome):
+        return getattr(self._faces, nome)
+
+    def reconhecer(self, imagem, empresa_id=None):
+        if not empresa_id:
+            return self._faces.reconhecer(imagem, empresa_id)
+        try:
+            resultado = self.comparador.identificar(imagem, empresa_id)
+        except Exception as e:
+            log.erro('identificar', erro=e)
+            resultado = SEM_BASE
+        funcionario_id, similaridade = resultado
+        if funcionario_id:
+            log.debug('reconhecido', funcionario_id=funcionario_id, similaridade=round(similaridade, 3))
+            return funcionario_id
+        if resultado is SEM_BASE or self._usar_reserva:
+            return self._faces.reconhecer(imagem, empresa_id)
+        return None
+
+    def indexar(self, imagem, funcionario_id, empresa_id, atributos="DEFAULT"):
+        face_id = self._faces.indexar(imagem, funcionario_id, empresa_id, atributos)
+        if face_id:
+            try:
+                self.comparador.cadastrar(imagem, funcionario_id, empresa_id, face_id)
+            except Exception as e:
+                log.erro('gravar_vetor', erro=e, funcionario_id=funcionario_id)
+        return face_id
+
+    def remover_do_funcionario(self, funcionario, manter=None):
+        self._faces.remover_do_funcionario(funcionario, manter=manter)
+        if manter is None:
+            # Troca de foto (manter=face nova) já regravou o vetor em indexar()
+            self.comparador.descartar(funcionario['id'], funcionario.get('empresa_id'))
+
+def criar_faces(faces, armazenamento, diretorio):
+    """Repositório de faces conforme PONTO_COMPARADOR"""
+    if COMPARADOR == 'rekognition':
+        return faces
+    if COMPARADOR != 'embeddings':
+        raise ValueError(f"PONTO_COMPARADOR inválido: {COMPARADOR}")
+    extrator = carregar_extrator()
+    if extrator is None:
+        raise ValueError('PONTO_COMPARADOR=embeddings precisa de PONTO_EXTRATOR_FACES=modulo:funcao')
+    return FacesComComparador(faces, ComparadorEmbeddings(extrator, armazenamento, diretorio))
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os vetores que faltam a partir das fotos no S3")
+    parser.add_argument('--empresa', required=True)
+    parser.add_argument('--extrator', default=EXTRATOR, help="modulo:funcao (padrão: PONTO_EXTRATOR_FACES)")
+    args = parser.parse_args()
+
+    from repositorios import obter_repositorios
+
+    extrator = carregar_extrator(args.extrator)
+    if extrator is None:
+        print("❌ Informe o extrator (--extrator modulo:funcao)")
+        return
+    repos = obter_repositorios()
+    comparador = ComparadorEmbeddings(extrator, repos.embeddings, repos.diretorio)
+    existentes = {item['funcionario_id']: item['face_id'] for item in repos.embeddings.listar(args.empresa)}
+    gerados = falhas = 0
+    for funcionario in repos.funcionarios.listar_empresa(args.empresa):
+        if not funcionario.get('face_id') or existentes.get(funcionario['id']) == funcionario['face_id']:
+            continue
+        try:
+            imagem = repos.fotos.baixar(funcionario['foto_url'])
+            comparador.cadastrar(imagem, funcionario['id'], args.empresa, funcionario['face_id'])
+            gerados += 1
+        except Exception as e:
+            falhas += 1
+            print(f"❌ {funcionario['id']}: {str(e)}")
+    print(f"✅ {gerados} vetores gerados, {falhas} falhas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script para criar as tabelas auxiliares e os índices do DynamoDB usados pela API (idempotente)
+"""
+import time
+
+from aws_utils import (
+    TABELA_FUNC, TABELA_REG, TABELA_ESTADO_PONTO, TABELA_HORAS_DIARIAS, TABELA_VERSOES_EMPRESA,
+    TABELA_EMBEDDINGS, INDICE_REGISTROS_EMPRESA, INDICE_REGISTROS_ID, INDICE_FUNCIONARIOS_EMPRESA
+)
+from clientes_aws import cliente
+
+client = cliente('dynamodb')
+
+def criar_tabela(tabela, chave_particao, chave_ordenacao=None):
+    """Cria uma tabela sob demanda (PAY_PER_REQUEST) caso ainda não exista"""
+    try:
+        client.describe_table(TableName=tabela)
+        print(f"✅ Tabela {tabela} já existe")
+        return
+    except client.exceptions.ResourceNotFoundException:
+        pass
+
+    key_schema = [{'AttributeName': chave_particao, 'KeyType': 'HASH'}]
+    atributos = [{'AttributeName': chave_particao, 'AttributeType': 'S'}]
+    if chave_ordenacao:
+        key_schema.append({'AttributeName': chave_ordenacao, 'KeyType': 'RANGE'})
+        atributos.append({'AttributeName': chave_ordenacao, 'AttributeType': 'S'})
+
+    client.create_table(
+        TableName=tabela,
+        KeySchema=key_schema,
+        AttributeDefinitions=atributos,
+        BillingMode='PAY_PER_REQUEST'
+    )
+    print(f"🚀 Criando tabela {tabela}...")
+    client.get_waiter('table_exists').wait(TableName=tabela)
+    print(f"✅ Tabela {tabela} criada")
+
+def indices_existentes(tabela):
+    descricao = client.describe_table(TableName=tabela)['Table']
+    return {indice['IndexName'] for indice in descricao.get('GlobalSecondaryIndexes', [])}, descricao
+
+def criar_indice(tabela, nome_indice, chave_particao, chave_ordenacao=None):
+    """Cria um GSI com projeção ALL caso ainda não exista"""
+    existentes, descricao = indices_existentes(tabela)
+    if nome_indice in existentes:
+        print(f"✅ Índice {nome_indice} já existe em {tabela}")
+        return
+
+    key_schema = [{'AttributeName': chave_particao, 'KeyType': 'HASH'}]
+    atributos = [{'AttributeName': chave_particao, 'AttributeType': 'S'}]
+    if chave_ordenacao:
+        key_schema.append({'AttributeName': chave_ordenacao, 'KeyType': 'RANGE'})
+        atributos.append({'AttributeName': chave_ordenacao, 'AttributeType': 'S'})
+
+    indice = {
+        'IndexName': nome_indice,
+        'KeySchema': key_schema,
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+    # Tabelas provisionadas exigem throughput no índice
+    if descricao.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+        indice['ProvisionedThroughput'] = {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+
+    client.update_table(
+        TableName=tabela,
+        AttributeDefinitions=atributos,
+        GlobalSecondaryIndexUpdates=[{'Create': indice}]
+    )
+    print(f"🚀 Criando índice {nome_indice} em {tabela}...")
+    aguardar_indices(tabela)
+
+def aguardar_indices(tabela, intervalo=15):
+    """O DynamoDB só aceita uma criação de GSI por vez; espera todos ficarem ACTIVE"""
+    while True:
+        descricao = client.describe_table(TableName=tabela)['Table']
+        pendentes = [
+            indice['IndexName'] for indice in descricao.get('GlobalSecondaryIndexes', [])
+            if indice.get('IndexStatus') != 'ACTIVE'
+        ]
+        if not pendentes:
+            print(f"✅ Índices de {tabela} ativos")
+            return
+        print(f"⏳ Aguardando backfill: {', '.join(pendentes)}")
+        time.sleep(intervalo)
+
+def main():
+    print("🔧 Configurando DynamoDB...")
+    criar_tabela(TABELA_ESTADO_PONTO, 'funcionario_id')
+    criar_tabela(TABELA_HORAS_DIARIAS, 'empresa_id', 'dia_funcionario')
+    criar_tabela(TABELA_VERSOES_EMPRESA, 'empresa_id')
+    criar_tabela(TABELA_EMBEDDINGS, 'empresa_id', 'funcionario_id')
+    criar_indice(TABELA_REG, INDICE_REGISTROS_EMPRESA, 'empresa_id', 'data_hora')
+    criar_indice(TABELA_REG, INDICE_REGISTROS_ID, 'registro_id')
+    criar_indice(TABELA_FUNC, INDICE_FUNCIONARIOS_EMPRESA, 'empresa_id')
+    print("\n✅ Concluído!")
+
+if __name__ == "__main__":
+    main()
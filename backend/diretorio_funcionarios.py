@@ -0,0 +1,126 @@
+"""
+Cache em processo do cadastro de funcionários de cada empresa.
+
+Cada empresa ocupa uma entrada de um LRU limitado (PONTO_CACHE_EMPRESAS,
+padrão 64) que expira após PONTO_CACHE_TTL segundos (padrão 300; 0 desliga
+o cache). A entrada guarda a versão do cadastro lida antes da carga: a cada
+acesso a versão é relida (uma leitura de um item pequeno) e, se outra
+instância alterou o cadastro, a empresa é recarregada.
+
+As rotas que alteram funcionários chamam aplicar(empresa_id, salvos,
+excluidos) depois de gravar: a versão é incrementada e os itens gravados ou
+excluídos entram na entrada local, sem reler o índice da empresa. A carga
+vem do GSI empresa_id-index, que é eventualmente consistente: uma carga
+feita até ATRASO_INDICE segundos depois da última alteração (alterado_em,
+gravado junto com a versão) pode não ter a alteração e expira ao fim desse
+prazo, em vez de ficar o TTL inteiro.
+
+obter(funcionario_id) não usa o cache: é uma leitura consistente do item.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from indice_nomes import IndiceNomes
+
+# Segundos após uma alteração em que o GSI ainda pode devolver a lista antiga
+ATRASO_INDICE = 10
+
+class _Entrada:
+    def __init__(self, versao, funcionarios, expira_em):
+        self.versao = versao
+        self.funcionarios = funcionarios
+        self.expira_em = expira_em
+        self.indice = None
+
+class DiretorioFuncionarios:
+    def __init__(self, repositorio, ttl=None, max_empresas=None):
+        self._repositorio = repositorio
+        self._ttl = float(os.environ.get('PONTO_CACHE_TTL', 300) if ttl is None else ttl)
+        self._max_empresas = int(os.environ.get('PONTO_CACHE_EMPRESAS', 64) if max_empresas is None else max_empresas)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _carregar(self, empresa_id):
+        # A versão é lida antes dos itens: uma alteração durante a carga força recarregar depois
+        versao, alterado_em = self._repositorio.versao_empresa(empresa_id)
+        funcionarios = {f['id']: f for f in self._repositorio.listar_empresa(empresa_id)}
+        validade = self._ttl
+        idade = time.time() - alterado_em
+        if idade < ATRASO_INDICE:
+            validade = min(validade, max(0.0, ATRASO_INDICE - idade))
+        return _Entrada(versao, funcionarios, time.monotonic() + validade)
+
+    def _guardar(self, empresa_id, entrada):
+        with self._lock:
+            self._entradas[empresa_id] = entrada
+            while len(self._entradas) > self._max_empresas:
+                self._entradas.popitem(last=False)
+
+    def _entrada_valida(self, empresa_id):
+        with self._lock:
+            entrada = self._entradas.get(empresa_id)
+            if entrada:
+                self._entradas.move_to_end(empresa_id)
+        if not entrada or entrada.expira_em < time.monotonic():
+            return None
+        if self._repositorio.versao_empresa(empresa_id)[0] != entrada.versao:
+            return None
+        return entrada
+
+    def funcionarios(self, empresa_id):
+        """
+        Funcionários da empresa por id.
+
+        O dicionário é compartilhado entre requisições: não alterar os itens.
+        """
+        return self._entrada(empresa_id).funcionarios
+
+    def indice_nomes(self, empresa_id):
+        """Índice de nomes da empresa, montado na primeira busca após cada carga"""
+        entrada = self._entrada(empresa_id)
+        if entrada.indice is None:
+            entrada.indice = IndiceNomes(entrada.funcionarios.values())
+        return entrada.indice
+
+    def _entrada(self, empresa_id):
+        if self._ttl <= 0:
+            return self._carregar(empresa_id)
+        entrada = self._entrada_valida(empresa_id)
+        if entrada is None:
+            entrada = self._carregar(empresa_id)
+            self._guardar(empresa_id, entrada)
+        return entrada
+
+    def obter(self, funcionario_id):
+        """Funcionário pelo id: um GetItem consistente, sem carregar a empresa"""
+        return self._repositorio.obter(funcionario_id)
+
+    def aplicar(self, empresa_id, salvos=(), excluidos=()):
+        """
+        Chamado após gravar funcionários da empresa: salvos são os itens
+        completos gravados, excluidos os ids removidos
+        """
+        versao = self._repositorio.incrementar_versao_empresa(empresa_id)
+        with self._lock:
+            entrada = self._entradas.get(empresa_id)
+            if entrada is None:
+                return
+            if entrada.versao != versao - 1:
+                # Outra instância alterou a empresa desde a carga: recarrega no próximo acesso
+                del self._entradas[empresa_id]
+                return
+            # Cópia: requisições em andamento podem estar percorrendo o dicionário atual
+            funcionarios = dict(entrada.funcionarios)
+            for funcionario in salvos:
+                funcionarios[funcionario['id']] = funcionario
+            for funcionario_id in excluidos:
+                funcionarios.pop(funcionario_id, None)
+            self._entradas[empresa_id] = _Entrada(versao, funcionarios, entrada.expira_em)
+
+    def invalidar(self, empresa_id):
+        """Descarta a empresa aqui e nas outras instâncias (alteração sem os itens em mãos)"""
+        self._repositorio.incrementar_versao_empresa(empresa_id)
+        with self._lock:
+            self._entradas.pop(empresa_id, None)
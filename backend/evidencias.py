@@ -0,0 +1,129 @@
+"""
+Arquivo das fotos de registro de ponto (evidência em caso de contestação).
+
+registrar_ponto só entrega a foto e o registro a repos.evidencias e
+responde ao quiosque; o envio ao S3 e o foto_url no registro são feitos
+depois, em lotes, por um consumidor da fila:
+
+    aws      fila SQS (PONTO_FILA_EVIDENCIAS) lida pela função
+             evidencias.lambda_handler (template.yaml)
+    local    fila em memória com uma thread que consome em segundo plano
+             (modo memoria, desenvolvimento, ou aws sem a fila configurada)
+
+As fotos são reduzidas para PONTO_EVIDENCIA_LADO px (padrão 640) antes de
+entrar na fila: bastam para identificar a pessoa e cabem numa mensagem SQS.
+"""
+import base64
+import json
+import os
+import queue
+import threading
+
+from imagens import normalizar_imagem
+from logs import obter_log
+from paralelo import executar
+
+LADO_EVIDENCIA = int(os.environ.get('PONTO_EVIDENCIA_LADO', 640))
+QUALIDADE_EVIDENCIA = 75
+# Itens arquivados juntos (o SQS entrega no máximo 10 mensagens por lote)
+TAMANHO_LOTE = 10
+# Quanto a thread local espera por mais itens antes de arquivar um lote incompleto
+ESPERA_LOTE_SEGUNDOS = 0.2
+# Fila local cheia descarta a evidência em vez de atrasar o ponto
+MAXIMO_FILA_LOCAL = 256
+
+CAMPOS_REGISTRO = ('registro_id', 'funcionario_id', 'data_hora', 'empresa_id')
+
+log = obter_log('evidencia')
+
+def reduzir_foto(imagem):
+    return normalizar_imagem(imagem, LADO_EVIDENCIA, QUALIDADE_EVIDENCIA)
+
+def nome_arquivo(registro):
+    return f"registros/{registro.get('empresa_id') or 'sem_empresa'}/{registro['data_hora'][:10]}/{registro['registro_id']}.jpg"
+
+def arquivar_lote(repos, itens):
+    """
+    Envia as fotos ao S3 e grava o foto_url nos registros, tudo em paralelo.
+
+    itens: [(registro, imagem)]. Retorna a lista de falhas, na mesma ordem,
+    com a exceção de cada item ou None quando ele foi arquivado.
+    """
+    def arquivar(registro, imagem):
+        try:
+            foto_url = repos.fotos.enviar(imagem, nome_arquivo(registro))
+            if not repos.registros.vincular_foto(registro, foto_url):
+                log.aviso('registro_inexistente', registro_id=registro['registro_id'], foto_url=foto_url)
+        except Exception as e:
+            log.erro('arquivar', erro=e, registro_id=registro['registro_id'])
+            return e
+        return None
+
+    falhas = executar(*[lambda r=registro, i=imagem: arquivar(r, i) for registro, imagem in itens])
+    log.info('lote_arquivado', fotos=len(itens), falhas=sum(1 for f in falhas if f))
+    return falhas
+
+class FilaEvidenciasLocal:
+    """Fila em memória consumida por uma thread daemon, iniciada no primeiro item"""
+
+    def __init__(self, repos):
+        self._repos = repos
+        self._fila = queue.Queue(maxsize=MAXIMO_FILA_LOCAL)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enfileirar(self, registro, imagem):
+        try:
+            self._fila.put_nowait(({campo: registro.get(campo) for campo in CAMPOS_REGISTRO}, imagem))
+        except queue.Full:
+            log.aviso('fila_cheia', registro_id=registro['registro_id'])
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._consumir, name='evidencias', daemon=True)
+                    self._thread.start()
+
+    def aguardar(self):
+        """Bloqueia até a fila esvaziar (testes e benchmarks)"""
+        self._fila.join()
+
+    def _consumir(self):
+        while True:
+            lote = [self._fila.get()]
+            try:
+                while len(lote) < TAMANHO_LOTE:
+                    lote.append(self._fila.get(timeout=ESPERA_LOTE_SEGUNDOS))
+            except queue.Empty:
+                pass
+            try:
+                arquivar_lote(self._repos, [(registro, reduzir_foto(imagem)) for registro, imagem in lote])
+            except Exception as e:
+                log.erro('lote', erro=e)
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+def codificar_mensagem(registro, imagem):
+    return json.dumps({
+        'registro': {campo: registro.get(campo) for campo in CAMPOS_REGISTRO},
+        'foto': base64.b64encode(imagem).decode('ascii')
+    })
+
+def decodificar_mensagem(corpo):
+    mensagem = json.loads(corpo)
+    return mensagem['registro'], base64.b64decode(mensagem['foto'])
+
+def lambda_handler(event, context):
+    """Consumidor da fila SQS; devolve as mensagens com falha para nova tentativa"""
+    from repositorios import obter_repositorios
+
+    registros = event.get('Records', [])
+    itens = [decodificar_mensagem(record['body']) for record in registros]
+    falhas = arquivar_lote(obter_repositorios(), itens)
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': record['messageId']}
+            for record, falha in zip(registros, falhas) if falha
+        ]
+    }
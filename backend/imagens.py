@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Normalização das fotos antes do Rekognition e do S3.
+
+Aplica a orientação do EXIF, reduz o maior lado para PONTO_FOTO_LADO_MAXIMO
+(padrão 1280 px) e regrava em JPEG com PONTO_FOTO_QUALIDADE (padrão 85).
+Sem o Pillow instalado, ou se a imagem não puder ser lida, os bytes seguem
+sem alteração (o Rekognition é quem recusa imagens inválidas); a falta do
+Pillow sai uma vez no log como WARNING e cada foto nessa situação conta em
+FotosSemNormalizar. Bytes recebidos e economizados vão para as métricas da
+rota (FotoBytesOriginais, FotoBytesEconomizados; ver metricas.py).
+
+Para comparar configurações em fotos reais:
+    python imagens.py fotos/*.jpg --lado 1024 --qualidade 80
+"""
+import argparse
+import io
+import os
+import threading
+import time
+
+from logs import obter_log
+from metricas import contar
+
+# O Pillow só é importado na primeira foto (carregar_pillow), fora do cold start
+Image = ImageOps = None
+_pillow_carregado = False
+
+LADO_MAXIMO = int(os.environ.get('PONTO_FOTO_LADO_MAXIMO', 1280))
+QUALIDADE_JPEG = int(os.environ.get('PONTO_FOTO_QUALIDADE', 85))
+
+ORIENTACAO_EXIF = 0x0112
+
+log = obter_log('imagem')
+
+_totais = {'imagens': 0, 'bytes_originais': 0, 'bytes_finais': 0, 'ms': 0.0}
+_lock = threading.Lock()
+
+def carregar_pillow():
+    """Módulo PIL.Image, importado no primeiro uso (None sem o Pillow instalado)"""
+    global Image, ImageOps, _pillow_carregado
+    if not _pillow_carregado:
+        with _lock:
+            if not _pillow_carregado:
+                try:
+                    from PIL import Image, ImageOps
+                except ImportError:  # Pillow não instalado: a normalização vira no-op
+                    log.aviso('pillow_ausente', mensagem="Pillow não instalado: fotos seguem sem normalização "
+                              "(clean_and_rebuild.py instala a versão para o Lambda)")
+                _pillow_carregado = True
+    return Image
+
+def _converter(dados, lado_maximo, qualidade):
+    """Bytes JPEG normalizados, ou os originais se não houver ganho"""
+    with Image.open(io.BytesIO(dados)) as original:
+        formato = original.format
+        if formato == 'JPEG' and max(original.size) > lado_maximo:
+            # Decodifica o JPEG já em escala reduzida (bem mais rápido que reduzir depois)
+            original.draft('RGB', (lado_maximo, lado_maximo))
+        girada = original.getexif().get(ORIENTACAO_EXIF, 1) != 1
+        foto = ImageOps.exif_transpose(original) if girada else original
+        reduzir = max(foto.size) > lado_maximo
+        if formato == 'JPEG' and not girada and not reduzir and len(dados) < 200 * 1024:
+            return dados, foto.size  # Já pequena e na orientação certa
+        if foto.mode != 'RGB':
+            foto = foto.convert('RGB')
+        if reduzir:
+            foto.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+        saida = io.BytesIO()
+        foto.save(saida, 'JPEG', quality=qualidade, optimize=True)
+    convertida = saida.getvalue()
+    if formato == 'JPEG' and not girada and not reduzir and len(convertida) >= len(dados):
+        return dados, foto.size
+    return convertida, foto.size
+
+def normalizar_imagem(dados, lado_maximo=None, qualidade=None):
+    """Devolve os bytes da foto normalizada e registra a economia e o tempo gasto"""
+    if not dados:
+        return dados
+    if carregar_pillow() is None:
+        contar('FotosSemNormalizar')
+        return dados
+    inicio = time.perf_counter()
+    try:
+        resultado, tamanho = _converter(dados, lado_maximo or LADO_MAXIMO, qualidade or QUALIDADE_JPEG)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        log.aviso('foto_sem_normalizar', erro=str(e), bytes=len(dados))
+        contar('FotosSemNormalizar')
+        return dados
+    ms = (time.perf_counter() - inicio) * 1000
+    contar('FotoBytesOriginais', len(dados), 'Bytes')
+    contar('FotoBytesEconomizados', len(dados) - len(resultado), 'Bytes')
+
+    with _lock:
+        _totais['imagens'] += 1
+        _totais['bytes_originais'] += len(dados)
+        _totais['bytes_finais'] += len(resultado)
+        _totais['ms'] += ms
+    log.debug('foto_normalizada', bytes_originais=len(dados), bytes_finais=len(resultado),
+              largura=tamanho[0], altura=tamanho[1], ms=round(ms, 1))
+    return resultado
+
+def estatisticas():
+    """Totais acumulados desde o início do processo"""
+    with _lock:
+        return dict(_totais, bytes_economizados=_totais['bytes_originais'] - _totais['bytes_finais'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a normalização de fotos com outros parâmetros")
+    parser.add_argument('fotos', nargs='+')
+    parser.add_argument('--lado', type=int, default=LADO_MAXIMO)
+    parser.add_argument('--qualidade', type=int, default=QUALIDADE_JPEG)
+    args = parser.parse_args()
+
+    if carregar_pillow() is None:
+        print("❌ Pillow não instalado (pip install -r requirements.txt)")
+        return
+    for caminho in args.fotos:
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+        inicio = time.perf_counter()
+        resultado = normalizar_imagem(dados, args.lado, args.qualidade)
+        economia = 100 * (1 - len(resultado) / len(dados)) if dados else 0
+        print(f"📷 {caminho}: {len(dados)} -> {len(resultado)} bytes ({economia:.0f}% menor) "
+              f"em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    totais = estatisticas()
+    print(f"\n✅ {totais['imagens']} fotos, {totais['bytes_economizados']} bytes economizados, "
+          f"{totais['ms']:.1f} ms no total")
+
+if __name__ == "__main__":
+    main()
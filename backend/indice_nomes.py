@@ -0,0 +1,107 @@
+"""
+Índice de nomes de funcionários para o autocomplete, sem acento e sem caixa.
+
+Cada nome normalizado ("João da Silva" -> "joao da silva") gera entradas
+por prefixo do nome inteiro, por prefixo de cada palavra e por trigrama.
+As listas de prefixo ficam em ordem alfabética, então a busca só percorre
+o necessário para preencher o top-k:
+
+1. nomes que começam com a consulta;
+2. nomes em que cada palavra digitada é prefixo de alguma palavra do nome;
+3. se nada casou por prefixo, nomes que compartilham mais trigramas com a
+   consulta (erros de digitação, trechos no meio da palavra).
+"""
+import unicodedata
+from collections import defaultdict
+
+# Fração mínima dos trigramas da consulta presentes no nome
+SIMILARIDADE_MINIMA = 0.5
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e só letras/dígitos separados por um espaço"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acento = ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in sem_acento).split())
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def _adicionar(lista, funcionario_id):
+    # Os ids chegam em ordem alfabética; evita repetir o mesmo id em seguida
+    if not lista or lista[-1] != funcionario_id:
+        lista.append(funcionario_id)
+
+class IndiceNomes:
+    def __init__(self, funcionarios):
+        self._nomes = {}
+        self._normalizados = {}
+        for funcionario in funcionarios:
+            self._nomes[funcionario['id']] = funcionario.get('nome', '')
+            self._normalizados[funcionario['id']] = normalizar(funcionario.get('nome', ''))
+        self._ordem = sorted(self._nomes, key=lambda fid: (self._normalizados[fid], fid))
+
+        self._inicios = defaultdict(list)
+        self._prefixos = defaultdict(list)
+        self._trigramas = defaultdict(set)
+        for funcionario_id in self._ordem:
+            normalizado = self._normalizados[funcionario_id]
+            for fim in range(1, len(normalizado) + 1):
+                self._inicios[normalizado[:fim]].append(funcionario_id)
+            for palavra in normalizado.split():
+                for fim in range(1, len(palavra) + 1):
+                    _adicionar(self._prefixos[palavra[:fim]], funcionario_id)
+            for trigrama in _trigramas(f" {normalizado} "):
+                self._trigramas[trigrama].add(funcionario_id)
+
+    def _resultado(self, ids):
+        return [{'id': funcionario_id, 'nome': self._nomes[funcionario_id]} for funcionario_id in ids]
+
+    def buscar(self, consulta, limite=10):
+        """Até `limite` funcionários mais parecidos com a consulta: [{'id', 'nome'}]"""
+        consulta = normalizar(consulta)
+        if not consulta:
+            return self._resultado(self._ordem[:limite])
+
+        encontrados = self._inicios.get(consulta, [])[:limite]
+        if len(encontrados) == limite:
+            return self._resultado(encontrados)
+
+        # Percorre a lista da palavra mais rara e confere as demais
+        palavras = consulta.split()
+        listas = [self._prefixos.get(palavra, []) for palavra in palavras]
+        ja_incluidos = set(encontrados)
+        for funcionario_id in min(listas, key=len):
+            if funcionario_id in ja_incluidos:
+                continue
+            palavras_nome = self._normalizados[funcionario_id].split()
+            if all(any(p.startswith(palavra) for p in palavras_nome) for palavra in palavras):
+                encontrados.append(funcionario_id)
+                if len(encontrados) == limite:
+                    break
+        if encontrados:
+            return self._resultado(encontrados)
+
+        trigramas = _trigramas(f" {consulta} ")
+        contagem = defaultdict(int)
+        for trigrama in trigramas:
+            for funcionario_id in self._trigramas.get(trigrama, ()):
+                contagem[funcionario_id] += 1
+        minimo = SIMILARIDADE_MINIMA * len(trigramas)
+        parecidos = sorted(
+            (fid for fid, total in contagem.items() if total >= minimo),
+            key=lambda fid: (-contagem[fid], self._normalizados[fid])
+        )
+        return self._resultado(parecidos[:limite])
+
+    def contem(self, trecho):
+        """Ids cujo nome contém o trecho, ignorando acentos e maiúsculas"""
+        trecho = normalizar(trecho)
+        if not trecho:
+            return set(self._nomes)
+        candidatos = None
+        for trigrama in _trigramas(trecho):
+            ids = self._trigramas.get(trigrama, set())
+            candidatos = ids if candidatos is None else candidatos & ids
+        if candidatos is None:
+            candidatos = self._nomes  # Trecho com menos de 3 caracteres
+        return {fid for fid in candidatos if trecho in self._normalizados[fid]}
@@ -1,123 +1,159 @@
+"""
+Adaptador entre o evento do API Gateway (integração proxy REST) e o Flask (WSGI).
+
+O environ é montado numa passada só pelos headers do evento e o corpo
+segue como veio: base64 só é decodificado quando isBase64Encoded, texto é
+codificado uma vez para o wsgi.input. Na volta o corpo da resposta não é
+convertido para texto à força: tipos textuais (JSON, text/*) voltam como
+texto e o resto (XLSX, imagens, gzip) volta em base64 com isBase64Encoded,
+o que o API Gateway exige para respostas binárias (BinaryMediaTypes no
+template.yaml).
+
+Custo do adaptador por requisição: python benchmark_adapter.py
+"""
 import base64
 import json
-from urllib.parse import unquote_plus
+import sys
+import time
 from io import BytesIO
+from urllib.parse import unquote_to_bytes, urlencode
+
+from logs import obter_log
+from paralelo import CHAVE_PRAZO
+
+# Folga deixada para montar e devolver a resposta quando o prazo acaba
+FOLGA_PRAZO_SEGUNDOS = 0.5
+
+# Respostas que voltam como texto; qualquer outro tipo vai em base64
+TIPOS_TEXTO = ('text/', 'application/json', 'application/javascript', 'application/xml',
+               'application/problem+json', 'image/svg+xml')
+
+log = obter_log('lambda')
+
+CORS_PADRAO = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+)
+
+def resposta_texto(cabecalhos):
+    """O corpo pode ir como texto: tipo textual e sem Content-Encoding"""
+    if cabecalhos.get('Content-Encoding'):
+        return False
+    tipo = cabecalhos.get('Content-Type', '')
+    return not tipo or tipo.startswith(TIPOS_TEXTO)
+
+def montar_environ(event, context):
+    """Environ WSGI do evento, sem copiar o corpo nem normalizar os headers duas vezes"""
+    corpo = event.get('body') or b''
+    if event.get('isBase64Encoded') and corpo:
+        corpo = base64.b64decode(corpo)
+    elif isinstance(corpo, str):
+        corpo = corpo.encode('utf-8')
+
+    parametros = event.get('multiValueQueryStringParameters')
+    if parametros:
+        query = urlencode(parametros, doseq=True)
+    else:
+        query = urlencode(event.get('queryStringParameters') or {})
+
+    identidade = (event.get('requestContext') or {}).get('identity') or {}
+    environ = {
+        'REQUEST_METHOD': event.get('httpMethod', 'GET'),
+        'SCRIPT_NAME': '',
+        # WSGI espera o caminho como bytes decodificados em latin-1
+        'PATH_INFO': unquote_to_bytes(event.get('path') or '/').decode('latin-1'),
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': '',
+        'CONTENT_LENGTH': str(len(corpo)),
+        'REMOTE_ADDR': identidade.get('sourceIp') or '127.0.0.1',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '443',  # HTTPS por padrão no API Gateway
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': BytesIO(corpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for nome, valor in (event.get('headers') or {}).items():
+        chave = nome.upper().replace('-', '_')
+        if chave == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = valor
+        elif chave == 'HOST':
+            environ['HTTP_HOST'] = valor
+            environ['SERVER_NAME'] = valor.split(':')[0]
+        elif chave != 'CONTENT_LENGTH':  # o tamanho vale o do corpo já decodificado
+            environ['HTTP_' + chave] = valor
+
+    # Prazo da requisição a partir do tempo restante do Lambda (usado por paralelo.executar)
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        restante = context.get_remaining_time_in_millis() / 1000 - FOLGA_PRAZO_SEGUNDOS
+        environ[CHAVE_PRAZO] = time.monotonic() + max(0.0, restante)
+    return environ
+
+def montar_resposta(status_code, lista_cabecalhos, corpo):
+    """Resposta no formato do API Gateway; headers repetidos vão em multiValueHeaders"""
+    cabecalhos = {}
+    repetidos = None
+    for nome, valor in lista_cabecalhos:
+        if nome in cabecalhos:
+            repetidos = repetidos or {}
+            repetidos.setdefault(nome, [cabecalhos[nome]]).append(valor)
+        else:
+            cabecalhos[nome] = valor
+    # Garantir headers CORS essenciais (caso não tenham sido adicionados)
+    for nome, valor in CORS_PADRAO:
+        cabecalhos.setdefault(nome, valor)
+
+    resposta = {'statusCode': status_code, 'headers': cabecalhos}
+    if repetidos:
+        resposta['multiValueHeaders'] = repetidos
+        for nome in repetidos:
+            del cabecalhos[nome]
+    if resposta_texto(cabecalhos):
+        try:
+            resposta['body'] = corpo.decode('utf-8')
+            resposta['isBase64Encoded'] = False
+            return resposta
+        except UnicodeDecodeError:
+            pass  # Tipo textual em outro charset: segue como binário
+    resposta['body'] = base64.b64encode(corpo).decode('ascii')
+    resposta['isBase64Encoded'] = True
+    return resposta
 
 def lambda_response(app, event, context):
     """
-    Adaptador para Flask no Lambda com suporte melhorado para CORS e multipart
+    Adaptador para Flask no Lambda com suporte a CORS, multipart e respostas binárias
     """
     try:
-        # Extrair informações do evento Lambda
-        http_method = event.get('httpMethod', 'GET')
-        path = event.get('path', '/')
-        query_string = event.get('queryStringParameters') or {}
-        headers = event.get('headers') or {}
-        body = event.get('body', '')
-        is_base64 = event.get('isBase64Encoded', False)
-        
-        print(f"Lambda Request - Method: {http_method}, Path: {path}")
-        print(f"Headers: {headers}")
-        
-        # Decodificar body se necessário
-        if is_base64 and body:
-            body = base64.b64decode(body)
-        elif body and isinstance(body, str):
-            body = body.encode('utf-8')
-        elif not body:
-            body = b''
-        else:
-            body = body
-        
-        # Construir query string
-        query_items = []
-        for key, value in query_string.items():
-            if value is not None:
-                query_items.append(f"{key}={value}")
-        query_str = "&".join(query_items)
-        
-        # Normalizar headers (converter para lowercase)
-        normalized_headers = {}
-        for key, value in headers.items():
-            normalized_headers[key.lower()] = value
-        
-        # Obter content-type
-        content_type = normalized_headers.get('content-type', '')
-        content_length = len(body) if body else 0
-        
-        # Criar ambiente WSGI
-        environ = {
-            'REQUEST_METHOD': http_method,
-            'SCRIPT_NAME': '',
-            'PATH_INFO': unquote_plus(path),
-            'QUERY_STRING': query_str,
-            'CONTENT_TYPE': content_type,
-            'CONTENT_LENGTH': str(content_length),
-            'SERVER_NAME': normalized_headers.get('host', 'localhost').split(':')[0],
-            'SERVER_PORT': '443',  # HTTPS por padrão no API Gateway
-            'wsgi.version': (1, 0),
-            'wsgi.url_scheme': 'https',
-            'wsgi.input': BytesIO(body),
-            'wsgi.errors': None,
-            'wsgi.multithread': False,
-            'wsgi.multiprocess': True,
-            'wsgi.run_once': False
-        }
-        
-        # Adicionar headers como HTTP_*
-        for key, value in normalized_headers.items():
-            key = key.upper().replace('-', '_')
-            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-                environ[f'HTTP_{key}'] = value
-        
-        # Executar aplicação Flask
-        with app.request_context(environ):
-            app_response = app.full_dispatch_request()
-            
-            # Preparar headers de resposta
-            response_headers = dict(app_response.headers)
-            
-            # Garantir headers CORS essenciais (caso não tenham sido adicionados)
-            if 'Access-Control-Allow-Origin' not in response_headers:
-                response_headers['Access-Control-Allow-Origin'] = '*'
-            if 'Access-Control-Allow-Methods' not in response_headers:
-                response_headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
-            if 'Access-Control-Allow-Headers' not in response_headers:
-                response_headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
-            
-            # Obter o corpo da resposta
-            response_body = app_response.get_data(as_text=True)
-            
-            # Preparar resposta para Lambda
-            lambda_response = {
-                'statusCode': app_response.status_code,
-                'headers': response_headers,
-                'body': response_body,
-                'isBase64Encoded': False
-            }
-            
-            print(f"Lambda Response - Status: {app_response.status_code}")
-            print(f"Response Headers: {response_headers}")
-            
-            return lambda_response
-            
+        # O mesmo que app.wsgi_app, sem passar a resposta por um iterador WSGI
+        contexto = app.request_context(montar_environ(event, context))
+        erro = None
+        try:
+            contexto.push()
+            try:
+                resposta = app.full_dispatch_request()
+            except Exception as e:
+                erro = e
+                resposta = app.handle_exception(e)
+            # get_data() devolve os bytes do corpo sem convertê-los para texto
+            return montar_resposta(resposta.status_code, resposta.headers.items(), resposta.get_data())
+        finally:
+            contexto.pop(erro)
+
     except Exception as e:
-        print(f"Lambda adapter error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
+        log.erro('adaptador', erro=e)
+
         # Retornar erro com headers CORS
         return {
             'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
-                'Content-Type': 'application/json'
-            },
+            'headers': dict(CORS_PADRAO, **{'Content-Type': 'application/json'}),
             'body': json.dumps({
                 'error': 'Erro interno do servidor',
                 'message': str(e)
             }),
             'isBase64Encoded': False
-        }
\ No newline at end of file
+        }
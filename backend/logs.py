@@ -0,0 +1,145 @@
+"""
+Logs estruturados: uma linha JSON por evento, no formato que o CloudWatch
+Logs Insights filtra por campo.
+
+    log = obter_log('imagem')
+    log.debug('foto_normalizada', bytes_originais=len(dados), ms=ms)
+    log.erro('registro_ponto', erro=e)
+
+Cada linha leva nivel, origem, evento e, dentro de uma requisição (entre
+iniciar_requisicao e encerrar_requisicao, inclusive nas threads do
+paralelo.executar), metodo, caminho e requisicao (id do Lambda). Strings
+longas são cortadas e bytes viram só o tamanho: uma foto nunca vai inteira
+para o log.
+
+    PONTO_LOG_NIVEL          DEBUG, INFO, WARNING ou ERROR (padrão INFO)
+    PONTO_LOG_AMOSTRAGEM     fração das requisições com DEBUG por prefixo de
+                             caminho, ex.: "/api/registrar_ponto=0.05,*=0.01"
+    PONTO_LOG_TAMANHO_CAMPO  caracteres por campo antes do corte (padrão 256)
+    PONTO_LOG_CORPO          1 inclui o início do corpo no DEBUG da requisição
+                             (padrão 0: nada do corpo vai para o log)
+"""
+import contextvars
+import json
+import os
+import random
+import traceback
+
+NIVEIS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+def _ler_amostragem(texto):
+    """{'/api/rota': fração} a partir de "prefixo=fração,..." """
+    amostragem = {}
+    for item in filter(None, (item.strip() for item in texto.split(','))):
+        prefixo, _, fracao = item.partition('=')
+        try:
+            amostragem[prefixo.strip()] = float(fracao)
+        except ValueError:
+            print(json.dumps({'nivel': 'WARNING', 'origem': 'logs', 'evento': 'amostragem_invalida', 'item': item}))
+    # Prefixo mais longo primeiro: /api/registrar_ponto/lote antes de /api/registrar_ponto
+    return sorted(amostragem.items(), key=lambda item: -len(item[0]))
+
+NIVEL = NIVEIS.get(os.environ.get('PONTO_LOG_NIVEL', 'INFO').upper(), NIVEIS['INFO'])
+AMOSTRAGEM = _ler_amostragem(os.environ.get('PONTO_LOG_AMOSTRAGEM', ''))
+TAMANHO_CAMPO = int(os.environ.get('PONTO_LOG_TAMANHO_CAMPO', 256))
+LOG_CORPO = os.environ.get('PONTO_LOG_CORPO', '0') == '1'
+
+_requisicao = contextvars.ContextVar('ponto_log_requisicao', default=None)
+
+def fracao_amostragem(caminho):
+    for prefixo, fracao in AMOSTRAGEM:
+        if prefixo == '*' or caminho.startswith(prefixo):
+            return fracao
+    return 0.0
+
+def iniciar_requisicao(metodo, caminho, requisicao_id=None):
+    """Abre o contexto de log da requisição e sorteia se ela terá DEBUG; devolve o token"""
+    fracao = fracao_amostragem(caminho) if AMOSTRAGEM else 0.0
+    return _requisicao.set({
+        'metodo': metodo,
+        'caminho': caminho,
+        'requisicao': requisicao_id,
+        'debug': fracao > 0 and random.random() < fracao
+    })
+
+def encerrar_requisicao(token):
+    _requisicao.reset(token)
+
+def cortar(valor, tamanho=None):
+    """Valor pronto para o JSON, com strings cortadas e bytes trocados pelo tamanho"""
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f"<{len(valor)} bytes>"
+    tamanho = tamanho or TAMANHO_CAMPO
+    if isinstance(valor, BaseException):
+        valor = f"{type(valor).__name__}: {valor}"
+    elif not isinstance(valor, str):
+        texto = json.dumps(valor, ensure_ascii=False, default=str)
+        # Listas e dicts pequenos seguem estruturados; os grandes viram texto cortado
+        if len(texto) <= tamanho:
+            return valor
+        valor = texto
+    if len(valor) > tamanho:
+        return f"{valor[:tamanho]}...(+{len(valor) - tamanho})"
+    return valor
+
+def resumo_evento(event):
+    """Campos do evento do API Gateway para o DEBUG: nomes dos headers, tamanho do corpo"""
+    corpo = event.get('body') or ''
+    resumo = {
+        'resource': event.get('resource'),
+        'query': event.get('queryStringParameters'),
+        'path_parameters': event.get('pathParameters'),
+        'headers': sorted(event.get('headers') or {}),
+        'corpo_bytes': len(corpo),
+        'base64': bool(event.get('isBase64Encoded'))
+    }
+    if LOG_CORPO and corpo:
+        resumo['corpo'] = corpo[:TAMANHO_CAMPO]
+    return resumo
+
+class Log:
+    def __init__(self, origem):
+        self.origem = origem
+
+    def ativo(self, nivel):
+        if NIVEIS[nivel] >= NIVEL:
+            return True
+        requisicao = _requisicao.get()
+        return requisicao is not None and requisicao['debug']
+
+    def _emitir(self, nivel, evento, campos):
+        linha = {'nivel': nivel, 'origem': self.origem, 'evento': evento}
+        requisicao = _requisicao.get()
+        if requisicao is not None:
+            linha['metodo'] = requisicao['metodo']
+            linha['caminho'] = requisicao['caminho']
+            if requisicao['requisicao']:
+                linha['requisicao'] = requisicao['requisicao']
+        for nome, valor in campos.items():
+            linha[nome] = valor if nome == 'traceback' else cortar(valor)
+        print(json.dumps(linha, ensure_ascii=False, default=str))
+
+    def debug(self, evento, **campos):
+        if self.ativo('DEBUG'):
+            self._emitir('DEBUG', evento, campos)
+
+    def info(self, evento, **campos):
+        if self.ativo('INFO'):
+            self._emitir('INFO', evento, campos)
+
+    def aviso(self, evento, **campos):
+        if self.ativo('WARNING'):
+            self._emitir('WARNING', evento, campos)
+
+    def erro(self, evento, **campos):
+        erro = campos.get('erro')
+        if isinstance(erro, BaseException) and erro.__traceback__ is not None:
+            # O fim do traceback é o que interessa; vai num campo só, com limite maior
+            pilha = ''.join(traceback.format_exception(type(erro), erro, erro.__traceback__))
+            campos['traceback'] = pilha[-TAMANHO_CAMPO * 8:]
+        self._emitir('ERROR', evento, campos)
+
+def obter_log(origem):
+    return Log(origem)
@@ -0,0 +1,196 @@
+"""
+Tempo de cada rota e de cada chamada AWS feita durante a requisição.
+
+instrumentar(app) cronometra as rotas do Flask (before_request/teardown_request)
+e clientes_aws registra registrar_chamadas_aws() nos eventos before-call,
+after-call e after-call-error do botocore da sessão compartilhada: toda
+operação de S3, Rekognition, DynamoDB e SQS feita dentro de uma requisição,
+inclusive nas threads do paralelo.executar, entra na medição dela.
+
+    PONTO_METRICAS            emf (padrão no Lambda), local (cascata por
+                              requisição no console) ou desligado (padrão
+                              fora do Lambda)
+    PONTO_METRICAS_NAMESPACE  namespace no CloudWatch (padrão PontoInteligente)
+
+No modo emf, ao fim de cada requisição (portanto de cada invocação do
+Lambda, sem nada guardado para depois), sai uma linha no Embedded Metric
+Format para a rota (dimensão Rota) e uma por operação AWS chamada (dimensão
+OperacaoAWS), com as latências medidas na métrica Latencia e a contagem de
+falhas em Erros; contadores da requisição (contar()) vão na linha da rota.
+Os valores vão crus, em lista: p50/p95/p99 e a contagem de
+chamadas (SampleCount) são calculados pelo CloudWatch sobre as amostras de
+todas as instâncias, o que não daria para fazer com percentis já calculados
+em cada uma.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+
+NAMESPACE = os.environ.get('PONTO_METRICAS_NAMESPACE', 'PontoInteligente')
+MODO = os.environ.get(
+    'PONTO_METRICAS', 'emf' if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ else 'desligado'
+).lower()
+LARGURA_CASCATA = 40
+# Limite do EMF de valores por métrica num documento
+MAXIMO_VALORES = 100
+
+# Chave no dicionário de contexto que o botocore repassa do before-call ao after-call
+CHAVE_CONTEXTO = 'ponto_metricas'
+
+_medicao = contextvars.ContextVar('ponto_metricas_medicao', default=None)
+
+class Medicao:
+    """Uma requisição: rota, início e as chamadas AWS feitas durante ela"""
+
+    def __init__(self, rota):
+        self.rota = rota
+        self.inicio = time.perf_counter()
+        self.status = None
+        # (operacao, inicio_ms, ms, thread, erro); list.append é seguro entre threads
+        self.chamadas = []
+        self.contadores = {}
+        self._lock = threading.Lock()
+
+    def registrar_chamada(self, operacao, inicio, fim, erro):
+        self.chamadas.append((
+            operacao, (inicio - self.inicio) * 1000, (fim - inicio) * 1000,
+            threading.current_thread().name, erro
+        ))
+
+def contar(nome, quantidade=1, unidade='Count'):
+    """Soma num contador da requisição atual (métrica na linha EMF da rota)"""
+    medicao = _medicao.get()
+    if medicao is not None:
+        with medicao._lock:
+            _, total = medicao.contadores.get(nome, (unidade, 0))
+            medicao.contadores[nome] = (unidade, total + quantidade)
+
+def documentos_emf(dimensao, nome, latencias, erros, contadores=None):
+    """Linhas EMF com as latências cruas (em lotes de MAXIMO_VALORES), os erros e os contadores"""
+    agora = int(time.time() * 1000)
+    documentos = []
+    for inicio in range(0, len(latencias), MAXIMO_VALORES):
+        documento = {
+            '_aws': {
+                'Timestamp': agora,
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [[dimensao]],
+                    'Metrics': [
+                        {'Name': 'Latencia', 'Unit': 'Milliseconds'},
+                        {'Name': 'Erros', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            dimensao: nome,
+            'Latencia': [round(ms, 2) for ms in latencias[inicio:inicio + MAXIMO_VALORES]],
+            # Erros e contadores vão uma vez só, no primeiro lote
+            'Erros': 0 if inicio else erros
+        }
+        if contadores and not inicio:
+            for contador, (unidade, valor) in sorted(contadores.items()):
+                documento['_aws']['CloudWatchMetrics'][0]['Metrics'].append({'Name': contador, 'Unit': unidade})
+                documento[contador] = valor
+        documentos.append(documento)
+    return documentos
+
+def emitir_emf(medicao, total_ms):
+    """Linhas EMF da requisição: a rota e cada operação AWS chamada"""
+    documentos = documentos_emf('Rota', medicao.rota, [total_ms], int(medicao.status >= 500), medicao.contadores)
+    por_operacao = {}
+    for operacao, _, ms, _, erro in medicao.chamadas:
+        latencias, erros = por_operacao.get(operacao, ([], 0))
+        latencias.append(ms)
+        por_operacao[operacao] = (latencias, erros + erro)
+    for operacao, (latencias, erros) in sorted(por_operacao.items()):
+        documentos.extend(documentos_emf('OperacaoAWS', operacao, latencias, erros))
+    for documento in documentos:
+        print(json.dumps(documento))
+
+def _antes_da_chamada(model, context, **kwargs):
+    if _medicao.get() is not None:
+        context[CHAVE_CONTEXTO] = (f"{model.service_model.service_name}.{model.name}", time.perf_counter())
+
+def _fim_da_chamada(context, erro):
+    medicao = _medicao.get()
+    inicio_chamada = context.pop(CHAVE_CONTEXTO, None) if context is not None else None
+    if medicao is not None and inicio_chamada is not None:
+        operacao, inicio = inicio_chamada
+        medicao.registrar_chamada(operacao, inicio, time.perf_counter(), erro)
+
+def _depois_da_chamada(context=None, http_response=None, **kwargs):
+    # Respostas de erro da AWS (ClientError) também chegam pelo after-call
+    _fim_da_chamada(context, http_response is not None and http_response.status_code >= 400)
+
+def _erro_na_chamada(context=None, **kwargs):
+    # Falhas sem resposta: timeout, conexão recusada, tentativas esgotadas
+    _fim_da_chamada(context, True)
+
+def registrar_chamadas_aws(eventos):
+    """Liga os hooks no emissor de eventos da sessão (antes de criar os clientes)"""
+    if MODO == 'desligado':
+        return
+    eventos.register('before-call', _antes_da_chamada, unique_id='ponto-metricas-antes')
+    eventos.register('after-call', _depois_da_chamada, unique_id='ponto-metricas-depois')
+    eventos.register('after-call-error', _erro_na_chamada, unique_id='ponto-metricas-erro')
+
+def cascata(medicao, total_ms):
+    """Linhas da cascata de uma requisição: cada chamada AWS na sua posição no tempo"""
+    escala = LARGURA_CASCATA / total_ms if total_ms else 0
+    linhas = [f"⏱️  {medicao.rota} -> {medicao.status} em {total_ms:.1f} ms"]
+    for operacao, inicio, ms, thread, erro in sorted(medicao.chamadas, key=lambda chamada: chamada[1]):
+        deslocamento = min(LARGURA_CASCATA - 1, int(inicio * escala))
+        barra = ' ' * deslocamento + '█' * max(1, min(LARGURA_CASCATA - deslocamento, round(ms * escala)))
+        linhas.append(f"   {inicio:8.1f} ms |{barra:<{LARGURA_CASCATA}}| {ms:7.1f} ms  "
+                      f"{operacao}{' (erro)' if erro else ''}  [{thread}]")
+    linhas.append(f"   {'':11}  código próprio (fora das chamadas AWS): {total_ms - tempo_em_chamadas(medicao):.1f} ms")
+    for contador, (unidade, valor) in sorted(medicao.contadores.items()):
+        linhas.append(f"   {'':11}  {contador}: {valor} {unidade}")
+    return linhas
+
+def tempo_em_chamadas(medicao):
+    """ms em que havia ao menos uma chamada AWS em andamento (chamadas paralelas contam uma vez)"""
+    total = 0.0
+    fim_anterior = 0.0
+    for _, inicio, ms, _, _ in sorted(medicao.chamadas, key=lambda chamada: chamada[1]):
+        fim = inicio + ms
+        if fim > fim_anterior:
+            total += fim - max(inicio, fim_anterior)
+            fim_anterior = fim
+    return total
+
+def instrumentar(app):
+    """Cronometra as rotas do app; não faz nada com PONTO_METRICAS=desligado"""
+    if MODO == 'desligado':
+        return app
+    from flask import request
+
+    @app.before_request
+    def iniciar_medicao():
+        rota = request.url_rule.rule if request.url_rule else 'sem_rota'
+        _medicao.set(Medicao(f"{request.method} {rota}"))
+
+    @app.after_request
+    def guardar_status(response):
+        medicao = _medicao.get()
+        if medicao is not None:
+            medicao.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def encerrar_medicao(erro=None):
+        medicao = _medicao.get()
+        if medicao is None:
+            return
+        _medicao.set(None)
+        total_ms = (time.perf_counter() - medicao.inicio) * 1000
+        if medicao.status is None:
+            medicao.status = 500 if erro else 200
+        if MODO == 'local':
+            print('\n'.join(cascata(medicao, total_ms)))
+            return
+        emitir_emf(medicao, total_ms)
+
+    return app
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script para migrar as faces da coleção global para as coleções por empresa
+
+Cada funcionário é indexado de novo, a partir da foto no S3, na coleção da
+sua empresa, e o face_id do cadastro passa a apontar para a face nova.
+Funcionários já presentes na coleção da empresa são pulados, então o script
+pode ser repetido após uma falha.
+
+Uso:
+    python migrar_colecoes.py                        # todas as empresas
+    python migrar_colecoes.py --empresa <id>
+    python migrar_colecoes.py --remover-global       # apaga da global as faces já migradas
+
+Depois de migrar tudo e remover as faces globais, defina PONTO_COLECAO_GLOBAL=0.
+"""
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from aws_utils import (
+    rekognition, tabela_funcionarios, varrer_tabela, consultar_funcionarios_empresa,
+    colecao_empresa, chave_s3, BUCKET, COLLECTION
+)
+
+def faces_por_funcionario(colecao):
+    """ExternalImageId -> [FaceId] de uma coleção (vazio se ela não existir)"""
+    faces = defaultdict(list)
+    try:
+        for pagina in rekognition.get_paginator('list_faces').paginate(
+            CollectionId=colecao, PaginationConfig={'PageSize': 4096}
+        ):
+            for face in pagina['Faces']:
+                faces[face.get('ExternalImageId')].append(face['FaceId'])
+    except rekognition.exceptions.ResourceNotFoundException:
+        pass
+    return faces
+
+def criar_colecao(colecao):
+    try:
+        rekognition.create_collection(CollectionId=colecao)
+        print(f"🚀 Coleção {colecao} criada")
+    except rekognition.exceptions.ResourceAlreadyExistsException:
+        pass
+
+def migrar_funcionario(funcionario):
+    """Indexa a foto do S3 na coleção da empresa e grava o novo face_id"""
+    chave = chave_s3(funcionario.get('foto_url'))
+    if not chave:
+        return 'sem foto no S3'
+    response = rekognition.index_faces(
+        CollectionId=colecao_empresa(funcionario['empresa_id']),
+        Image={'S3Object': {'Bucket': BUCKET, 'Name': chave}},
+        ExternalImageId=funcionario['id'],
+        MaxFaces=1,
+        QualityFilter="AUTO",
+        DetectionAttributes=["DEFAULT"]
+    )
+    if not response['FaceRecords']:
+        return 'nenhum rosto detectado'
+    tabela_funcionarios.update_item(
+        Key={'id': funcionario['id']},
+        UpdateExpression='SET face_id = :face',
+        ExpressionAttributeValues={':face': response['FaceRecords'][0]['Face']['FaceId']}
+    )
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra faces da coleção global para coleções por empresa")
+    parser.add_argument('--empresa', help="empresa_id (padrão: todas)")
+    parser.add_argument('--threads', type=int, default=8, help="indexações simultâneas")
+    parser.add_argument('--segmentos', type=int, default=4, help="segmentos do scan paralelo")
+    parser.add_argument('--remover-global', action='store_true', help="apaga da coleção global as faces migradas")
+    args = parser.parse_args()
+
+    print("👥 Lendo funcionários...")
+    if args.empresa:
+        funcionarios = list(consultar_funcionarios_empresa(args.empresa))
+    else:
+        funcionarios = list(varrer_tabela(tabela_funcionarios, segmentos=args.segmentos))
+    por_empresa = defaultdict(list)
+    for funcionario in funcionarios:
+        if funcionario.get('empresa_id'):
+            por_empresa[funcionario['empresa_id']].append(funcionario)
+    print(f"✅ {len(funcionarios)} funcionários em {len(por_empresa)} empresas")
+
+    pendentes = []
+    migrados = set()
+    for empresa_id, lista in por_empresa.items():
+        colecao = colecao_empresa(empresa_id)
+        criar_colecao(colecao)
+        existentes = faces_por_funcionario(colecao)
+        for funcionario in lista:
+            if existentes.get(funcionario['id']):
+                migrados.add(funcionario['id'])
+            else:
+                pendentes.append(funcionario)
+    print(f"🔁 {len(migrados)} já migrados, {len(pendentes)} a migrar")
+
+    falhas = 0
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        futuros = {executor.submit(migrar_funcionario, funcionario): funcionario for funcionario in pendentes}
+        for futuro in as_completed(futuros):
+            funcionario = futuros[futuro]
+            try:
+                erro = futuro.result()
+            except Exception as e:
+                erro = str(e)
+            if erro:
+                falhas += 1
+                print(f"❌ {funcionario['id']}: {erro}")
+            else:
+                migrados.add(funcionario['id'])
+    print(f"✅ {len(pendentes) - falhas} migrados agora, {falhas} falhas")
+
+    if args.remover_global:
+        globais = faces_por_funcionario(COLLECTION)
+        faces = [face_id for funcionario_id in migrados for face_id in globais.get(funcionario_id, [])]
+        # delete_faces aceita até 4096 ids por chamada
+        for inicio in range(0, len(faces), 4096):
+            rekognition.delete_faces(CollectionId=COLLECTION, FaceIds=faces[inicio:inicio + 4096])
+        print(f"🧹 {len(faces)} faces removidas da coleção global")
+
+if __name__ == "__main__":
+    main()
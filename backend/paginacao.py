@@ -0,0 +1,45 @@
+from auth import get_secret_key
+
+LIMITE_MAXIMO = 500
+
+class CursorInvalido(Exception):
+    """Parâmetro limit ou cursor inválido, adulterado ou de outra rota/empresa"""
+
+def codificar_cursor(chave, escopo):
+    """Transforma um ExclusiveStartKey em token opaco assinado (None se não há próxima página)"""
+    if not chave:
+        return None
+    import jwt
+    return jwt.encode({'k': chave, 'e': escopo}, get_secret_key(), algorithm="HS256")
+
+def decodificar_cursor(token, escopo):
+    """Valida a assinatura e o escopo (rota + empresa) do cursor e devolve a chave"""
+    import jwt
+    try:
+        dados = jwt.decode(token, get_secret_key(), algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        raise CursorInvalido('Cursor inválido')
+    if dados.get('e') != escopo or not isinstance(dados.get('k'), dict):
+        raise CursorInvalido('Cursor inválido')
+    return dados['k']
+
+def ler_paginacao(args, escopo):
+    """
+    Lê limit/cursor da query string.
+
+    Retorna (limite, chave_inicial); limite None indica resposta sem paginação.
+    """
+    limite = args.get('limit')
+    cursor = args.get('cursor')
+    if limite is None:
+        if cursor:
+            raise CursorInvalido('cursor exige limit')
+        return None, None
+    try:
+        limite = int(limite)
+    except ValueError:
+        raise CursorInvalido('limit deve ser um número inteiro')
+    if limite < 1:
+        raise CursorInvalido('limit deve ser maior que zero')
+    limite = min(limite, LIMITE_MAXIMO)
+    return limite, decodificar_cursor(cursor, escopo) if cursor else None
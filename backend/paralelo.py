@@ -0,0 +1,120 @@
+"""
+Execução simultânea de chamadas independentes dentro de uma requisição.
+
+    foto_url, face_id = executar(
+        lambda: repos.fotos.enviar(imagem, nome),
+        lambda: repos.faces.indexar(imagem, funcionario_id, empresa_id)
+    )
+
+As chamadas rodam num pool compartilhado e limitado (PONTO_THREADS_REQUISICAO,
+padrão 16) e executar() espera todas, devolvendo os resultados na ordem.
+O prazo vem do contexto do Lambda (lambda_adapter grava em request.environ
+o instante limite); esgotado o prazo, levanta PrazoEsgotado sem esperar as
+chamadas ainda em andamento. Se alguma chamada falhar, a primeira exceção
+(na ordem dos argumentos) é relançada depois que todas terminarem.
+
+Para listas de itens (cadastro em lote, sincronização do quiosque),
+conforme_terminam() usa o mesmo pool e o mesmo prazo, mas entrega cada
+item conforme termina, com a exceção dele em vez de relançá-la; esgotado
+o prazo, os itens que faltam saem com PrazoEsgotado.
+
+Chamadas feitas de dentro do pool rodam em sequência na própria thread,
+para que um executar() aninhado não fique esperando por threads ocupadas.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TempoEsgotado, as_completed, wait
+
+from flask import has_request_context, request
+
+MAXIMO_THREADS = int(os.environ.get('PONTO_THREADS_REQUISICAO', 16))
+# Chave do environ WSGI com o instante (time.monotonic) limite da requisição
+CHAVE_PRAZO = 'ponto.prazo'
+
+_executor = None
+_lock = threading.Lock()
+_local = threading.local()
+
+class PrazoEsgotado(TimeoutError):
+    """As chamadas não terminaram antes do prazo da requisição"""
+
+def _marcar_thread():
+    _local.no_pool = True
+
+def _obter_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAXIMO_THREADS,
+                    thread_name_prefix='ponto',
+                    initializer=_marcar_thread
+                )
+    return _executor
+
+def prazo_da_requisicao():
+    """Instante limite (time.monotonic) da requisição atual, ou None sem prazo"""
+    if has_request_context():
+        return request.environ.get(CHAVE_PRAZO)
+    return None
+
+def executar(*chamadas, prazo=None):
+    """Executa as chamadas ao mesmo tempo e devolve a lista de resultados"""
+    prazo = prazo if prazo is not None else prazo_da_requisicao()
+    if len(chamadas) <= 1 or getattr(_local, 'no_pool', False):
+        resultados = []
+        for chamada in chamadas:
+            if prazo is not None and time.monotonic() >= prazo:
+                raise PrazoEsgotado('Prazo da requisição esgotado')
+            resultados.append(chamada())
+        return resultados
+
+    # Cada chamada leva uma cópia do contexto (requisição atual nos logs)
+    futuros = [_obter_executor().submit(contextvars.copy_context().run, chamada) for chamada in chamadas]
+    restante = None if prazo is None else max(0.0, prazo - time.monotonic())
+    _, pendentes = wait(futuros, timeout=restante)
+    if pendentes:
+        for futuro in pendentes:
+            futuro.cancel()
+        raise PrazoEsgotado(f'{len(pendentes)} de {len(futuros)} chamadas não terminaram no prazo')
+    return [futuro.result() for futuro in futuros]
+
+def conforme_terminam(funcao, itens, prazo=None):
+    """
+    Gera (item, resultado, erro) de funcao(item) para cada item, na ordem em
+    que terminam. Os itens que não terminam no prazo saem com erro
+    PrazoEsgotado, sem esperar os que ainda estão em andamento.
+    """
+    prazo = prazo if prazo is not None else prazo_da_requisicao()
+    if getattr(_local, 'no_pool', False):
+        for item in itens:
+            if prazo is not None and time.monotonic() >= prazo:
+                yield item, None, PrazoEsgotado('Prazo da requisição esgotado')
+                continue
+            try:
+                yield item, funcao(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    futuros = {_obter_executor().submit(contextvars.copy_context().run, funcao, item): item for item in itens}
+    restante = None if prazo is None else max(0.0, prazo - time.monotonic())
+    entregues = set()
+    try:
+        for futuro in as_completed(futuros, timeout=restante):
+            entregues.add(futuro)
+            erro = futuro.exception()
+            yield futuros[futuro], None if erro else futuro.result(), erro
+    except TempoEsgotado:
+        for futuro, item in futuros.items():
+            if futuro in entregues:
+                continue
+            if futuro.cancel() or not futuro.done():
+                yield item, None, PrazoEsgotado('Item não terminou no prazo da requisição')
+            else:
+                # Terminou junto com o prazo: o resultado vale
+                erro = futuro.exception()
+                yield item, None if erro else futuro.result(), erro
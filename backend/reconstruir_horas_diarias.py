@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular a tabela HorasDiarias a partir dos registros brutos (backfill/reparo)
+
+Uso:
+    python reconstruir_horas_diarias.py                      # todas as empresas (scan paralelo)
+    python reconstruir_horas_diarias.py --empresa <id>       # uma empresa (Query no GSI)
+    python reconstruir_horas_diarias.py --inicio 2024-01-01 --fim 2024-01-31
+"""
+import argparse
+from collections import defaultdict
+
+from boto3.dynamodb.conditions import Attr
+from aws_utils import (
+    tabela_registros, tabela_horas_diarias, varrer_tabela, consultar_registros_empresa,
+    consultar_horas_diarias, calcular_horas_dias, dias_vizinhos
+)
+
+def carregar_registros(empresa_id, data_inicio, data_fim, segmentos):
+    if empresa_id:
+        return consultar_registros_empresa(empresa_id, data_inicio, data_fim)
+    filtro = {}
+    if data_inicio and data_fim:
+        filtro['FilterExpression'] = Attr('data_hora').between(f"{data_inicio} 00:00:00", f"{data_fim} 23:59:59")
+    return varrer_tabela(tabela_registros, segmentos=segmentos, **filtro)
+
+def carregar_agregados(empresa_id, data_inicio, data_fim, segmentos):
+    if empresa_id:
+        return consultar_horas_diarias(empresa_id, data_inicio, data_fim)
+    filtro = {}
+    if data_inicio and data_fim:
+        filtro['FilterExpression'] = Attr('data').between(data_inicio, data_fim)
+    return varrer_tabela(tabela_horas_diarias, segmentos=segmentos, **filtro)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula HorasDiarias a partir de RegistrosPonto")
+    parser.add_argument('--empresa', help="empresa_id (padrão: todas)")
+    parser.add_argument('--inicio', help="data inicial AAAA-MM-DD")
+    parser.add_argument('--fim', help="data final AAAA-MM-DD")
+    parser.add_argument('--segmentos', type=int, default=4, help="segmentos do scan paralelo")
+    args = parser.parse_args()
+
+    print("🧮 Lendo registros...")
+    # Um dia a mais de cada lado do período: turnos que passam da meia-noite nas bordas
+    inicio = dias_vizinhos(args.inicio)[0] if args.inicio and args.fim else None
+    fim = dias_vizinhos(args.fim)[-1] if args.inicio and args.fim else None
+    por_funcionario = defaultdict(list)
+    for reg in carregar_registros(args.empresa, inicio, fim, args.segmentos):
+        if not reg.get('empresa_id') or not reg.get('data_hora'):
+            continue
+        por_funcionario[(reg['empresa_id'], reg['funcionario_id'])].append(reg)
+    print(f"✅ {sum(len(regs) for regs in por_funcionario.values())} registros de {len(por_funcionario)} funcionários")
+
+    recalculados = set()
+    with tabela_horas_diarias.batch_writer(overwrite_by_pkeys=['empresa_id', 'dia_funcionario']) as batch:
+        for (empresa_id, funcionario_id), registros in por_funcionario.items():
+            registros.sort(key=lambda reg: reg['data_hora'])
+            dias = {
+                reg['data_hora'][:10] for reg in registros
+                if not (args.inicio and args.fim) or args.inicio <= reg['data_hora'][:10] <= args.fim
+            }
+            for item in calcular_horas_dias(empresa_id, funcionario_id, registros, sorted(dias)).values():
+                batch.put_item(Item=item)
+                recalculados.add((item['empresa_id'], item['dia_funcionario']))
+
+        # Agregados de dias que não têm mais registros
+        removidos = 0
+        for item in carregar_agregados(args.empresa, args.inicio, args.fim, args.segmentos):
+            if (item['empresa_id'], item['dia_funcionario']) not in recalculados:
+                batch.delete_item(Key={'empresa_id': item['empresa_id'], 'dia_funcionario': item['dia_funcionario']})
+                removidos += 1
+
+    print(f"✅ {len(recalculados)} agregados gravados, {removidos} removidos")
+
+if __name__ == "__main__":
+    main()
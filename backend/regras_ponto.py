@@ -0,0 +1,98 @@
+"""Regras do ponto independentes de armazenamento (compartilhadas pelos repositórios)"""
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+def ler_data_hora(data_hora):
+    for formato in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(data_hora, formato)
+        except ValueError:
+            continue
+    return None
+
+def estado_do_registro(registro):
+    return {
+        'funcionario_id': registro['funcionario_id'],
+        'ultimo_registro_id': registro['registro_id'],
+        'ultimo_tipo': registro['tipo'],
+        'ultima_data_hora': registro['data_hora'],
+        'sessao_aberta': registro['tipo'] == 'entrada'
+    }
+
+def proximo_tipo(estado, hoje):
+    """'entrada' se não houve ponto hoje ou o último foi 'saída'; senão 'saída'"""
+    if not estado or not estado.get('ultima_data_hora', '').startswith(hoje):
+        return 'entrada'
+    return 'entrada' if estado.get('ultimo_tipo') == 'saída' else 'saída'
+
+def chave_horas_diarias(empresa_id, funcionario_id, data):
+    return {'empresa_id': empresa_id, 'dia_funcionario': f"{data}#{funcionario_id}"}
+
+def dias_vizinhos(data, distancia=1):
+    """O dia e os `distancia` dias antes e depois dele, em AAAA-MM-DD"""
+    dia = datetime.strptime(data, '%Y-%m-%d')
+    return [(dia + timedelta(days=delta)).strftime('%Y-%m-%d') for delta in range(-distancia, distancia + 1)]
+
+def calcular_horas_dia(empresa_id, funcionario_id, data, registros, anterior=None, seguinte=None):
+    """
+    Agregado de um dia a partir dos registros em ordem de data_hora.
+
+    Cada 'saída' fecha a última 'entrada' aberta, como no cálculo de horas de
+    /registros; uma 'entrada' sem 'saída' fica em entrada_aberta.
+
+    Turnos que passam da meia-noite são divididos nela. `anterior` é o último
+    registro antes do dia e `seguinte` o primeiro depois dele: uma 'entrada'
+    do dia anterior ainda aberta conta a partir de 00:00, e uma 'entrada'
+    fechada pela 'saída' do dia seguinte conta até 24:00.
+    """
+    inicio_do_dia = datetime.strptime(data, '%Y-%m-%d')
+    fim_do_dia = inicio_do_dia + timedelta(days=1)
+    segundos = 0
+    entrada = None
+    entrada_aberta = None
+    if anterior and anterior['tipo'] == 'entrada' and \
+            anterior['data_hora'][:10] == (inicio_do_dia - timedelta(days=1)).strftime('%Y-%m-%d'):
+        entrada = inicio_do_dia
+    for reg in registros:
+        momento = ler_data_hora(reg['data_hora'])
+        if momento is None:
+            continue
+        if reg['tipo'] == 'entrada':
+            entrada, entrada_aberta = momento, reg['data_hora']
+        elif reg['tipo'] == 'saída' and entrada is not None:
+            segundos += int((momento - entrada).total_seconds())
+            entrada, entrada_aberta = None, None
+    if entrada_aberta and seguinte and seguinte['tipo'] == 'saída' and \
+            seguinte['data_hora'][:10] == fim_do_dia.strftime('%Y-%m-%d'):
+        segundos += int((fim_do_dia - entrada).total_seconds())
+        entrada_aberta = None
+
+    item = dict(chave_horas_diarias(empresa_id, funcionario_id, data),
+                funcionario_id=funcionario_id,
+                data=data,
+                segundos_trabalhados=segundos,
+                total_registros=len(registros))
+    if entrada_aberta:
+        item['entrada_aberta'] = entrada_aberta
+    return item
+
+def calcular_horas_dias(empresa_id, funcionario_id, registros, dias):
+    """
+    {dia: agregado} dos `dias` a partir dos registros do funcionário em ordem
+    de data_hora (None para dia sem registros). Os registros devem cobrir
+    também o dia antes e o depois de cada um, para os turnos da meia-noite.
+    """
+    por_dia = {}
+    for reg in registros:
+        por_dia.setdefault(reg['data_hora'][:10], []).append(reg)
+    datas = sorted(por_dia)
+    resultado = {}
+    for dia in dias:
+        if dia not in por_dia:
+            resultado[dia] = None
+            continue
+        posicao = bisect_left(datas, dia)
+        anterior = por_dia[datas[posicao - 1]][-1] if posicao > 0 else None
+        seguinte = por_dia[datas[posicao + 1]][0] if posicao + 1 < len(datas) else None
+        resultado[dia] = calcular_horas_dia(empresa_id, funcionario_id, dia, por_dia[dia], anterior, seguinte)
+    return resultado
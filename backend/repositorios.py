@@ -0,0 +1,87 @@
+"""
+Camada de repositórios usada pelas rotas.
+
+As rotas não falam com DynamoDB/S3/Rekognition diretamente: pedem os
+repositórios a obter_repositorios(), que escolhe a implementação pela
+variável de ambiente PONTO_ARMAZENAMENTO:
+
+    aws      (padrão) repositorios_dynamodb: DynamoDB, S3 e Rekognition
+    memoria  repositorios_memoria: tudo em memória, com a mesma semântica
+             (paginação, escritas condicionais, reconhecimento facial
+             determinístico), para testes de carga e benchmarks offline
+
+Interface comum (mesmos nomes nas duas implementações):
+
+    funcionarios  obter, salvar, salvar_lote, atualizar_foto, excluir,
+                  listar_empresa, paginar_empresa, contar_empresa, versao_empresa,
+                  incrementar_versao_empresa
+    registros     obter_por_id, obter_estado, registrar_com_estado,
+                  registrar_lote, vincular_foto, registrar_manual, excluir,
+                  listar_funcionario, paginar_funcionario, horas_diarias,
+                  listar_por_atributo
+    usuarios      obter, criar
+    fotos         enviar, baixar
+    faces         reconhecer, indexar, remover, localizar_faces,
+                  remover_do_funcionario (uma coleção por empresa)
+    evidencias    enfileirar (fotos dos pontos arquivadas em segundo plano;
+                  fila SQS na versão AWS, fila local em memória na outra)
+    embeddings    listar, obter_varios, salvar, remover (vetores de face
+                  do comparador_faces)
+
+Com PONTO_COMPARADOR=embeddings, faces.reconhecer passa a comparar os
+vetores em memória antes do Rekognition (ver comparador_faces).
+
+Sobre os funcionários fica o cache por empresa (diretorio_funcionarios):
+
+    diretorio     funcionarios, indice_nomes, obter, aplicar, invalidar
+"""
+import os
+import threading
+
+from comparador_faces import criar_faces
+from diretorio_funcionarios import DiretorioFuncionarios
+from evidencias import FilaEvidenciasLocal
+
+class ConflitoPonto(Exception):
+    """Outro registro do mesmo funcionário alterou o estado do ponto antes desta gravação"""
+
+class ItemJaExiste(Exception):
+    """Escrita condicional de criação encontrou um item com a mesma chave"""
+
+class Repositorios:
+    def __init__(self, funcionarios, registros, usuarios, fotos, faces, embeddings=None, evidencias=None):
+        self.funcionarios = funcionarios
+        self.registros = registros
+        self.usuarios = usuarios
+        self.fotos = fotos
+        self.diretorio = DiretorioFuncionarios(funcionarios)
+        self.embeddings = embeddings
+        self.faces = criar_faces(faces, embeddings, self.diretorio)
+        self.evidencias = evidencias or FilaEvidenciasLocal(self)
+
+_repositorios = None
+_lock = threading.Lock()
+
+def criar_repositorios(tipo=None):
+    tipo = tipo or os.environ.get('PONTO_ARMAZENAMENTO', 'aws')
+    if tipo == 'memoria':
+        import repositorios_memoria as implementacao
+    elif tipo == 'aws':
+        import repositorios_dynamodb as implementacao
+    else:
+        raise ValueError(f"PONTO_ARMAZENAMENTO inválido: {tipo}")
+    return implementacao.criar_repositorios()
+
+def obter_repositorios():
+    """Repositórios compartilhados pelo processo, criados na primeira chamada"""
+    global _repositorios
+    if _repositorios is None:
+        with _lock:
+            if _repositorios is None:
+                _repositorios = criar_repositorios()
+    return _repositorios
+
+def definir_repositorios(repositorios):
+    """Troca os repositórios do processo (benchmarks e testes de carga)"""
+    global _repositorios
+    _repositorios = repositorios
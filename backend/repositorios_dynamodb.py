@@ -0,0 +1,273 @@
+"""Implementação dos repositórios sobre DynamoDB, S3 e Rekognition"""
+from boto3.dynamodb.conditions import Key, Attr
+
+from aws_utils import (
+    tabela_funcionarios, tabela_registros, tabela_usuarioempresa, rekognition, enviar_s3,
+    reconhecer_funcionario, COLLECTION, USAR_COLECAO_GLOBAL, colecao_empresa, INDICE_FUNCIONARIOS_EMPRESA,
+    varrer_tabela, paginar, consultar_registros_funcionario, paginar_registros_funcionario,
+    consultar_horas_diarias, paginar_horas_diarias, obter_registro_por_id, obter_estado_ponto,
+    gravar_registro_com_estado, atualizar_estado_ponto, ajustar_estado_apos_exclusao,
+    recalcular_horas_diarias, consultar_funcionarios_empresa, contar_funcionarios_empresa, obter_versao_empresa,
+    incrementar_versao_empresa, vincular_foto_registro, sqs, FILA_EVIDENCIAS, baixar_s3,
+    tabela_embeddings, consultar_tabela, obter_embeddings
+)
+from evidencias import reduzir_foto, codificar_mensagem
+from logs import obter_log
+from paralelo import executar
+from repositorios import Repositorios, ItemJaExiste
+
+log = obter_log('rekognition')
+
+class RepositorioFuncionarios:
+    def obter(self, funcionario_id):
+        return tabela_funcionarios.get_item(Key={'id': funcionario_id}, ConsistentRead=True).get('Item')
+
+    def salvar(self, funcionario):
+        tabela_funcionarios.put_item(Item=funcionario)
+
+    def salvar_lote(self, funcionarios):
+        with tabela_funcionarios.batch_writer() as lote:
+            for funcionario in funcionarios:
+                lote.put_item(Item=funcionario)
+
+    def atualizar_foto(self, funcionario_id, foto_url, face_id):
+        tabela_funcionarios.update_item(
+            Key={'id': funcionario_id},
+            UpdateExpression='SET foto_url = :url, face_id = :face',
+            ExpressionAttributeValues={':url': foto_url, ':face': face_id}
+        )
+
+    def excluir(self, funcionario_id):
+        tabela_funcionarios.delete_item(Key={'id': funcionario_id})
+
+    def listar_empresa(self, empresa_id, nome_contem=None):
+        return consultar_funcionarios_empresa(empresa_id, nome_contem)
+
+    def paginar_empresa(self, empresa_id, limite, chave_inicial=None):
+        return paginar(
+            tabela_funcionarios.query,
+            ('id', 'empresa_id'),
+            limite,
+            chave_inicial,
+            IndexName=INDICE_FUNCIONARIOS_EMPRESA,
+            KeyConditionExpression=Key('empresa_id').eq(empresa_id)
+        )
+
+    def contar_empresa(self, empresa_id):
+        return contar_funcionarios_empresa(empresa_id)
+
+    def versao_empresa(self, empresa_id):
+        return obter_versao_empresa(empresa_id)
+
+    def incrementar_versao_empresa(self, empresa_id):
+        return incrementar_versao_empresa(empresa_id)
+
+class RepositorioRegistros:
+    def obter_por_id(self, registro_id):
+        return obter_registro_por_id(registro_id)
+
+    def obter_estado(self, funcionario_id):
+        return obter_estado_ponto(funcionario_id)
+
+    def registrar_com_estado(self, registro, estado_anterior):
+        """Registro do quiosque: levanta ConflitoPonto se o estado mudou desde a leitura"""
+        gravar_registro_com_estado(registro, estado_anterior)
+
+    def registrar_lote(self, registros):
+        """Pontos sincronizados do quiosque offline: gravados em lote, depois estado e horas"""
+        with tabela_registros.batch_writer(overwrite_by_pkeys=['funcionario_id', 'data_hora']) as lote:
+            for registro in registros:
+                lote.put_item(Item=registro)
+        ultimos = {}
+        dias = set()
+        for registro in registros:
+            atual = ultimos.get(registro['funcionario_id'])
+            if atual is None or atual['data_hora'] < registro['data_hora']:
+                ultimos[registro['funcionario_id']] = registro
+            dias.add((registro['empresa_id'], registro['funcionario_id'], registro['data_hora'][:10]))
+        executar(
+            *[lambda r=registro: atualizar_estado_ponto(r) for registro in ultimos.values()],
+            *[lambda d=dia: recalcular_horas_diarias(*d) for dia in dias]
+        )
+
+    def vincular_foto(self, registro, foto_url):
+        return vincular_foto_registro(registro, foto_url)
+
+    def registrar_manual(self, registro):
+        tabela_registros.put_item(Item=registro)
+        atualizar_estado_ponto(registro)
+        recalcular_horas_diarias(registro['empresa_id'], registro['funcionario_id'], registro['data_hora'][:10])
+
+    def excluir(self, registro, empresa_id):
+        """Exclui se o registro for da empresa; retorna False caso contrário"""
+        try:
+            tabela_registros.delete_item(
+                Key={
+                    'funcionario_id': registro['funcionario_id'],
+                    'data_hora': registro['data_hora']
+                },
+                ConditionExpression=Attr('empresa_id').eq(empresa_id) & Attr('registro_id').eq(registro['registro_id'])
+            )
+        except tabela_registros.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        ajustar_estado_apos_exclusao(registro)
+        recalcular_horas_diarias(empresa_id, registro['funcionario_id'], registro['data_hora'][:10])
+        return True
+
+    def listar_funcionario(self, funcionario_id, data_inicio=None, data_fim=None):
+        return consultar_registros_funcionario(funcionario_id, data_inicio, data_fim)
+
+    def paginar_funcionario(self, funcionario_id, limite, chave_inicial=None, data_inicio=None, data_fim=None):
+        return paginar_registros_funcionario(funcionario_id, limite, chave_inicial, data_inicio, data_fim)
+
+    def horas_diarias(self, empresa_id, data_inicio=None, data_fim=None):
+        return consultar_horas_diarias(empresa_id, data_inicio, data_fim)
+
+    def paginar_horas_diarias(self, empresa_id, limite, chave_inicial=None, data_inicio=None, data_fim=None,
+                              funcionario_ids=None):
+        return paginar_horas_diarias(empresa_id, limite, chave_inicial, data_inicio, data_fim, funcionario_ids)
+
+    def listar_por_atributo(self, atributo, valor):
+        return varrer_tabela(tabela_registros, FilterExpression=Attr(atributo).eq(valor))
+
+class RepositorioUsuarios:
+    def obter(self, usuario_id):
+        return tabela_usuarioempresa.get_item(Key={'usuario_id': usuario_id}).get('Item')
+
+    def criar(self, usuario):
+        try:
+            tabela_usuarioempresa.put_item(
+                Item=usuario,
+                ConditionExpression=Attr('usuario_id').not_exists()
+            )
+        except tabela_usuarioempresa.meta.client.exceptions.ConditionalCheckFailedException:
+            raise ItemJaExiste(usuario['usuario_id'])
+
+class ArmazenamentoFotos:
+    def enviar(self, imagem, nome_arquivo):
+        return enviar_s3(imagem, nome_arquivo)
+
+    def baixar(self, foto_url):
+        return baixar_s3(foto_url)
+
+class ArmazenamentoEmbeddings:
+    """Vetores de face por empresa (comparador_faces), com o face_id de origem"""
+
+    def listar(self, empresa_id):
+        return consultar_tabela(tabela_embeddings, KeyConditionExpression=Key('empresa_id').eq(empresa_id))
+
+    def obter_varios(self, empresa_id, funcionario_ids):
+        return obter_embeddings(empresa_id, funcionario_ids)
+
+    def salvar(self, empresa_id, funcionario_id, face_id, vetor):
+        tabela_embeddings.put_item(Item={
+            'empresa_id': empresa_id,
+            'funcionario_id': funcionario_id,
+            'face_id': face_id,
+            'vetor': vetor
+        })
+
+    def remover(self, empresa_id, funcionario_id):
+        tabela_embeddings.delete_item(Key={'empresa_id': empresa_id, 'funcionario_id': funcionario_id})
+
+class FilaEvidenciasSQS:
+    """Envia a foto reduzida e a chave do registro ao SQS; evidencias.lambda_handler arquiva"""
+
+    def __init__(self, url_fila):
+        self._url_fila = url_fila
+
+    def enfileirar(self, registro, imagem):
+        sqs.send_message(QueueUrl=self._url_fila, MessageBody=codificar_mensagem(registro, reduzir_foto(imagem)))
+
+class ReconhecedorFaces:
+    """
+    Uma coleção por empresa; a global só é consultada para faces ainda não
+    migradas (PONTO_COLECAO_GLOBAL=1)
+    """
+
+    def colecoes(self, empresa_id):
+        """Coleções onde podem estar as faces da empresa, a da empresa primeiro (nenhuma sem empresa)"""
+        if not empresa_id:
+            return []
+        return [colecao_empresa(empresa_id)] + ([COLLECTION] if USAR_COLECAO_GLOBAL else [])
+
+    def reconhecer(self, imagem, empresa_id=None):
+        for colecao in self.colecoes(empresa_id):
+            funcionario_id = reconhecer_funcionario(imagem, colecao)
+            if funcionario_id:
+                return funcionario_id
+        return None
+
+    def indexar(self, imagem, funcionario_id, empresa_id, atributos="DEFAULT"):
+        """Indexa a face na coleção da empresa; retorna o FaceId ou None se não houver rosto"""
+        colecao = colecao_empresa(empresa_id)
+        parametros = {
+            'CollectionId': colecao,
+            'Image': {'Bytes': imagem},
+            'ExternalImageId': funcionario_id,
+            'MaxFaces': 1,
+            'QualityFilter': "AUTO",
+            'DetectionAttributes': [atributos]
+        }
+        try:
+            response = rekognition.index_faces(**parametros)
+        except rekognition.exceptions.ResourceNotFoundException:
+            # Primeiro cadastro da empresa: cria a coleção e tenta de novo
+            try:
+                rekognition.create_collection(CollectionId=colecao)
+                log.info('colecao_criada', colecao=colecao)
+            except rekognition.exceptions.ResourceAlreadyExistsException:
+                pass
+            response = rekognition.index_faces(**parametros)
+        if not response['FaceRecords']:
+            return None
+        return response['FaceRecords'][0]['Face']['FaceId']
+
+    def remover(self, face_ids, empresa_id):
+        """Remove da coleção da empresa; o que não estiver lá é removido da global"""
+        restantes = set(face_ids)
+        for colecao in self.colecoes(empresa_id):
+            if not restantes:
+                break
+            try:
+                response = rekognition.delete_faces(CollectionId=colecao, FaceIds=list(restantes))
+            except rekognition.exceptions.ResourceNotFoundException:
+                continue
+            restantes -= set(response.get('DeletedFaces', []))
+
+    def localizar_faces(self, funcionario_id, empresa_id):
+        """Fallback caro: percorre todas as páginas das coleções atrás do ExternalImageId"""
+        faces = []
+        for colecao in self.colecoes(empresa_id):
+            try:
+                for pagina in rekognition.get_paginator('list_faces').paginate(
+                    CollectionId=colecao, PaginationConfig={'PageSize': 4096}
+                ):
+                    faces.extend(
+                        face['FaceId'] for face in pagina['Faces'] if face.get('ExternalImageId') == funcionario_id
+                    )
+            except rekognition.exceptions.ResourceNotFoundException:
+                continue
+        return faces
+
+    def remover_do_funcionario(self, funcionario, manter=None):
+        """
+        Remove as faces do funcionário, exceto `manter`: o face_id gravado no
+        cadastro, ou as encontradas nas coleções se o cadastro não tiver
+        """
+        if funcionario.get('face_id'):
+            faces = [funcionario['face_id']]
+        else:
+            faces = self.localizar_faces(funcionario['id'], funcionario.get('empresa_id'))
+        self.remover([face_id for face_id in faces if face_id != manter], funcionario.get('empresa_id'))
+
+def criar_repositorios():
+    return Repositorios(
+        funcionarios=RepositorioFuncionarios(),
+        registros=RepositorioRegistros(),
+        usuarios=RepositorioUsuarios(),
+        fotos=ArmazenamentoFotos(),
+        faces=ReconhecedorFaces(),
+        embeddings=ArmazenamentoEmbeddings(),
+        evidencias=FilaEvidenciasSQS(FILA_EVIDENCIAS) if FILA_EVIDENCIAS else None
+    )
@@ -0,0 +1,350 @@
+"""
+Implementação em memória dos repositórios, com a mesma semântica da versão AWS.
+
+- paginação por chave (ExclusiveStartKey) em ordem estável;
+- escritas condicionais: ConflitoPonto no registro do quiosque, ItemJaExiste
+  na criação de usuário, exclusão de registro restrita à empresa;
+- estado do último ponto e agregados diários mantidos a cada escrita;
+- reconhecimento facial determinístico: uma foto é reconhecida quando os
+  mesmos bytes foram indexados para um funcionário.
+
+Itens são copiados na leitura e na escrita, como acontece com o DynamoDB.
+"""
+import copy
+import hashlib
+import threading
+import time
+import uuid
+
+from regras_ponto import estado_do_registro, calcular_horas_dias, dias_vizinhos
+from repositorios import Repositorios, ConflitoPonto, ItemJaExiste
+
+def _paginar_lista(itens, atributos_chave, limite, chave_inicial):
+    """Página de uma lista já ordenada pelas chaves: (itens, proxima_chave)"""
+    if chave_inicial:
+        inicio = tuple(chave_inicial[atributo] for atributo in atributos_chave)
+        itens = [item for item in itens if tuple(item[atributo] for atributo in atributos_chave) > inicio]
+    pagina = itens[:limite]
+    if len(itens) > limite:
+        return pagina, {atributo: pagina[-1][atributo] for atributo in atributos_chave}
+    return pagina, None
+
+def _no_periodo(data_hora, data_inicio, data_fim):
+    if not (data_inicio and data_fim):
+        return True
+    return f"{data_inicio} 00:00:00" <= data_hora <= f"{data_fim} 23:59:59"
+
+class RepositorioFuncionarios:
+    def __init__(self):
+        self._itens = {}
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, funcionario_id):
+        return copy.deepcopy(self._itens.get(funcionario_id))
+
+    def salvar(self, funcionario):
+        with self._lock:
+            self._itens[funcionario['id']] = copy.deepcopy(funcionario)
+
+    def salvar_lote(self, funcionarios):
+        with self._lock:
+            for funcionario in funcionarios:
+                self._itens[funcionario['id']] = copy.deepcopy(funcionario)
+
+    def atualizar_foto(self, funcionario_id, foto_url, face_id):
+        with self._lock:
+            # update_item cria o item se ele não existir
+            item = self._itens.setdefault(funcionario_id, {'id': funcionario_id})
+            item['foto_url'] = foto_url
+            item['face_id'] = face_id
+
+    def excluir(self, funcionario_id):
+        with self._lock:
+            self._itens.pop(funcionario_id, None)
+
+    def _da_empresa(self, empresa_id):
+        with self._lock:
+            itens = [item for item in self._itens.values() if item.get('empresa_id') == empresa_id]
+        return sorted(itens, key=lambda item: item['id'])
+
+    def listar_empresa(self, empresa_id, nome_contem=None):
+        for item in self._da_empresa(empresa_id):
+            if not nome_contem or nome_contem in item.get('nome', ''):
+                yield copy.deepcopy(item)
+
+    def paginar_empresa(self, empresa_id, limite, chave_inicial=None):
+        pagina, proxima = _paginar_lista(self._da_empresa(empresa_id), ('id',), limite, chave_inicial)
+        return copy.deepcopy(pagina), proxima
+
+    def contar_empresa(self, empresa_id):
+        return len(self._da_empresa(empresa_id))
+
+    def versao_empresa(self, empresa_id):
+        return self._versoes.get(empresa_id, (0, 0))
+
+    def incrementar_versao_empresa(self, empresa_id):
+        with self._lock:
+            versao = self._versoes.get(empresa_id, (0, 0))[0] + 1
+            self._versoes[empresa_id] = (versao, time.time())
+            return versao
+
+class RepositorioRegistros:
+    def __init__(self):
+        self._por_funcionario = {}
+        self._por_id = {}
+        self._estado = {}
+        self._horas = {}
+        self._lock = threading.RLock()
+
+    # --- internos (chamados com o lock) ---
+
+    def _gravar(self, registro):
+        dia = self._por_funcionario.setdefault(registro['funcionario_id'], {})
+        anterior = dia.get(registro['data_hora'])
+        if anterior:
+            self._por_id.pop(anterior['registro_id'], None)
+        dia[registro['data_hora']] = copy.deepcopy(registro)
+        self._por_id[registro['registro_id']] = (registro['funcionario_id'], registro['data_hora'])
+
+    def _ordenados(self, funcionario_id):
+        registros = self._por_funcionario.get(funcionario_id, {})
+        return [registros[data_hora] for data_hora in sorted(registros)]
+
+    def _recalcular_estado(self, funcionario_id):
+        registros = self._ordenados(funcionario_id)
+        if registros:
+            self._estado[funcionario_id] = estado_do_registro(registros[-1])
+        else:
+            self._estado.pop(funcionario_id, None)
+        return self._estado.get(funcionario_id)
+
+    def _recalcular_horas(self, empresa_id, funcionario_id, data):
+        # O dia e os vizinhos: um turno que passa da meia-noite é dividido entre dois dias
+        registros = [reg for reg in self._ordenados(funcionario_id) if reg.get('empresa_id') == empresa_id]
+        for dia, item in calcular_horas_dias(empresa_id, funcionario_id, registros, dias_vizinhos(data)).items():
+            chave = (empresa_id, f"{dia}#{funcionario_id}")
+            if item:
+                self._horas[chave] = item
+            else:
+                self._horas.pop(chave, None)
+
+    # --- interface ---
+
+    def obter_por_id(self, registro_id):
+        with self._lock:
+            chave = self._por_id.get(registro_id)
+            if not chave:
+                return None
+            return copy.deepcopy(self._por_funcionario[chave[0]][chave[1]])
+
+    def obter_estado(self, funcionario_id):
+        with self._lock:
+            estado = self._estado.get(funcionario_id) or self._recalcular_estado(funcionario_id)
+            return copy.deepcopy(estado)
+
+    def registrar_com_estado(self, registro, estado_anterior):
+        with self._lock:
+            atual = self._estado.get(registro['funcionario_id'])
+            if estado_anterior and 'ultimo_registro_id' in estado_anterior:
+                valido = atual is not None and atual.get('ultimo_registro_id') == estado_anterior['ultimo_registro_id']
+            else:
+                valido = atual is None
+            if registro['data_hora'] in self._por_funcionario.get(registro['funcionario_id'], {}):
+                valido = False
+            if not valido:
+                raise ConflitoPonto(registro['funcionario_id'])
+            self._gravar(registro)
+            self._estado[registro['funcionario_id']] = estado_do_registro(registro)
+            if registro.get('empresa_id'):
+                self._recalcular_horas(registro['empresa_id'], registro['funcionario_id'], registro['data_hora'][:10])
+
+    def registrar_lote(self, registros):
+        with self._lock:
+            for registro in registros:
+                self.registrar_manual(registro)
+
+    def vincular_foto(self, registro, foto_url):
+        with self._lock:
+            atual = self._por_funcionario.get(registro['funcionario_id'], {}).get(registro['data_hora'])
+            if not atual or atual['registro_id'] != registro['registro_id']:
+                return False
+            atual['foto_url'] = foto_url
+            return True
+
+    def registrar_manual(self, registro):
+        with self._lock:
+            self._gravar(registro)
+            atual = self._estado.get(registro['funcionario_id'])
+            if atual is None or atual['ultima_data_hora'] <= registro['data_hora']:
+                self._estado[registro['funcionario_id']] = estado_do_registro(registro)
+            self._recalcular_horas(registro['empresa_id'], registro['funcionario_id'], registro['data_hora'][:10])
+
+    def excluir(self, registro, empresa_id):
+        with self._lock:
+            atual = self._por_funcionario.get(registro['funcionario_id'], {}).get(registro['data_hora'])
+            if not atual or atual.get('empresa_id') != empresa_id or atual['registro_id'] != registro['registro_id']:
+                return False
+            del self._por_funcionario[registro['funcionario_id']][registro['data_hora']]
+            self._por_id.pop(registro['registro_id'], None)
+            estado = self._estado.get(registro['funcionario_id'])
+            if estado and estado.get('ultimo_registro_id') == registro['registro_id']:
+                self._recalcular_estado(registro['funcionario_id'])
+            self._recalcular_horas(empresa_id, registro['funcionario_id'], registro['data_hora'][:10])
+            return True
+
+    def _do_funcionario(self, funcionario_id, data_inicio, data_fim):
+        with self._lock:
+            return [
+                copy.deepcopy(reg) for reg in self._ordenados(funcionario_id)
+                if _no_periodo(reg['data_hora'], data_inicio, data_fim)
+            ]
+
+    def listar_funcionario(self, funcionario_id, data_inicio=None, data_fim=None):
+        return iter(self._do_funcionario(funcionario_id, data_inicio, data_fim))
+
+    def paginar_funcionario(self, funcionario_id, limite, chave_inicial=None, data_inicio=None, data_fim=None):
+        return _paginar_lista(
+            self._do_funcionario(funcionario_id, data_inicio, data_fim),
+            ('funcionario_id', 'data_hora'),
+            limite,
+            chave_inicial
+        )
+
+    def horas_diarias(self, empresa_id, data_inicio=None, data_fim=None):
+        with self._lock:
+            itens = [
+                copy.deepcopy(item) for (empresa, _), item in self._horas.items()
+                if empresa == empresa_id and (not (data_inicio and data_fim) or data_inicio <= item['data'] <= data_fim)
+            ]
+        return iter(sorted(itens, key=lambda item: item['dia_funcionario']))
+
+    def paginar_horas_diarias(self, empresa_id, limite, chave_inicial=None, data_inicio=None, data_fim=None,
+                              funcionario_ids=None):
+        itens = [
+            item for item in self.horas_diarias(empresa_id, data_inicio, data_fim)
+            if funcionario_ids is None or item['funcionario_id'] in funcionario_ids
+        ]
+        return _paginar_lista(itens, ('empresa_id', 'dia_funcionario'), limite, chave_inicial)
+
+    def listar_por_atributo(self, atributo, valor):
+        with self._lock:
+            registros = [
+                copy.deepcopy(reg)
+                for por_data in self._por_funcionario.values()
+                for reg in por_data.values()
+                if reg.get(atributo) == valor
+            ]
+        return iter(registros)
+
+class RepositorioUsuarios:
+    def __init__(self):
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def obter(self, usuario_id):
+        return copy.deepcopy(self._itens.get(usuario_id))
+
+    def criar(self, usuario):
+        with self._lock:
+            if usuario['usuario_id'] in self._itens:
+                raise ItemJaExiste(usuario['usuario_id'])
+            self._itens[usuario['usuario_id']] = copy.deepcopy(usuario)
+
+class ArmazenamentoFotos:
+    def __init__(self):
+        self.arquivos = {}
+
+    def enviar(self, imagem, nome_arquivo):
+        self.arquivos[nome_arquivo] = bytes(imagem)
+        return f"memoria://fotos/{nome_arquivo}"
+
+    def baixar(self, foto_url):
+        return self.arquivos[foto_url[len("memoria://fotos/"):]]
+
+class ArmazenamentoEmbeddings:
+    def __init__(self):
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def listar(self, empresa_id):
+        with self._lock:
+            itens = [dict(item) for (empresa, _), item in sorted(self._itens.items()) if empresa == empresa_id]
+        return iter(itens)
+
+    def obter_varios(self, empresa_id, funcionario_ids):
+        with self._lock:
+            itens = [self._itens.get((empresa_id, funcionario_id)) for funcionario_id in funcionario_ids]
+        return iter([dict(item) for item in itens if item])
+
+    def salvar(self, empresa_id, funcionario_id, face_id, vetor):
+        with self._lock:
+            self._itens[(empresa_id, funcionario_id)] = {
+                'empresa_id': empresa_id,
+                'funcionario_id': funcionario_id,
+                'face_id': face_id,
+                'vetor': bytes(vetor)
+            }
+
+    def remover(self, empresa_id, funcionario_id):
+        with self._lock:
+            self._itens.pop((empresa_id, funcionario_id), None)
+
+class ReconhecedorFaces:
+    """
+    Reconhece por igualdade de bytes (sha256) com uma foto já indexada,
+    com uma "coleção" por empresa como na versão AWS
+    """
+
+    def __init__(self):
+        self._faces = {}
+        self._por_digest = {}
+        self._lock = threading.Lock()
+
+    def reconhecer(self, imagem, empresa_id=None):
+        digest = hashlib.sha256(imagem).hexdigest()
+        if not empresa_id:
+            return None  # Como na versão AWS: sem empresa não há coleção a consultar
+        with self._lock:
+            return self._por_digest.get((empresa_id, digest))
+
+    def indexar(self, imagem, funcionario_id, empresa_id, atributos="DEFAULT"):
+        if not imagem:
+            return None  # Sem rosto detectado
+        digest = hashlib.sha256(imagem).hexdigest()
+        face_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"{empresa_id}:{funcionario_id}:{digest}"))
+        with self._lock:
+            self._faces[face_id] = (funcionario_id, digest, empresa_id)
+            self._por_digest[(empresa_id, digest)] = funcionario_id
+        return face_id
+
+    def remover(self, face_ids, empresa_id):
+        with self._lock:
+            for face_id in face_ids:
+                face = self._faces.pop(face_id, None)
+                if face and self._por_digest.get((face[2], face[1])) == face[0]:
+                    del self._por_digest[(face[2], face[1])]
+
+    def localizar_faces(self, funcionario_id, empresa_id):
+        with self._lock:
+            return [
+                face_id for face_id, (dono, _, empresa) in self._faces.items()
+                if dono == funcionario_id and empresa == empresa_id
+            ]
+
+    def remover_do_funcionario(self, funcionario, manter=None):
+        if funcionario.get('face_id'):
+            faces = [funcionario['face_id']]
+        else:
+            faces = self.localizar_faces(funcionario['id'], funcionario.get('empresa_id'))
+        self.remover([face_id for face_id in faces if face_id != manter], funcionario.get('empresa_id'))
+
+def criar_repositorios():
+    return Repositorios(
+        funcionarios=RepositorioFuncionarios(),
+        registros=RepositorioRegistros(),
+        usuarios=RepositorioUsuarios(),
+        fotos=ArmazenamentoFotos(),
+        faces=ReconhecedorFaces(),
+        embeddings=ArmazenamentoEmbeddings()
+    )
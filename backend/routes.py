@@ -1,23 +1,27 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import CORS, cross_origin
 from datetime import datetime, timedelta
-import uuid
-import tempfile
 import os
-import boto3
-from aws_utils import (
-    tabela_funcionarios, tabela_registros, enviar_s3, reconhecer_funcionario, rekognition, BUCKET, COLLECTION, REGIAO, tabela_usuarioempresa
-)
+import uuid
+from repositorios import obter_repositorios, ConflitoPonto, ItemJaExiste
+from regras_ponto import proximo_tipo
+from imagens import normalizar_imagem
+from cache_reconhecimento import reconhecimentos_recentes, tempo_de_espera
+from cadastro_lote import ler_csv, ler_zip, montar_itens, cadastrar_lote, LoteInvalido
+from paralelo import executar, PrazoEsgotado
+from sincronizacao_pontos import ler_pontos, sincronizar, SincronizacaoInvalida
 from functools import wraps
 from auth import verify_token
+from paginacao import ler_paginacao, codificar_cursor, CursorInvalido
 from werkzeug.security import check_password_hash
-import jwt
 from flask import current_app
-from boto3.dynamodb.conditions import Attr
-
-s3 = boto3.client('s3', region_name=REGIAO)
+from logs import obter_log
+from metricas import contar
 
 routes = Blueprint('routes', __name__)
+log = obter_log('rotas')
+
+DIAS_TOKEN_QUIOSQUE = int(os.environ.get('PONTO_QUIOSQUE_DIAS', 365))
 
 # Enable CORS for all routes in this blueprint
 CORS(routes, resources={
@@ -28,9 +32,12 @@ CORS(routes, resources={
     }
 })
 
-def token_required(f):
+def _exigir_token(f, aceitar_quiosque):
     @wraps(f)
     def decorated(*args, **kwargs):
+        # Preflight CORS não envia Authorization; a rota responde o OPTIONS sozinha
+        if request.method == 'OPTIONS':
+            return f({}, *args, **kwargs)
         token = None
         # O token pode vir no header Authorization: Bearer <token>
         if 'Authorization' in request.headers:
@@ -39,12 +46,20 @@ def token_required(f):
                 token = auth_header.split(' ')[1]
         if not token:
             return jsonify({'error': 'Token ausente'}), 401
-        payload = verify_token(token)
+        payload = verify_token(token, aceitar_quiosque=aceitar_quiosque)
         if not payload:
             return jsonify({'error': 'Token inválido'}), 401
         return f(payload, *args, **kwargs)
     return decorated
 
+def token_required(f):
+    """Rotas da empresa: só o token do login"""
+    return _exigir_token(f, aceitar_quiosque=False)
+
+def quiosque_required(f):
+    """Rotas do quiosque: token do login ou token de quiosque (POST /api/quiosques/token)"""
+    return _exigir_token(f, aceitar_quiosque=True)
+
 @routes.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin()
 def health():
@@ -59,7 +74,8 @@ def health():
 
 @routes.route('/registros/<registro_id>', methods=['DELETE', 'OPTIONS'])
 @cross_origin()
-def deletar_registro(registro_id):
+@token_required
+def deletar_registro(payload, registro_id):
     if request.method == 'OPTIONS':
         # Handle preflight request
         response = jsonify({'status': 'OK'})
@@ -69,27 +85,111 @@ def deletar_registro(registro_id):
         return response
         
     try:
-        # Buscar o registro pelo registro_id (scan, pois não é chave primária)
-        response = tabela_registros.scan(
-            FilterExpression=Attr('registro_id').eq(registro_id)
-        )
-        items = response.get('Items', [])
-        if not items:
+        empresa_id = payload.get('empresa_id')
+        repos = obter_repositorios()
+        # Buscar o registro pelo registro_id (leitura pontual, sem scan)
+        registro = repos.registros.obter_por_id(registro_id)
+        if not registro or registro.get('empresa_id') != empresa_id:
+            return jsonify({'error': 'Registro não encontrado'}), 404
+        # Exclusão condicional à empresa; estado e horas do dia são ajustados junto
+        if not repos.registros.excluir(registro, empresa_id):
             return jsonify({'error': 'Registro não encontrado'}), 404
-        registro = items[0]
-        # Deletar usando a chave composta correta
-        tabela_registros.delete_item(Key={
-            'funcionario_id': registro['funcionario_id'],
-            'data_hora': registro['data_hora']
-        })
         return jsonify({'message': 'Registro deletado com sucesso!'}), 200
     except Exception as e:
-        print(f"Erro ao deletar registro: {str(e)}")
+        log.erro('deletar_registro', erro=e, registro_id=registro_id)
         return jsonify({'error': 'Erro ao deletar registro'}), 500
 
+def identificar_dispositivo(payload):
+    """Quiosque/app que enviou a foto: id do token de quiosque, informado pelo cliente ou IP de origem"""
+    dispositivo = (payload.get('dispositivo_id') or request.form.get('dispositivo_id')
+                   or request.headers.get('X-Dispositivo-Id'))
+    if not dispositivo:
+        encaminhado = request.headers.get('X-Forwarded-For', '')
+        dispositivo = encaminhado.split(',')[0].strip() or request.remote_addr or 'desconhecido'
+    return dispositivo
+
+def resposta_repetida(recente):
+    """(resposta, status) da primeira foto para a repetição, sem registrar outro ponto"""
+    resposta, status = recente.aguardar(tempo_de_espera())
+    if resposta is None:
+        return {'success': False, 'message': 'Ponto já está sendo registrado, tente novamente'}, 409
+    contar('CacheReconhecimentoAcertos')
+    return dict(resposta, repetido=True), status
+
+def registrar_reconhecido(repos, imagem, empresa_id, parecidas, proprio):
+    """Reconhece a foto e registra o ponto; retorna (resposta, status)"""
+    # Foto quase igual a uma recente do dispositivo que reconheceu alguém: é o
+    # mesmo funcionário, e a repetição recebe a resposta dela sem chamar o Rekognition
+    for recente in parecidas:
+        if not recente.aguardar_identificacao(tempo_de_espera()):
+            # Sem saber quem está na outra foto, não arrisca um segundo ponto
+            return {'success': False, 'message': 'Ponto já está sendo registrado, tente novamente'}, 409
+        if recente.funcionario_id:
+            proprio.identificar(recente.funcionario_id)
+            return resposta_repetida(recente)
+    contar('CacheReconhecimentoFalhas')
+
+    funcionario_id = repos.faces.reconhecer(imagem, empresa_id)
+    proprio.identificar(funcionario_id)
+    log.debug('reconhecimento', funcionario_id=funcionario_id, empresa_id=empresa_id)
+
+    if not funcionario_id:
+        return {'success': False, 'message': 'Funcionário não reconhecido'}, 404
+
+    # Cadastro (cache da empresa) e estado do último ponto lidos ao mesmo tempo
+    funcionario, estado = executar(
+        lambda: repos.diretorio.obter(funcionario_id),
+        lambda: repos.registros.obter_estado(funcionario_id)
+    )
+
+    if not funcionario:
+        return {'success': False, 'message': 'Funcionário não encontrado'}, 404
+
+    # Face ainda na coleção global pode ser de outra empresa
+    if empresa_id and funcionario.get('empresa_id') != empresa_id:
+        return {'success': False, 'message': 'Funcionário não reconhecido'}, 404
+
+    # Entrada/saída decidida pelo estado do último ponto (uma leitura); registro
+    # e estado são gravados juntos, e um ponto simultâneo força reler o estado
+    for tentativa in range(3):
+        if tentativa:
+            estado = repos.registros.obter_estado(funcionario_id)
+        agora = datetime.now()
+        tipo = proximo_tipo(estado, agora.strftime('%Y-%m-%d'))
+
+        registro = {
+            'registro_id': str(uuid.uuid4()),
+            'funcionario_id': funcionario_id,
+            'data_hora': agora.strftime('%Y-%m-%d %H:%M:%S'),
+            'tipo': tipo,
+            'empresa_id': funcionario.get('empresa_id'),
+            'empresa_nome': funcionario.get('empresa_nome')
+        }
+        try:
+            repos.registros.registrar_com_estado(registro, estado)
+            break
+        except ConflitoPonto:
+            log.aviso('ponto_simultaneo', funcionario_id=funcionario_id, tentativa=tentativa + 1)
+    else:
+        return {'success': False, 'message': 'Ponto já está sendo registrado, tente novamente'}, 409
+
+    # Foto guardada como evidência do ponto, sem esperar o envio ao S3
+    try:
+        repos.evidencias.enfileirar(registro, imagem)
+    except Exception as e:
+        log.erro('enfileirar_evidencia', erro=e, registro_id=registro['registro_id'])
+
+    return {
+        'success': True,
+        'funcionario': funcionario['nome'],
+        'hora': registro['data_hora'],
+        'tipo': tipo
+    }, 200
+
 @routes.route('/registrar_ponto', methods=['POST', 'OPTIONS'])
 @cross_origin()
-def registrar_ponto():
+@quiosque_required
+def registrar_ponto(payload):
     if request.method == 'OPTIONS':
         # Handle preflight request
         response = jsonify({'status': 'OK'})
@@ -98,6 +198,11 @@ def registrar_ponto():
         response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
         return response
         
+    # A busca fica restrita à coleção da empresa do token: sem empresa não há ponto
+    empresa_id = payload.get('empresa_id')
+    if not empresa_id:
+        return jsonify({'success': False, 'message': 'Token sem empresa'}), 403
+
     try:
         if 'foto' not in request.files:
             return jsonify({
@@ -105,108 +210,154 @@ def registrar_ponto():
                 'message': 'Nenhuma foto enviada'
             }), 400
 
-        foto = request.files['foto']
-        temp_path = os.path.join(tempfile.gettempdir(), f"temp_{uuid.uuid4().hex}.jpg")
-        foto.save(temp_path)
-
-        print("[DEBUG] Tentando reconhecer funcionário...")
-        funcionario_id = reconhecer_funcionario(temp_path)
-        os.remove(temp_path)
-        print(f"[DEBUG] Resultado reconhecimento: {funcionario_id if funcionario_id else 'Não reconhecido'}")
-
-        if not funcionario_id:
-            return jsonify({
-                'success': False,
-                'message': 'Funcionário não reconhecido'
-            }), 404
-
-        # Buscar dados do funcionário
-        response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-        funcionario = response.get('Item')
+        repos = obter_repositorios()
+        # A foto fica em memória e é normalizada (orientação, tamanho, JPEG) antes do Rekognition
+        imagem = normalizar_imagem(request.files['foto'].read())
 
-        if not funcionario:
-            return jsonify({
-                'success': False,
-                'message': 'Funcionário não encontrado'
-            }), 404
+        # Foto repetida do mesmo dispositivo (toque duplo, reenvio do app): a entrada
+        # é aberta antes do reconhecimento, e a repetição recebe a resposta da primeira
+        dispositivo = f"{empresa_id}:{identificar_dispositivo(payload)}"
+        parecidas, proprio = reconhecimentos_recentes.iniciar(imagem, dispositivo)
+        if proprio is None:
+            resposta, status = resposta_repetida(parecidas[0])
+            return jsonify(resposta), status
 
-        funcionario_nome = funcionario['nome']
-        agora = datetime.now()
-        hoje = agora.strftime('%Y-%m-%d')
-        
-        response_registros = tabela_registros.scan(
-            FilterExpression=Attr('funcionario_id').eq(funcionario_id) & Attr('data_hora').begins_with(hoje)
-        )
-        registros_do_dia = sorted(response_registros['Items'], key=lambda x: x['data_hora'])
-
-        tipo = 'entrada' if not registros_do_dia or registros_do_dia[-1]['tipo'] == 'saída' else 'saída'
-
-        registro = {
-            'registro_id': str(uuid.uuid4()),
-            'funcionario_id': funcionario_id,
-            'data_hora': agora.strftime('%Y-%m-%d %H:%M:%S'),
-            'tipo': tipo,
-            'empresa_id': funcionario.get('empresa_id'),
-            'empresa_nome': funcionario.get('empresa_nome')
-        }
-        tabela_registros.put_item(Item=registro)
+        resposta, status = None, None
+        try:
+            resposta, status = registrar_reconhecido(repos, imagem, empresa_id, parecidas, proprio)
+        finally:
+            # Quem espera por esta foto recebe a mesma resposta (ou "tente novamente" se falhou)
+            reconhecimentos_recentes.concluir(dispositivo, proprio, resposta, status)
+        return jsonify(resposta), status
+
+    except PrazoEsgotado as e:
+        log.aviso('prazo_esgotado', erro=str(e))
+        return jsonify({
+            'success': False,
+            'message': 'Tempo limite excedido, tente novamente'
+        }), 504
+    except Exception as e:
+        log.erro('registrar_ponto', erro=e)
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno no servidor'
+        }), 500
 
+@routes.route('/registrar_ponto/lote', methods=['POST'])
+@quiosque_required
+def sincronizar_pontos(payload):
+    """Pontos batidos com o quiosque offline; ver sincronizacao_pontos.py"""
+    empresa_id = payload.get('empresa_id')
+    if not empresa_id:
+        return jsonify({'success': False, 'message': 'Token sem empresa'}), 403
+    try:
+        try:
+            pontos = ler_pontos(request.form, request.files)
+        except SincronizacaoInvalida as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        resultados = sincronizar(obter_repositorios(), pontos, empresa_id)
+        totais = {}
+        for resultado in resultados:
+            totais[resultado['status']] = totais.get(resultado['status'], 0) + 1
         return jsonify({
             'success': True,
-            'funcionario': funcionario_nome,
-            'hora': registro['data_hora'],
-            'tipo': tipo
+            'total': len(resultados),
+            'registrados': totais.get('registrado', 0),
+            'duplicados': totais.get('duplicado', 0),
+            'nao_reconhecidos': totais.get('nao_reconhecido', 0),
+            'erros': totais.get('erro', 0),
+            'pontos': resultados
         })
-
     except Exception as e:
-        print(f"Erro no registro de ponto: {str(e)}")
+        log.erro('sincronizar_pontos', erro=e)
         return jsonify({
             'success': False,
             'message': 'Erro interno no servidor'
         }), 500
 
+@routes.route('/quiosques/token', methods=['POST'])
+@token_required
+def emitir_token_quiosque(payload):
+    """
+    Token de longa duração (PONTO_QUIOSQUE_DIAS, padrão 365) para o app do
+    quiosque: identifica a empresa e o dispositivo e só vale nas rotas de ponto
+    """
+    import jwt
+    from auth import get_secret_key
+
+    empresa_id = payload.get('empresa_id')
+    if not empresa_id:
+        return jsonify({'error': 'Token sem empresa'}), 403
+    data = request.get_json(silent=True) or {}
+    dispositivo_id = str(data.get('dispositivo_id') or f"quiosque_{uuid.uuid4().hex[:8]}")
+    expira_em = datetime.utcnow() + timedelta(days=DIAS_TOKEN_QUIOSQUE)
+    token = jwt.encode({
+        'quiosque': True,
+        'empresa_id': empresa_id,
+        'empresa_nome': payload.get('empresa_nome'),
+        'dispositivo_id': dispositivo_id,
+        'exp': expira_em
+    }, get_secret_key(), algorithm="HS256")
+    log.info('token_quiosque', empresa_id=empresa_id, dispositivo_id=dispositivo_id)
+    return jsonify({'token': token, 'dispositivo_id': dispositivo_id, 'expira_em': expira_em.strftime('%Y-%m-%d')}), 201
+
 @routes.route('/funcionarios', methods=['GET'])
 @token_required  
 def listar_funcionarios(payload):
     try:
-        print('=== DEBUG FUNCIONARIOS ===')
         empresa_id = payload.get('empresa_id')
-        print(f'empresa_id: {empresa_id}')
         
-        # TESTE 1: Scan sem filtro (retorna TODOS os funcionários)
+        escopo_cursor = f"funcionarios:{empresa_id}"
         try:
-            print('Tentando scan sem filtro...')
-            response = tabela_funcionarios.scan()
-            all_items = response.get('Items', [])
-            print(f'Total de funcionários na tabela: {len(all_items)}')
-            
-            # Log dos primeiros itens para debug
-            for i, item in enumerate(all_items[:3]):
-                print(f'Item {i}: {item}')
-            
-            # TESTE 2: Filtrar manualmente em Python (não no DynamoDB)
-            empresa_funcionarios = []
-            for item in all_items:
-                item_empresa_id = item.get('empresa_id')
-                print(f'Comparando: "{item_empresa_id}" == "{empresa_id}"')
-                if item_empresa_id == empresa_id:
-                    empresa_funcionarios.append(item)
-                    
-            print(f'Funcionários filtrados para empresa {empresa_id}: {len(empresa_funcionarios)}')
-            
-            return jsonify({
+            limite, chave_inicial = ler_paginacao(request.args, escopo_cursor)
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        repos = obter_repositorios()
+        # Paginado (?limit=&cursor=): Query no GSI da empresa a partir do ExclusiveStartKey do cursor
+        if limite:
+            try:
+                if chave_inicial:
+                    funcionarios, proxima_chave = repos.funcionarios.paginar_empresa(empresa_id, limite, chave_inicial)
+                    total = None
+                else:
+                    # O total (COUNT na empresa inteira) só vai na primeira página, lido junto com ela
+                    (funcionarios, proxima_chave), total = executar(
+                        lambda: repos.funcionarios.paginar_empresa(empresa_id, limite, chave_inicial),
+                        lambda: repos.funcionarios.contar_empresa(empresa_id)
+                    )
+            except Exception as e:
+                log.erro('paginar_funcionarios', erro=e, empresa_id=empresa_id)
+                return jsonify({'error': f'Erro no DynamoDB: {str(e)}'}), 500
+            resposta = {
                 'success': True,
-                'total_funcionarios': len(all_items),
-                'funcionarios_empresa': len(empresa_funcionarios),
-                'funcionarios': empresa_funcionarios
-            })
-            
+                'funcionarios_empresa': len(funcionarios),
+                'funcionarios': funcionarios,
+                'next_cursor': codificar_cursor(proxima_chave, escopo_cursor)
+            }
+            if total is not None:
+                resposta['total_funcionarios'] = total
+            return jsonify(resposta)
+        
+        # Cadastro da empresa a partir do cache (recarregado se outra instância o alterou)
+        try:
+            empresa_funcionarios = list(repos.diretorio.funcionarios(empresa_id).values())
         except Exception as e:
-            print(f'ERRO no scan: {str(e)}')
+            log.erro('carregar_funcionarios', erro=e, empresa_id=empresa_id)
             return jsonify({'error': f'Erro no DynamoDB: {str(e)}'}), 500
+        log.debug('funcionarios_empresa', empresa_id=empresa_id, total=len(empresa_funcionarios))
+        
+        return jsonify({
+            'success': True,
+            'total_funcionarios': len(empresa_funcionarios),
+            'funcionarios_empresa': len(empresa_funcionarios),
+            'funcionarios': empresa_funcionarios,
+            'next_cursor': None
+        })
             
     except Exception as e:
-        print(f'Erro geral: {str(e)}')
+        log.erro('listar_funcionarios', erro=e)
         return jsonify({'error': str(e)}), 500
 
 @routes.route('/funcionarios/<funcionario_id>', methods=['GET'])
@@ -214,8 +365,7 @@ def listar_funcionarios(payload):
 def obter_funcionario(payload, funcionario_id):
     try:
         empresa_id = payload.get('empresa_id')
-        response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-        funcionario = response.get('Item')
+        funcionario = obter_repositorios().funcionarios.obter(funcionario_id)
         if not funcionario or funcionario.get('empresa_id') != empresa_id:
             return jsonify({'error': 'Funcionário não encontrado'}), 404
         return jsonify(funcionario)
@@ -227,8 +377,8 @@ def obter_funcionario(payload, funcionario_id):
 def atualizar_funcionario(payload, funcionario_id):
     try:
         empresa_id = payload.get('empresa_id')
-        response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-        funcionario = response.get('Item')
+        repos = obter_repositorios()
+        funcionario = repos.funcionarios.obter(funcionario_id)
         if not funcionario or funcionario.get('empresa_id') != empresa_id:
             return jsonify({'error': 'Funcionário não encontrado'}), 404
         
@@ -240,41 +390,27 @@ def atualizar_funcionario(payload, funcionario_id):
             
         # Atualizar foto se fornecida
         if 'foto' in request.files:
-            foto = request.files['foto']
-            temp_path = os.path.join(tempfile.gettempdir(), f"temp_{uuid.uuid4().hex}.jpg")
-            foto.save(temp_path)
-            s3.upload_file(
-                temp_path,
-                BUCKET,
-                f"funcionarios/{funcionario_id}.jpg",
-                ExtraArgs={'ContentType': 'image/jpeg'}
+            imagem = normalizar_imagem(request.files['foto'].read())
+            # Indexa a nova face antes de remover a antiga: sem rosto na foto nova,
+            # o funcionário continua reconhecido pela anterior
+            face_id = repos.faces.indexar(imagem, funcionario_id, empresa_id, atributos="ALL")
+            if not face_id:
+                return jsonify({'error': 'Nenhum rosto detectado na imagem.'}), 400
+            # Face antiga removida enquanto a foto nova sobe para o S3
+            _, foto_url = executar(
+                lambda: repos.faces.remover_do_funcionario(funcionario, manter=face_id),
+                lambda: repos.fotos.enviar(imagem, f"funcionarios/{funcionario_id}.jpg")
             )
-            foto_url = f"https://{BUCKET}.s3.{REGIAO}.amazonaws.com/funcionarios/{funcionario_id}.jpg"
-            if 'face_id' in funcionario:
-                rekognition.delete_faces(
-                    CollectionId=COLLECTION,
-                    FaceIds=[funcionario['face_id']]
-                )
-            with open(temp_path, 'rb') as image:
-                rekognition_response = rekognition.index_faces(
-                    CollectionId=COLLECTION,
-                    Image={'Bytes': image.read()},
-                    ExternalImageId=funcionario_id,
-                    MaxFaces=1,
-                    QualityFilter="AUTO",
-                    DetectionAttributes=["ALL"]
-                )
-            face_id = rekognition_response['FaceRecords'][0]['Face']['FaceId']
-            os.remove(temp_path)
             funcionario['foto_url'] = foto_url
             funcionario['face_id'] = face_id
             
         funcionario['nome'] = nome
         funcionario['cargo'] = cargo
-        tabela_funcionarios.put_item(Item=funcionario)
+        repos.funcionarios.salvar(funcionario)
+        repos.diretorio.aplicar(empresa_id, salvos=[funcionario])
         return jsonify({'message': 'Funcionário atualizado com sucesso!'}), 200
     except Exception as e:
-        print(f"Erro ao atualizar funcionário: {str(e)}")
+        log.erro('atualizar_funcionario', erro=e, funcionario_id=funcionario_id)
         return jsonify({'error': 'Erro ao atualizar funcionário'}), 500
 
 @routes.route('/funcionarios/<funcionario_id>/foto', methods=['PUT'])
@@ -282,40 +418,26 @@ def atualizar_funcionario(payload, funcionario_id):
 def atualizar_foto_funcionario(payload, funcionario_id):
     if 'foto' not in request.files:
         return jsonify({"error": "Nenhuma foto enviada"}), 400
-    foto = request.files['foto']
-    temp_path = os.path.join(tempfile.gettempdir(), f"temp_{uuid.uuid4().hex}.jpg")
-    foto.save(temp_path)
+    imagem = normalizar_imagem(request.files['foto'].read())
     try:
         empresa_id = payload.get('empresa_id')
-        response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-        funcionario = response.get('Item')
+        repos = obter_repositorios()
+        funcionario = repos.funcionarios.obter(funcionario_id)
         if not funcionario or funcionario.get('empresa_id') != empresa_id:
             return jsonify({'error': 'Funcionário não encontrado'}), 404
-        response_faces = rekognition.list_faces(CollectionId=COLLECTION)
-        for face in response_faces['Faces']:
-            if face['ExternalImageId'] == funcionario_id:
-                rekognition.delete_faces(
-                    CollectionId=COLLECTION,
-                    FaceIds=[face['FaceId']]
-                )
-                break
+        face_id = repos.faces.indexar(imagem, funcionario_id, empresa_id)
+        if not face_id:
+            return jsonify({'error': 'Nenhum rosto detectado na imagem.'}), 400
         foto_nome = f"{funcionario_id}.jpg"
-        foto_url = enviar_s3(temp_path, foto_nome)
-        rekognition.index_faces(
-            CollectionId=COLLECTION,
-            Image={'S3Object': {'Bucket': BUCKET, 'Name': foto_nome}},
-            ExternalImageId=funcionario_id
-        )
-        tabela_funcionarios.update_item(
-            Key={'id': funcionario_id},
-            UpdateExpression='SET foto_url = :url',
-            ExpressionAttributeValues={':url': foto_url}
+        _, foto_url = executar(
+            lambda: repos.faces.remover_do_funcionario(funcionario, manter=face_id),
+            lambda: repos.fotos.enviar(imagem, foto_nome)
         )
+        repos.funcionarios.atualizar_foto(funcionario_id, foto_url, face_id)
+        repos.diretorio.aplicar(empresa_id, salvos=[dict(funcionario, foto_url=foto_url, face_id=face_id)])
         return jsonify({"success": True, "foto_url": foto_url})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        os.remove(temp_path)
 
 @routes.route('/funcionarios/<funcionario_id>', methods=['DELETE'])
 def excluir_funcionario(funcionario_id):
@@ -338,32 +460,26 @@ def excluir_funcionario(funcionario_id):
         empresa_id = payload.get('empresa_id')
 
         # Buscar funcionário
-        response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-        funcionario = response.get('Item')
+        repos = obter_repositorios()
+        funcionario = repos.funcionarios.obter(funcionario_id)
 
         if not funcionario or funcionario.get('empresa_id') != empresa_id:
             return jsonify({'error': 'Funcionário não encontrado'}), 404
 
         # Remover face do Rekognition
         try:
-            rekognition_response = rekognition.list_faces(CollectionId=COLLECTION)
-            for face in rekognition_response['Faces']:
-                if face['ExternalImageId'] == funcionario_id:
-                    rekognition.delete_faces(
-                        CollectionId=COLLECTION,
-                        FaceIds=[face['FaceId']]
-                    )
-                    break
+            repos.faces.remover_do_funcionario(funcionario)
         except Exception as e:
-            print(f"Erro ao excluir face no Rekognition: {str(e)}")
+            log.erro('excluir_face', erro=e, funcionario_id=funcionario_id)
 
         # Remover funcionário do DynamoDB
-        tabela_funcionarios.delete_item(Key={'id': funcionario_id})
+        repos.funcionarios.excluir(funcionario_id)
+        repos.diretorio.aplicar(empresa_id, excluidos=[funcionario_id])
 
         return jsonify({'message': 'Funcionário excluído com sucesso'}), 200
 
     except Exception as e:
-        print(f"Erro ao excluir funcionário: {str(e)}")
+        log.erro('excluir_funcionario', erro=e, funcionario_id=funcionario_id)
         return jsonify({'error': 'Erro ao excluir funcionário'}), 500
 
 @routes.route('/cadastrar_funcionario', methods=['POST'])
@@ -382,34 +498,25 @@ def cadastrar_funcionario(payload):
         funcionario_id = f"{nome.lower().replace(' ', '_')}_{uuid.uuid4().hex[:6]}"
         foto_nome = f"funcionarios/{funcionario_id}.jpg"
 
-        # Salvar a foto temporariamente e enviar para S3
-        temp_path = os.path.join(tempfile.gettempdir(), foto_nome.split('/')[-1])
-        foto.save(temp_path)
-        foto_url = enviar_s3(temp_path, foto_nome)
-
-        # Indexar no Rekognition
-        with open(temp_path, 'rb') as image:
-            rekognition_response = rekognition.index_faces(
-                CollectionId=COLLECTION,
-                Image={'Bytes': image.read()},
-                ExternalImageId=funcionario_id,
-                MaxFaces=1,
-                QualityFilter="AUTO",
-                DetectionAttributes=["DEFAULT"]
-            )
-
-        if not rekognition_response['FaceRecords']:
-            os.remove(temp_path)
-            return jsonify({"error": "Nenhum rosto detectado na imagem."}), 400
-
-        face_id = rekognition_response['FaceRecords'][0]['Face']['FaceId']
-
         # Dados da empresa a partir do token
         empresa_nome = payload.get('empresa_nome')
         empresa_id = payload.get('empresa_id')
 
+        # Ler a foto uma vez e enviar os mesmos bytes para S3 e Rekognition
+        repos = obter_repositorios()
+        imagem = normalizar_imagem(foto.read())
+
+        # Envio ao S3 e indexação na coleção da empresa ao mesmo tempo
+        foto_url, face_id = executar(
+            lambda: repos.fotos.enviar(imagem, foto_nome),
+            lambda: repos.faces.indexar(imagem, funcionario_id, empresa_id)
+        )
+
+        if not face_id:
+            return jsonify({"error": "Nenhum rosto detectado na imagem."}), 400
+
         # Salvar no DynamoDB
-        tabela_funcionarios.put_item(Item={
+        funcionario = {
             'id': funcionario_id,
             'nome': nome,
             'cargo': cargo,
@@ -418,9 +525,9 @@ def cadastrar_funcionario(payload):
             'empresa_nome': empresa_nome,
             'empresa_id': empresa_id,
             'data_cadastro': datetime.now().strftime('%Y-%m-%d')
-        })
-
-        os.remove(temp_path)
+        }
+        repos.funcionarios.salvar(funcionario)
+        repos.diretorio.aplicar(empresa_id, salvos=[funcionario])
 
         return jsonify({
             "success": True,
@@ -431,9 +538,45 @@ def cadastrar_funcionario(payload):
         }), 201
 
     except Exception as e:
-        print(f"Erro ao cadastrar funcionário: {str(e)}")
+        log.erro('cadastrar_funcionario', erro=e)
         return jsonify({"error": str(e)}), 500
 
+@routes.route('/funcionarios/lote', methods=['POST'])
+@token_required
+def cadastrar_funcionarios_lote(payload):
+    """CSV (nome, cargo, foto) + ZIP ou vários arquivos 'fotos'; ver cadastro_lote.py"""
+    try:
+        if 'csv' not in request.files:
+            return jsonify({'error': 'Envie o CSV com as colunas nome e cargo'}), 400
+        try:
+            linhas = ler_csv(request.files['csv'])
+            if 'zip' in request.files:
+                fotos = ler_zip(request.files['zip'])
+            else:
+                fotos = [(arquivo.filename, arquivo.read()) for arquivo in request.files.getlist('fotos')]
+            itens = montar_itens(linhas, fotos)
+        except (LoteInvalido, UnicodeDecodeError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        empresa_id = payload.get('empresa_id')
+        repos = obter_repositorios()
+        resultados = cadastrar_lote(repos, itens, empresa_id, payload.get('empresa_nome'))
+
+        totais = {}
+        for resultado in resultados:
+            totais[resultado['status']] = totais.get(resultado['status'], 0) + 1
+        return jsonify({
+            'success': not totais.get('erro'),
+            'total': len(resultados),
+            'cadastrados': totais.get('cadastrado', 0),
+            'existentes': totais.get('existente', 0),
+            'erros': totais.get('erro', 0),
+            'itens': resultados
+        })
+    except Exception as e:
+        log.erro('cadastrar_lote', erro=e)
+        return jsonify({'error': str(e)}), 500
+
 @routes.route('/registros', methods=['GET'])
 @token_required
 def listar_registros(payload):
@@ -444,25 +587,35 @@ def listar_registros(payload):
     
     try:
         empresa_id = payload.get('empresa_id')
-        print(f"[DEBUG] empresa_id: {empresa_id}")
         
         if not empresa_id:
             return jsonify({'error': 'Empresa ID não encontrado no token'}), 400
         
+        # O cursor só vale para a mesma consulta: filtros diferentes dariam outra ordem de páginas
+        escopo_cursor = f"registros:{empresa_id}:{funcionario_id or ''}:{data_inicio or ''}:{data_fim or ''}:{nome_funcionario or ''}"
+        try:
+            limite, chave_inicial = ler_paginacao(request.args, escopo_cursor)
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        repos = obter_repositorios()
         funcionarios_filtrados = []
+        # Nomes dos funcionários já lidos nesta requisição (evita um get_item por funcionário)
+        nomes_funcionarios = {}
         
-        # Buscar apenas funcionários da empresa
+        # Buscar apenas funcionários da empresa (cache do cadastro); o filtro
+        # por nome ignora acentos e maiúsculas, como o autocomplete
         try:
-            filtro_func = Attr('empresa_id').eq(empresa_id)
-            if nome_funcionario:
-                filtro_func = filtro_func & Attr('nome').contains(nome_funcionario)
-            
-            response_func = tabela_funcionarios.scan(FilterExpression=filtro_func)
-            funcionarios_filtrados = [f['id'] for f in response_func.get('Items', [])]
-            print(f"[DEBUG] funcionarios_filtrados: {funcionarios_filtrados}")
+            funcionarios_empresa = repos.diretorio.funcionarios(empresa_id)
+            ids_com_nome = repos.diretorio.indice_nomes(empresa_id).contem(nome_funcionario) if nome_funcionario else funcionarios_empresa
+            for fid in ids_com_nome:
+                if fid in funcionarios_empresa:
+                    nomes_funcionarios[fid] = funcionarios_empresa[fid].get('nome', 'Desconhecido')
+            funcionarios_filtrados = list(nomes_funcionarios)
+            log.debug('funcionarios_filtrados', empresa_id=empresa_id, total=len(funcionarios_filtrados))
             
         except Exception as e:
-            print(f"[DEBUG] Erro ao buscar funcionários: {str(e)}")
+            log.erro('buscar_funcionarios', erro=e, empresa_id=empresa_id)
             return jsonify({'error': 'Erro ao buscar funcionários da empresa'}), 500
         
         if funcionario_id:
@@ -474,36 +627,67 @@ def listar_registros(payload):
         
         # Se não houver funcionários na empresa, retornar vazio
         if not funcionarios_filtrados:
-            print("[DEBUG] Nenhum funcionário encontrado na empresa")
-            return jsonify([])
+            log.debug('empresa_sem_funcionarios', empresa_id=empresa_id)
+            return jsonify({'itens': [], 'next_cursor': None} if limite else [])
+        
+        funcionarios_validos = {fid for fid in funcionarios_filtrados if fid}
+        
+        # Resumo de horas: soma os agregados diários (HorasDiarias) do período,
+        # mantidos na gravação dos pontos, em vez de reprocessar cada registro
+        if not funcionario_id:
+            try:
+                if limite:
+                    # Paginado: uma página do Query em HorasDiarias (ExclusiveStartKey do
+                    # cursor), com uma linha por funcionário e dia; quem quer o total soma
+                    dias, proxima_chave = repos.registros.paginar_horas_diarias(
+                        empresa_id, limite, chave_inicial, data_inicio, data_fim,
+                        funcionario_ids=funcionarios_validos if nome_funcionario else None
+                    )
+                    pagina = [
+                        {
+                            'funcionario': nomes_funcionarios.get(dia.get('funcionario_id'), 'Desconhecido'),
+                            'funcionario_id': dia.get('funcionario_id'),
+                            'data': dia.get('data'),
+                            'horas_trabalhadas': str(timedelta(seconds=int(dia.get('segundos_trabalhados', 0))))
+                        }
+                        for dia in dias
+                    ]
+                    return jsonify({'itens': pagina, 'next_cursor': codificar_cursor(proxima_chave, escopo_cursor)})
+
+                segundos_por_funcionario = {}
+                for dia in repos.registros.horas_diarias(empresa_id, data_inicio, data_fim):
+                    fid = dia.get('funcionario_id')
+                    if fid in funcionarios_validos:
+                        segundos_por_funcionario[fid] = segundos_por_funcionario.get(fid, 0) + int(dia.get('segundos_trabalhados', 0))
+                
+                resultado = [
+                    {
+                        'funcionario': nomes_funcionarios.get(fid, 'Desconhecido'),
+                        'funcionario_id': fid,
+                        'horas_trabalhadas': str(timedelta(seconds=segundos))
+                    }
+                    for fid, segundos in segundos_por_funcionario.items()
+                ]
+                return jsonify(resultado)
+                
+            except Exception as e:
+                log.erro('buscar_horas_trabalhadas', erro=e, empresa_id=empresa_id)
+                return jsonify({'error': f'Erro ao buscar horas trabalhadas: {str(e)}'}), 500
         
-        # Construir filtro de registros de forma mais segura
+        # Registros do funcionário via Query na chave primária (ordenados por data_hora)
         try:
-            filtro_registros = Attr('empresa_id').eq(empresa_id)
-            
-            # Adicionar filtro de data se fornecido
-            if data_inicio and data_fim:
-                filtro_registros = filtro_registros & Attr('data_hora').between(
-                    f"{data_inicio} 00:00:00", 
-                    f"{data_fim} 23:59:59"
+            proxima_chave = None
+            if limite:
+                registros_encontrados, proxima_chave = repos.registros.paginar_funcionario(
+                    funcionario_id, limite, chave_inicial, data_inicio, data_fim
                 )
-            
-            # Adicionar filtro de funcionários de forma segura
-            if funcionarios_filtrados:
-                # Usar apenas funcionários que realmente existem
-                funcionarios_validos = [fid for fid in funcionarios_filtrados if fid]
-                if funcionarios_validos:
-                    filtro_registros = filtro_registros & Attr('funcionario_id').is_in(funcionarios_validos)
-                else:
-                    return jsonify([])
-            
-            print(f"[DEBUG] Executando scan com filtro...")
-            response = tabela_registros.scan(FilterExpression=filtro_registros)
-            registros = response.get('Items', [])
-            print(f"[DEBUG] Encontrados {len(registros)} registros")
+            else:
+                registros_encontrados = repos.registros.listar_funcionario(funcionario_id, data_inicio, data_fim)
+            registros = [reg for reg in registros_encontrados if reg.get('empresa_id') == empresa_id]
+            log.debug('registros_encontrados', funcionario_id=funcionario_id, total=len(registros))
             
         except Exception as e:
-            print(f"[DEBUG] Erro no scan de registros: {str(e)}")
+            log.erro('consultar_registros', erro=e, funcionario_id=funcionario_id)
             return jsonify({'error': f'Erro ao buscar registros: {str(e)}'}), 500
         
         # Formatar data para DD-MM-AAAA
@@ -514,98 +698,33 @@ def listar_registros(payload):
                     yyyy, mm, dd = data_part.split('-')
                     reg['data_hora'] = f"{dd}-{mm}-{yyyy} {hora_part}"
                 except (ValueError, IndexError) as e:
-                    print(f"[DEBUG] Erro ao formatar data {reg.get('data_hora', 'N/A')}: {str(e)}")
+                    log.aviso('formatar_data', data_hora=reg.get('data_hora'), erro=str(e))
         
-        # Se solicitou funcionário específico, retornar registros com nome
-        if funcionario_id:
-            try:
-                funcionario = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-                funcionario_nome = funcionario.get('Item', {}).get('nome', 'Desconhecido')
-                for registro in registros:
-                    registro['funcionario_nome'] = funcionario_nome
-                return jsonify(registros)
-            except Exception as e:
-                print(f"[DEBUG] Erro ao buscar nome do funcionário: {str(e)}")
-                return jsonify(registros)  # Retornar sem nome em caso de erro
-        
-        # Calcular horas trabalhadas por funcionário
-        try:
-            horas_trabalhadas_por_funcionario = {}
-            for registro in registros:
-                funcionario_id = registro['funcionario_id']
-                if funcionario_id not in horas_trabalhadas_por_funcionario:
-                    horas_trabalhadas_por_funcionario[funcionario_id] = {
-                        'nome': '',
-                        'horas_trabalhadas': timedelta()
-                    }
-                
-                if registro['tipo'] == 'entrada':
-                    try:
-                        horas_trabalhadas_por_funcionario[funcionario_id]['ultima_entrada'] = datetime.strptime(
-                            registro['data_hora'], '%d-%m-%Y %H:%M:%S'
-                        )
-                    except ValueError:
-                        try:
-                            horas_trabalhadas_por_funcionario[funcionario_id]['ultima_entrada'] = datetime.strptime(
-                                registro['data_hora'], '%d-%m-%Y %H:%M'
-                            )
-                        except ValueError as e:
-                            print(f"[DEBUG] Erro ao parsear entrada: {registro['data_hora']}: {str(e)}")
-                
-                elif registro['tipo'] == 'saída' and 'ultima_entrada' in horas_trabalhadas_por_funcionario[funcionario_id]:
-                    try:
-                        try:
-                            saida = datetime.strptime(registro['data_hora'], '%d-%m-%Y %H:%M:%S')
-                        except ValueError:
-                            saida = datetime.strptime(registro['data_hora'], '%d-%m-%Y %H:%M')
-                        
-                        entrada = horas_trabalhadas_por_funcionario[funcionario_id].pop('ultima_entrada')
-                        horas_trabalhadas_por_funcionario[funcionario_id]['horas_trabalhadas'] += saida - entrada
-                    except ValueError as e:
-                        print(f"[DEBUG] Erro ao parsear saída: {registro['data_hora']}: {str(e)}")
-            
-            # Buscar nomes dos funcionários
-            for funcionario_id, dados in horas_trabalhadas_por_funcionario.items():
-                try:
-                    funcionario = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-                    dados['nome'] = funcionario.get('Item', {}).get('nome', 'Desconhecido')
-                except Exception as e:
-                    print(f"[DEBUG] Erro ao buscar nome do funcionário {funcionario_id}: {str(e)}")
-                    dados['nome'] = 'Desconhecido'
-            
-            resultado = [
-                {
-                    'funcionario': dados['nome'],
-                    'funcionario_id': funcionario_id,
-                    'horas_trabalhadas': str(dados['horas_trabalhadas'])
-                }
-                for funcionario_id, dados in horas_trabalhadas_por_funcionario.items()
-            ]
-            
-            return jsonify(resultado)
-            
-        except Exception as e:
-            print(f"[DEBUG] Erro ao calcular horas: {str(e)}")
-            # Em caso de erro no cálculo, retornar registros simples
-            return jsonify(registros)
+        funcionario_nome = nomes_funcionarios.get(funcionario_id, 'Desconhecido')
+        for registro in registros:
+            registro['funcionario_nome'] = funcionario_nome
+        if limite:
+            return jsonify({'itens': registros, 'next_cursor': codificar_cursor(proxima_chave, escopo_cursor)})
+        return jsonify(registros)
             
     except Exception as e:
-        print(f"Erro geral ao filtrar registros: {str(e)}")
+        log.erro('listar_registros', erro=e)
         return jsonify({'error': 'Erro interno no servidor', 'message': str(e)}), 500
 
 @routes.route('/funcionarios/nome', methods=['GET'])
 @token_required
 def buscar_nomes(payload):
     nome_parcial = request.args.get('nome', '')
+    try:
+        limite = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número inteiro'}), 400
     try:
         empresa_id = payload.get('empresa_id')
-        response = tabela_funcionarios.scan(
-            FilterExpression=Attr('empresa_id').eq(empresa_id) & Attr('nome').contains(nome_parcial)
-        )
-        nomes = [funcionario['nome'] for funcionario in response['Items']]
-        return jsonify(nomes)
+        # Top-k do índice em memória (sem acento/caixa, prefixo e trigramas): [{'id', 'nome'}]
+        return jsonify(obter_repositorios().diretorio.indice_nomes(empresa_id).buscar(nome_parcial, limite))
     except Exception as e:
-        print(f"Erro ao buscar nomes: {str(e)}")
+        log.erro('buscar_nomes', erro=e)
         return jsonify({'error': 'Erro ao buscar nomes'}), 500
 
 @routes.route('/enviar-email-registros', methods=['POST'])
@@ -646,14 +765,14 @@ def enviar_email_registros():
             ])
         workbook.save(output)
         output.seek(0)
-        print(f"Simulando envio para {email_destino}")
-        print(f"Relatório de {funcionario} ({periodo}) com {len(registros)} registros")
+        log.info('relatorio_email_simulado', funcionario=funcionario, periodo=periodo,
+                 registros=len(registros), xlsx_bytes=len(output.getvalue()))
         return jsonify({
             'success': True,
             'message': f'Relatório enviado para {email_destino}'
         })
     except Exception as e:
-        print(f"Erro ao enviar email: {str(e)}")
+        log.erro('enviar_email', erro=e)
         return jsonify({'error': str(e)}), 500
 
 @routes.route('/registrar_ponto_manual', methods=['POST'])
@@ -673,23 +792,22 @@ def registrar_ponto_manual(payload):
     # Verifica se o funcionário existe e se pertence à empresa do usuário
     empresa_nome = payload.get('empresa_nome')
     empresa_id = payload.get('empresa_id')
-    response = tabela_funcionarios.get_item(Key={'id': funcionario_id})
-    funcionario = response.get('Item')
+    repos = obter_repositorios()
+    funcionario = repos.funcionarios.obter(funcionario_id)
     if not funcionario or funcionario.get('empresa_nome') != empresa_nome or funcionario.get('empresa_id') != empresa_id:
         return jsonify({'mensagem': 'Funcionário não encontrado'}), 404
         
     id_registro = str(uuid.uuid4())
-    # Salva no DynamoDB
-    tabela_registros.put_item(
-        Item={
-            'registro_id': id_registro,
-            'funcionario_id': funcionario_id,
-            'data_hora': data_hora,
-            'tipo': tipo,
-            'empresa_nome': empresa_nome,
-            'empresa_id': empresa_id
-        }
-    )
+    registro = {
+        'registro_id': id_registro,
+        'funcionario_id': funcionario_id,
+        'data_hora': data_hora,
+        'tipo': tipo,
+        'empresa_nome': empresa_nome,
+        'empresa_id': empresa_id
+    }
+    # Salva no DynamoDB (estado do último ponto e horas do dia são atualizados junto)
+    repos.registros.registrar_manual(registro)
     return jsonify({'mensagem': f'Ponto manual registrado como {tipo} com sucesso'}), 200
 
 @routes.route('/registros_protegido', methods=['GET'])
@@ -697,10 +815,7 @@ def registrar_ponto_manual(payload):
 def listar_registros_protegido(payload):
     company_id = payload.get("company_id")
     # Exemplo de implementação simples para buscar registros por company_id
-    response = tabela_registros.scan(
-        FilterExpression=Attr('company_id').eq(company_id)
-    )
-    registros = response.get('Items', [])
+    registros = list(obter_repositorios().registros.listar_por_atributo('company_id', company_id))
     return jsonify(registros)
 
 @routes.route('/login', methods=['POST', 'OPTIONS'])
@@ -728,8 +843,7 @@ def login():
         senha = data.get('senha')
 
         # Buscar o usuário na tabela UsuarioEmpresa pelo usuario_id
-        response = tabela_usuarioempresa.get_item(Key={'usuario_id': usuario_id})
-        usuario = response.get('Item')
+        usuario = obter_repositorios().usuarios.obter(usuario_id)
 
         if not usuario or not verify_password(senha, usuario['senha_hash']):
             return jsonify({'error': 'Credenciais inválidas'}), 401
@@ -745,14 +859,12 @@ def login():
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=12)
         }, secret_key, algorithm="HS256")
         
-        print(f"[DEBUG] Token gerado com SECRET_KEY tipo: {type(secret_key)}")
-        
         response = jsonify({'token': token})
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response
         
     except Exception as e:
-        print(f"Erro no login: {str(e)}")
+        log.erro('login', erro=e)
         response = jsonify({'error': str(e)})
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 500
@@ -792,29 +904,28 @@ def cadastrar_usuario_empresa():
         if not re.match(email_regex, email):
             return jsonify({'error': 'Email inválido'}), 400
         
-        # Verifica se usuario_id já existe
-        response = tabela_usuarioempresa.get_item(Key={'usuario_id': usuario_id})
-        if 'Item' in response:
-            return jsonify({'error': 'Usuário já existe com esse usuario_id'}), 400
-        
         senha_hash = hash_password(senha)
         empresa_id = str(uuid.uuid4())
         
-        tabela_usuarioempresa.put_item(Item={
-            'usuario_id': usuario_id,
-            'email': email,
-            'empresa_nome': empresa_nome,
-            'empresa_id': empresa_id,
-            'senha_hash': senha_hash,
-            'data_criacao': datetime.now().isoformat()
-        })
+        # Criação condicional: falha se usuario_id já existe
+        try:
+            obter_repositorios().usuarios.criar({
+                'usuario_id': usuario_id,
+                'email': email,
+                'empresa_nome': empresa_nome,
+                'empresa_id': empresa_id,
+                'senha_hash': senha_hash,
+                'data_criacao': datetime.now().isoformat()
+            })
+        except ItemJaExiste:
+            return jsonify({'error': 'Usuário já existe com esse usuario_id'}), 400
         
         response = jsonify({'success': True, 'usuario_id': usuario_id, 'empresa_id': empresa_id})
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 201
         
     except Exception as e:
-        print(f"Erro ao cadastrar usuário empresa: {str(e)}")
+        log.erro('cadastrar_usuario_empresa', erro=e)
         response = jsonify({'error': str(e)})
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 500
@@ -0,0 +1,221 @@
+"""
+Sincronização dos pontos batidos com o quiosque offline (POST /api/registrar_ponto/lote).
+
+O quiosque guarda cada ponto com a hora do aparelho, a foto e uma chave
+única gerada por ele, e quando a conexão volta envia tudo numa requisição
+multipart:
+
+    pontos  JSON [{"chave": "...", "data_hora": "AAAA-MM-DD HH:MM:SS", "foto": "<campo>"}]
+    <campo> a foto de cada ponto, um arquivo por entrada
+
+As fotos são reconhecidas em paralelo no pool compartilhado da requisição
+(paralelo.py); as que não terminam no prazo do Lambda saem como erro do
+próprio ponto, que pode ser reenviado.
+Os pontos de cada funcionário são ordenados pela hora do aparelho e o tipo
+(entrada/saída) de cada um segue o ponto anterior do mesmo dia, já gravado
+ou do próprio lote. Um ponto que cai antes de pontos já gravados no mesmo
+dia (ex.: batido online enquanto o quiosque ainda não tinha sincronizado)
+refaz a alternância dali em diante: os pontos seguintes do dia trocam de
+tipo quando preciso e são regravados junto. Tudo é gravado de uma vez
+(batch_writer).
+
+A rota exige o token da empresa ou do quiosque (Authorization: Bearer), e
+só funcionários dessa empresa são reconhecidos.
+
+O registro_id é derivado da chave: reenviar um lote já sincronizado, no todo
+ou em parte, devolve 'duplicado' para o que já foi gravado.
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from imagens import normalizar_imagem
+from logs import obter_log
+from paralelo import conforme_terminam
+from regras_ponto import ler_data_hora, estado_do_registro, proximo_tipo
+
+MAXIMO_PONTOS = int(os.environ.get('PONTO_SINCRONIZACAO_MAXIMO', 100))
+# Pontos mais antigos que isso não são aceitos pelo quiosque
+DIAS_MAXIMOS = 30
+# Tolerância para relógio de aparelho adiantado
+TOLERANCIA_FUTURO = timedelta(minutes=5)
+
+NAMESPACE_PONTOS = uuid.UUID('4f1b2c9e-8d0a-4c55-9a43-3b8f1e6d7a21')
+
+log = obter_log('sincronizacao')
+
+class SincronizacaoInvalida(Exception):
+    """Lista de pontos ausente ou mal formada"""
+
+def id_registro(empresa_id, chave):
+    """registro_id estável para a chave de um ponto offline"""
+    return str(uuid.uuid5(NAMESPACE_PONTOS, f"{empresa_id or ''}:{chave}"))
+
+def ler_pontos(form, files):
+    """Entradas do lote: [{'chave', 'data_hora', 'imagem'}] ou erro de validação por entrada"""
+    try:
+        entradas = json.loads(form.get('pontos') or '')
+    except ValueError:
+        raise SincronizacaoInvalida('Envie o campo pontos com a lista em JSON')
+    if not isinstance(entradas, list) or not entradas:
+        raise SincronizacaoInvalida('A lista de pontos está vazia')
+    if len(entradas) > MAXIMO_PONTOS:
+        raise SincronizacaoInvalida(f'No máximo {MAXIMO_PONTOS} pontos por lote; envie em partes')
+
+    agora = datetime.now()
+    pontos = []
+    for entrada in entradas:
+        entrada = entrada if isinstance(entrada, dict) else {}
+        ponto = {'chave': str(entrada.get('chave') or ''), 'data_hora': entrada.get('data_hora')}
+        momento = ler_data_hora(ponto['data_hora'] or '')
+        arquivo = files.get(entrada.get('foto') or '')
+        if not ponto['chave']:
+            ponto['erro'] = 'Chave do ponto ausente'
+        elif momento is None:
+            ponto['erro'] = 'data_hora inválida (use AAAA-MM-DD HH:MM:SS)'
+        elif momento > agora + TOLERANCIA_FUTURO:
+            ponto['erro'] = 'data_hora no futuro; verifique o relógio do quiosque'
+        elif momento < agora - timedelta(days=DIAS_MAXIMOS):
+            ponto['erro'] = f'Ponto com mais de {DIAS_MAXIMOS} dias; registre manualmente'
+        elif arquivo is None:
+            ponto['erro'] = 'Foto não encontrada no lote'
+        else:
+            ponto['data_hora'] = momento.strftime('%Y-%m-%d %H:%M:%S')
+            ponto['imagem'] = arquivo.read()
+        pontos.append(ponto)
+    return pontos
+
+def _reconhecer(repos, ponto, empresa_id):
+    """Funcionário do ponto, ou o registro já gravado numa sincronização anterior"""
+    try:
+        return _reconhecer_ponto(repos, ponto, empresa_id)
+    except Exception as e:
+        log.erro('reconhecer_ponto', erro=e, chave=ponto['chave'])
+        return {'status': 'erro', 'erro': str(e)}
+
+def _reconhecer_ponto(repos, ponto, empresa_id):
+    existente = repos.registros.obter_por_id(ponto['registro_id'])
+    if existente:
+        return {'status': 'duplicado', 'registro': existente}
+    imagem = normalizar_imagem(ponto['imagem'])
+    funcionario_id = repos.faces.reconhecer(imagem, empresa_id)
+    funcionario = repos.diretorio.obter(funcionario_id) if funcionario_id else None
+    if not funcionario or (empresa_id and funcionario.get('empresa_id') != empresa_id):
+        return {'status': 'nao_reconhecido'}
+    return {'status': 'reconhecido', 'funcionario': funcionario, 'imagem': imagem}
+
+def _resultado(ponto, status, registro=None, funcionario_nome=None, erro=None):
+    resultado = {'chave': ponto['chave'], 'data_hora': ponto.get('data_hora'), 'status': status}
+    if registro:
+        resultado.update(registro_id=registro['registro_id'], tipo=registro['tipo'],
+                         funcionario_id=registro['funcionario_id'])
+    if funcionario_nome:
+        resultado['funcionario'] = funcionario_nome
+    if erro:
+        resultado['erro'] = erro
+    return resultado
+
+def _montar_registros(repos, funcionario, pontos):
+    """
+    (novos, retipados) dos pontos de um funcionário: os registros novos, com
+    o tipo decidido na ordem da hora, e os já gravados cujo tipo mudou
+    """
+    pontos = sorted(pontos, key=lambda ponto: ponto['data_hora'])
+    gravados = {
+        registro['data_hora']: registro
+        for registro in repos.registros.listar_funcionario(
+            funcionario['id'], pontos[0]['data_hora'][:10], pontos[-1]['data_hora'][:10]
+        )
+    }
+    novos = {}
+    for ponto in pontos:
+        if ponto['data_hora'] in gravados:
+            ponto['resultado'] = _resultado(ponto, 'erro', erro='Já existe um ponto neste horário')
+            continue
+        registro = {
+            'registro_id': ponto['registro_id'],
+            'funcionario_id': funcionario['id'],
+            'data_hora': ponto['data_hora'],
+            'tipo': None,
+            'empresa_id': funcionario.get('empresa_id'),
+            'empresa_nome': funcionario.get('empresa_nome'),
+            'origem': 'offline'
+        }
+        gravados[registro['data_hora']] = registro
+        novos[registro['data_hora']] = (registro, ponto)
+
+    # Alternância refeita a partir do primeiro ponto novo de cada dia; antes dele nada muda
+    primeiro_novo = {}
+    for data_hora in sorted(novos):
+        primeiro_novo.setdefault(data_hora[:10], data_hora)
+    retipados = []
+    estado = None
+    for data_hora in sorted(gravados):
+        registro = gravados[data_hora]
+        dia = data_hora[:10]
+        if dia in primeiro_novo and data_hora >= primeiro_novo[dia]:
+            tipo = proximo_tipo(estado, dia)
+            if data_hora in novos:
+                registro['tipo'] = tipo
+            elif registro['tipo'] != tipo:
+                registro = dict(registro, tipo=tipo)
+                retipados.append(registro)
+        estado = estado_do_registro(registro)
+
+    registros = []
+    for registro, ponto in novos.values():
+        ponto['resultado'] = _resultado(ponto, 'registrado', registro, funcionario.get('nome'))
+        registros.append((registro, ponto['imagem']))
+    if retipados:
+        log.info('tipos_refeitos', funcionario_id=funcionario['id'], registros=len(retipados))
+    return registros, retipados
+
+def sincronizar(repos, pontos, empresa_id):
+    """Reconhece, ordena e grava os pontos; retorna um resultado por ponto, na ordem recebida"""
+    vistos = set()
+    validos = []
+    for ponto in pontos:
+        if 'erro' in ponto:
+            ponto['resultado'] = _resultado(ponto, 'erro', erro=ponto['erro'])
+        elif ponto['chave'] in vistos:
+            ponto['resultado'] = _resultado(ponto, 'erro', erro='Chave repetida no lote')
+        else:
+            vistos.add(ponto['chave'])
+            ponto['registro_id'] = id_registro(empresa_id, ponto['chave'])
+            validos.append(ponto)
+
+    reconhecidos = {}
+    for ponto, reconhecido, erro in conforme_terminam(lambda ponto: _reconhecer(repos, ponto, empresa_id), validos):
+        if erro:  # Prazo esgotado: as outras falhas _reconhecer já devolve como erro
+            reconhecido = {'status': 'erro', 'erro': 'Tempo limite excedido; envie o ponto de novo'}
+        reconhecidos[ponto['chave']] = reconhecido
+
+    por_funcionario = {}
+    for ponto in validos:
+        reconhecido = reconhecidos[ponto['chave']]
+        if reconhecido['status'] == 'duplicado':
+            ponto['resultado'] = _resultado(ponto, 'duplicado', reconhecido['registro'])
+        elif reconhecido['status'] == 'erro':
+            ponto['resultado'] = _resultado(ponto, 'erro', erro=reconhecido['erro'])
+        elif reconhecido['status'] == 'nao_reconhecido':
+            ponto['resultado'] = _resultado(ponto, 'nao_reconhecido', erro='Funcionário não reconhecido')
+        else:
+            ponto['imagem'] = reconhecido['imagem']
+            funcionario = reconhecido['funcionario']
+            por_funcionario.setdefault(funcionario['id'], (funcionario, []))[1].append(ponto)
+
+    novos = []
+    retipados = []
+    for funcionario, pontos_funcionario in por_funcionario.values():
+        registros, alterados = _montar_registros(repos, funcionario, pontos_funcionario)
+        novos.extend(registros)
+        retipados.extend(alterados)
+    if novos:
+        repos.registros.registrar_lote([registro for registro, _ in novos] + retipados)
+        for registro, imagem in novos:
+            try:
+                repos.evidencias.enfileirar(registro, imagem)
+            except Exception as e:
+                log.erro('enfileirar_evidencia', erro=e, registro_id=registro['registro_id'])
+    return [ponto['resultado'] for ponto in pontos]
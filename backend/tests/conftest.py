@@ -0,0 +1,68 @@
+"""
+Testes de comportamento sobre os repositórios em memória (PONTO_ARMAZENAMENTO=memoria).
+
+Rodam sem AWS, com as dependências de lambda_dependencies:
+    cd backend && python -m pytest -q tests
+"""
+import io
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, 'lambda_dependencies')]
+os.environ['PONTO_ARMAZENAMENTO'] = 'memoria'
+os.environ['PONTO_METRICAS'] = 'desligado'
+os.environ.setdefault('SECRET_KEY', 'chave-dos-testes')
+
+@pytest.fixture
+def repos():
+    from repositorios import criar_repositorios, definir_repositorios
+    novos = criar_repositorios('memoria')
+    definir_repositorios(novos)
+    yield novos
+    definir_repositorios(None)
+
+@pytest.fixture
+def cliente(repos, monkeypatch):
+    import routes
+    from app import app
+    from cache_reconhecimento import CacheReconhecimento
+    # Cada teste com o próprio cache: a mesma foto em outro teste não vira "repetido"
+    monkeypatch.setattr(routes, 'reconhecimentos_recentes', CacheReconhecimento())
+    return app.test_client()
+
+@pytest.fixture
+def autorizacao(cliente):
+    cliente.post('/api/cadastrar_usuario_empresa', json={
+        'usuario_id': 'empresa_teste', 'email': 'rh@empresa.com', 'empresa_nome': 'Empresa', 'senha': 'segredo'
+    })
+    token = cliente.post('/api/login', json={'usuario_id': 'empresa_teste', 'senha': 'segredo'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def outra_empresa(cliente):
+    """Login de uma segunda empresa, para conferir o isolamento entre empresas"""
+    cliente.post('/api/cadastrar_usuario_empresa', json={
+        'usuario_id': 'outra', 'email': 'rh@outra.com', 'empresa_nome': 'Outra', 'senha': 'segredo'
+    })
+    token = cliente.post('/api/login', json={'usuario_id': 'outra', 'senha': 'segredo'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def quiosque(cliente, autorizacao):
+    """Cabeçalho com o token de quiosque da empresa de teste (o que o app mobile envia)"""
+    corpo = cliente.post('/api/quiosques/token', headers=autorizacao, json={'dispositivo_id': 'recepcao'}).get_json()
+    return {'Authorization': f"Bearer {corpo['token']}"}
+
+@pytest.fixture
+def cadastrar(cliente, autorizacao):
+    """cadastrar(nome) -> id; a foto do funcionário é o próprio nome em bytes"""
+    def cadastrar(nome):
+        resposta = cliente.post('/api/cadastrar_funcionario', headers=autorizacao, data={
+            'nome': nome, 'cargo': 'Analista', 'foto': (io.BytesIO(nome.encode()), 'foto.jpg')
+        })
+        assert resposta.status_code == 201, resposta.get_json()
+        return resposta.get_json()['id']
+    return cadastrar
@@ -0,0 +1,76 @@
+import io
+import threading
+
+import cache_reconhecimento
+import routes
+from cache_reconhecimento import CacheReconhecimento
+
+def test_mesmos_bytes_recebem_a_resposta_da_primeira():
+    cache = CacheReconhecimento(janela=5)
+    parecidas, proprio = cache.iniciar(b'foto', 'd1')
+    assert parecidas == [] and proprio is not None
+
+    repetidas, nenhum = cache.iniciar(b'foto', 'd1')
+    assert nenhum is None and repetidas == [proprio]
+    assert repetidas[0].em_andamento()
+
+    threading.Timer(0.05, cache.concluir, ('d1', proprio, {'success': True}, 200)).start()
+    assert repetidas[0].aguardar(2) == ({'success': True}, 200)
+
+def test_outro_dispositivo_nao_repete():
+    cache = CacheReconhecimento(janela=5)
+    cache.iniciar(b'foto', 'd1')
+    parecidas, proprio = cache.iniciar(b'foto', 'd2')
+    assert parecidas == [] and proprio is not None
+
+def test_falha_sai_do_cache():
+    cache = CacheReconhecimento(janela=5)
+    _, proprio = cache.iniciar(b'foto', 'd1')
+    cache.concluir('d1', proprio, {'success': False}, 404)
+    assert proprio.aguardar(0) == ({'success': False}, 404)
+    parecidas, novo = cache.iniciar(b'foto', 'd1')
+    assert parecidas == [] and novo is not None
+
+def test_aguardar_sem_conclusao_devolve_none():
+    _, proprio = CacheReconhecimento(janela=5).iniciar(b'foto', 'd1')
+    assert proprio.aguardar(0.01) == (None, None)
+    assert not proprio.aguardar_identificacao(0.01)
+
+def _bater_ponto(cliente, quiosque, foto):
+    return cliente.post('/api/registrar_ponto', headers=quiosque, data={'foto': (io.BytesIO(foto), 'foto.jpg')})
+
+def _dispositivo(repos, funcionario_id):
+    # Mesmo formato de registrar_ponto: empresa do token + dispositivo_id do token
+    return f"{repos.funcionarios.obter(funcionario_id)['empresa_id']}:recepcao"
+
+def test_repeticao_em_andamento_que_nao_termina_recebe_409(repos, cliente, quiosque, cadastrar, monkeypatch):
+    ana = cadastrar('Ana')
+    monkeypatch.setattr(routes, 'tempo_de_espera', lambda: 0.01)
+    # Primeira foto ainda sendo reconhecida em outra requisição
+    routes.reconhecimentos_recentes.iniciar(b'Ana', _dispositivo(repos, ana))
+    resposta = _bater_ponto(cliente, quiosque, b'Ana')
+    assert resposta.status_code == 409
+    assert list(repos.registros.listar_funcionario(ana)) == []
+
+def test_foto_parecida_reaproveita_o_reconhecimento(repos, cliente, quiosque, cadastrar, monkeypatch):
+    ana = cadastrar('Ana')
+    # Sem Pillow aqui: todas as fotos ganham o mesmo hash perceptual
+    monkeypatch.setattr(cache_reconhecimento, 'hash_perceptual', lambda imagem: 0)
+    chamadas = []
+    reconhecer = repos.faces.reconhecer
+    monkeypatch.setattr(repos.faces, 'reconhecer', lambda *args: chamadas.append(args) or reconhecer(*args))
+
+    primeira = _bater_ponto(cliente, quiosque, b'Ana')
+    segunda = _bater_ponto(cliente, quiosque, b'Ana, outro quadro')
+    assert primeira.status_code == segunda.status_code == 200
+    assert segunda.get_json()['repetido'] and segunda.get_json()['hora'] == primeira.get_json()['hora']
+    assert len(chamadas) == 1
+    assert len(list(repos.registros.listar_funcionario(ana))) == 1
+
+def test_foto_parecida_sem_ninguem_reconhecido_tenta_de_novo(repos, cliente, quiosque, cadastrar, monkeypatch):
+    ana = cadastrar('Ana')
+    monkeypatch.setattr(cache_reconhecimento, 'hash_perceptual', lambda imagem: 0)
+    assert _bater_ponto(cliente, quiosque, b'ninguem').status_code == 404
+    resposta = _bater_ponto(cliente, quiosque, b'Ana')
+    assert resposta.status_code == 200 and 'repetido' not in resposta.get_json()
+    assert len(list(repos.registros.listar_funcionario(ana))) == 1
@@ -0,0 +1,68 @@
+import io
+import time
+
+import pytest
+
+from auth import verify_token
+from cadastro_lote import _processar_item, id_funcionario
+from paralelo import PrazoEsgotado
+
+CSV = b'nome,cargo,foto\nAna,Analista,ana.jpg\nBia,Gerente,bia.jpg\n'
+
+def _enviar(cliente, autorizacao):
+    return cliente.post('/api/funcionarios/lote', headers=autorizacao, data={
+        'csv': (io.BytesIO(CSV), 'lote.csv'),
+        'fotos': [(io.BytesIO(b'Ana'), 'ana.jpg'), (io.BytesIO(b'Bia'), 'bia.jpg')]
+    }).get_json()
+
+def _faces(repos, corpo, autorizacao):
+    empresa_id = verify_token(autorizacao['Authorization'].split()[1])['empresa_id']
+    return [len(repos.faces.localizar_faces(item['id'], empresa_id)) for item in corpo['itens']]
+
+def test_reenviar_o_lote_pula_quem_ja_foi_cadastrado(repos, cliente, autorizacao):
+    primeiro = _enviar(cliente, autorizacao)
+    assert primeiro['cadastrados'] == 2 and primeiro['erros'] == 0
+    segundo = _enviar(cliente, autorizacao)
+    assert segundo['cadastrados'] == 0 and segundo['existentes'] == 2
+    assert [item['id'] for item in segundo['itens']] == [item['id'] for item in primeiro['itens']]
+    assert _faces(repos, segundo, autorizacao) == [1, 1]
+
+def test_falha_ao_gravar_remove_as_faces_e_o_reenvio_retoma(repos, cliente, autorizacao, monkeypatch):
+    salvar_lote = repos.funcionarios.salvar_lote
+
+    def falha(funcionarios):
+        list(funcionarios)
+        raise RuntimeError('DynamoDB indisponível')
+
+    monkeypatch.setattr(repos.funcionarios, 'salvar_lote', falha)
+    corpo = _enviar(cliente, autorizacao)
+    assert corpo['erros'] == 2
+    assert _faces(repos, corpo, autorizacao) == [0, 0]
+
+    monkeypatch.setattr(repos.funcionarios, 'salvar_lote', salvar_lote)
+    corpo = _enviar(cliente, autorizacao)
+    assert corpo['cadastrados'] == 2
+    assert _faces(repos, corpo, autorizacao) == [1, 1]
+
+def _item(imagem=b'Ana'):
+    return {'linha': 2, 'nome': 'Ana', 'cargo': 'Analista', 'arquivo': 'ana.jpg', 'imagem': imagem}
+
+def test_sem_rosto_nao_envia_a_foto(repos, monkeypatch):
+    monkeypatch.setattr(repos.faces, 'indexar', lambda *args, **kwargs: None)
+    resultado, funcionario = _processar_item(repos, _item(), 'e1', 'Empresa')
+    assert resultado['status'] == 'erro' and funcionario is None
+    assert repos.fotos.arquivos == {}
+
+def test_item_que_passa_do_prazo_remove_a_propria_face(repos):
+    with pytest.raises(PrazoEsgotado):
+        _processar_item(repos, _item(), 'e1', 'Empresa', prazo=time.monotonic() - 1)
+    assert repos.faces.localizar_faces(id_funcionario('e1', 'Ana', b'Ana'), 'e1') == []
+
+def test_falha_no_envio_remove_a_face(repos, monkeypatch):
+    def falha(imagem, nome_arquivo):
+        raise RuntimeError('S3 indisponível')
+
+    monkeypatch.setattr(repos.fotos, 'enviar', falha)
+    with pytest.raises(RuntimeError):
+        _processar_item(repos, _item(), 'e1', 'Empresa')
+    assert repos.faces.localizar_faces(id_funcionario('e1', 'Ana', b'Ana'), 'e1') == []
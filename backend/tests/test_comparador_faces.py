@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from comparador_faces import SEM_BASE, ComparadorEmbeddings, FacesComComparador
+
+# Fotos de teste -> vetor da face (None: o extrator não achou rosto)
+VETORES = {
+    b'Ana': [1.0, 0.0, 0.0],
+    b'Ana de lado': [0.9, 0.1, 0.0],   # cosseno ~0.99 com a Ana
+    b'Bia': [0.0, 1.0, 0.0],
+    b'entre as duas': [0.7, 0.7, 0.0],  # cosseno ~0.71 com as duas
+    b'sem rosto': None
+}
+
+def extrator(imagem):
+    vetor = VETORES.get(imagem)
+    return None if vetor is None else np.array(vetor, dtype=np.float32)
+
+def _faces(repos, monkeypatch, usar_reserva=False):
+    comparador = ComparadorEmbeddings(extrator, repos.embeddings, repos.diretorio, limiar=0.8)
+    faces = FacesComComparador(repos.faces, comparador, usar_reserva=usar_reserva)
+    monkeypatch.setattr(repos, 'faces', faces)
+    return faces
+
+def _empresa(repos, funcionario_id):
+    return repos.funcionarios.obter(funcionario_id)['empresa_id']
+
+def test_acima_do_limiar_reconhece_sem_o_rekognition(repos, monkeypatch, cadastrar):
+    faces = _faces(repos, monkeypatch)
+    ana = cadastrar('Ana')
+    cadastrar('Bia')
+    # O repositório em memória só reconhece os mesmos bytes: quem achou foi o vetor
+    assert faces.reconhecer(b'Ana de lado', _empresa(repos, ana)) == ana
+    funcionario_id, similaridade = faces.comparador.identificar(b'Ana de lado', _empresa(repos, ana))
+    assert funcionario_id == ana and similaridade == pytest.approx(0.9 / np.hypot(0.9, 0.1), abs=1e-5)
+
+def test_abaixo_do_limiar_nao_reconhece(repos, monkeypatch, cadastrar):
+    faces = _faces(repos, monkeypatch)
+    ana = cadastrar('Ana')
+    cadastrar('Bia')
+    funcionario_id, similaridade = faces.comparador.identificar(b'entre as duas', _empresa(repos, ana))
+    assert funcionario_id is None and similaridade == pytest.approx(0.7071, abs=1e-3)
+    assert faces.reconhecer(b'entre as duas', _empresa(repos, ana)) is None
+    assert faces.comparador.identificar(b'sem rosto', _empresa(repos, ana)) == (None, None)
+
+@pytest.mark.parametrize('usar_reserva', [True, False])
+def test_reserva_procura_no_rekognition(repos, monkeypatch, cadastrar, usar_reserva):
+    original = repos.faces
+    faces = _faces(repos, monkeypatch, usar_reserva=usar_reserva)
+    empresa_id = _empresa(repos, cadastrar('Bia'))
+    # Face indexada antes dos vetores: só o Rekognition conhece
+    original.indexar(b'Ana', 'ana', empresa_id)
+    assert faces.reconhecer(b'Ana', empresa_id) == ('ana' if usar_reserva else None)
+
+def test_empresa_sem_vetores_usa_o_rekognition_mesmo_sem_reserva(repos, monkeypatch):
+    original = repos.faces
+    faces = _faces(repos, monkeypatch)
+    original.indexar(b'Ana', 'ana', 'e1')
+    assert faces.comparador.identificar(b'Ana', 'e1') is SEM_BASE
+    assert faces.reconhecer(b'Ana', 'e1') == 'ana'
+
+def test_funcionario_excluido_sai_da_matriz(repos, monkeypatch, cliente, autorizacao, cadastrar):
+    faces = _faces(repos, monkeypatch)
+    ana = cadastrar('Ana')
+    empresa_id = _empresa(repos, ana)
+    assert faces.reconhecer(b'Ana de lado', empresa_id) == ana
+    assert cliente.delete(f'/api/funcionarios/{ana}', headers=autorizacao).status_code == 200
+    assert faces.reconhecer(b'Ana de lado', empresa_id) is None
@@ -0,0 +1,28 @@
+def _registros(repos, funcionario_id):
+    return list(repos.registros.listar_funcionario(funcionario_id))
+
+def _bater(cliente, autorizacao, funcionario_id, hora, tipo):
+    cliente.post('/api/registrar_ponto_manual', headers=autorizacao, json={
+        'funcionario_id': funcionario_id, 'data_hora': f'2026-01-05 {hora}:00', 'tipo': tipo
+    })
+
+def test_outra_empresa_nao_exclui_o_registro(repos, cliente, autorizacao, outra_empresa, cadastrar):
+    ana = cadastrar('Ana')
+    _bater(cliente, autorizacao, ana, '08:00', 'entrada')
+    [registro] = _registros(repos, ana)
+    resposta = cliente.delete(f"/api/registros/{registro['registro_id']}", headers=outra_empresa)
+    assert resposta.status_code == 404
+    assert _registros(repos, ana) == [registro]
+
+def test_excluir_ajusta_estado_e_horas_do_dia(repos, cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    _bater(cliente, autorizacao, ana, '08:00', 'entrada')
+    _bater(cliente, autorizacao, ana, '12:00', 'saída')
+    entrada, saida = _registros(repos, ana)
+    assert cliente.delete(f"/api/registros/{saida['registro_id']}", headers=autorizacao).status_code == 200
+    assert _registros(repos, ana) == [entrada]
+    assert repos.registros.obter_estado(ana)['ultimo_registro_id'] == entrada['registro_id']
+    [dia] = repos.registros.horas_diarias(entrada['empresa_id'])
+    assert dia['segundos_trabalhados'] == 0
+    # Já excluído: não há o que excluir de novo
+    assert cliente.delete(f"/api/registros/{saida['registro_id']}", headers=autorizacao).status_code == 404
@@ -0,0 +1,32 @@
+from regras_ponto import calcular_horas_dias
+
+def _registro(data_hora, tipo):
+    return {'registro_id': data_hora, 'funcionario_id': 'ana', 'data_hora': data_hora, 'tipo': tipo, 'empresa_id': 'e1'}
+
+def test_turno_da_noite_dividido_na_meia_noite():
+    registros = [_registro('2026-01-05 22:00:00', 'entrada'), _registro('2026-01-06 06:00:00', 'saída')]
+    dias = calcular_horas_dias('e1', 'ana', registros, ['2026-01-05', '2026-01-06'])
+    assert dias['2026-01-05']['segundos_trabalhados'] == 2 * 3600
+    assert 'entrada_aberta' not in dias['2026-01-05']
+    assert dias['2026-01-06']['segundos_trabalhados'] == 6 * 3600
+
+def test_entrada_esquecida_nao_atravessa_dias():
+    registros = [
+        _registro('2026-01-05 08:00:00', 'entrada'),
+        # Sem saída no dia 5: a entrada do dia 6 abre outro turno
+        _registro('2026-01-06 08:00:00', 'entrada'),
+        _registro('2026-01-06 17:00:00', 'saída'),
+        _registro('2026-01-08 06:00:00', 'saída')
+    ]
+    dias = calcular_horas_dias('e1', 'ana', registros, ['2026-01-05', '2026-01-06', '2026-01-07', '2026-01-08'])
+    assert dias['2026-01-05']['segundos_trabalhados'] == 0
+    assert dias['2026-01-05']['entrada_aberta'] == '2026-01-05 08:00:00'
+    assert dias['2026-01-06']['segundos_trabalhados'] == 9 * 3600
+    assert dias['2026-01-07'] is None
+    assert dias['2026-01-08']['segundos_trabalhados'] == 0
+
+def test_ponto_manual_do_dia_seguinte_recalcula_o_anterior(repos):
+    for data_hora, tipo in (('2026-01-05 22:00:00', 'entrada'), ('2026-01-06 06:00:00', 'saída')):
+        repos.registros.registrar_manual(_registro(data_hora, tipo))
+    horas = {item['data']: item['segundos_trabalhados'] for item in repos.registros.horas_diarias('e1')}
+    assert horas == {'2026-01-05': 2 * 3600, '2026-01-06': 6 * 3600}
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from imagens import normalizar_imagem
+
+def _foto(tamanho, formato='PNG', orientacao=None):
+    Image = pytest.importorskip('PIL.Image')
+    foto = Image.new('RGB', tamanho, (200, 120, 40))
+    foto.paste((20, 40, 200), (0, 0, tamanho[0] // 2, tamanho[1] // 4))
+    saida = io.BytesIO()
+    if orientacao:
+        exif = Image.Exif()
+        exif[0x0112] = orientacao
+        foto.save(saida, formato, exif=exif)
+    else:
+        foto.save(saida, formato)
+    return saida.getvalue()
+
+def _abrir(dados):
+    Image = pytest.importorskip('PIL.Image')
+    return Image.open(io.BytesIO(dados))
+
+def test_bytes_que_nao_sao_foto_seguem_iguais():
+    # Com ou sem Pillow: quem recusa imagem inválida é o Rekognition
+    assert normalizar_imagem(b'nao e uma foto') == b'nao e uma foto'
+    assert normalizar_imagem(b'') == b''
+
+def test_foto_grande_vira_jpeg_no_lado_maximo():
+    dados = _foto((3000, 2000))
+    with _abrir(normalizar_imagem(dados, lado_maximo=1280)) as foto:
+        assert foto.format == 'JPEG'
+        assert foto.size == (1280, 853)
+
+def test_orientacao_do_exif_e_aplicada():
+    dados = _foto((400, 200), 'JPEG', orientacao=6)  # Girada 90°: fica em pé
+    with _abrir(normalizar_imagem(dados)) as foto:
+        assert foto.size == (200, 400)
+        assert foto.getexif().get(0x0112, 1) == 1
+
+def test_jpeg_pequeno_e_na_orientacao_certa_nao_e_regravado():
+    dados = _foto((320, 240), 'JPEG')
+    assert normalizar_imagem(dados) is dados
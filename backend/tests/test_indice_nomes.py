@@ -0,0 +1,46 @@
+from indice_nomes import IndiceNomes, normalizar
+
+FUNCIONARIOS = [
+    {'id': 'f1', 'nome': 'João da Silva'},
+    {'id': 'f2', 'nome': 'Joana Souza'},
+    {'id': 'f3', 'nome': 'Márcia Conceição'},
+    {'id': 'f4', 'nome': 'Pedro Joãozinho'}
+]
+
+def _ids(resultado):
+    return [item['id'] for item in resultado]
+
+def test_normalizar_tira_acento_caixa_e_pontuacao():
+    assert normalizar('  JOÃO  da Silva-Júnior ') == 'joao da silva junior'
+    assert normalizar(None) == ''
+
+def test_prefixo_ignora_acento_e_vem_antes_do_prefixo_de_palavra():
+    indice = IndiceNomes(FUNCIONARIOS)
+    assert _ids(indice.buscar('joao')) == ['f1', 'f4']
+    assert _ids(indice.buscar('JOÃO')) == ['f1', 'f4']
+    assert _ids(indice.buscar('jo', limite=2)) == ['f2', 'f1']
+
+def test_cada_palavra_e_prefixo_de_alguma_palavra_do_nome():
+    indice = IndiceNomes(FUNCIONARIOS)
+    assert _ids(indice.buscar('silva jo')) == ['f1']
+    assert _ids(indice.buscar('conce mar')) == ['f3']
+
+def test_erro_de_digitacao_cai_nos_trigramas():
+    indice = IndiceNomes(FUNCIONARIOS)
+    assert _ids(indice.buscar('marcia conseicao'))[:1] == ['f3']
+    assert indice.buscar('xyzw') == []
+
+def test_consulta_vazia_lista_em_ordem_alfabetica():
+    assert _ids(IndiceNomes(FUNCIONARIOS).buscar('', limite=3)) == ['f2', 'f1', 'f3']
+
+def test_contem_trecho_do_meio_do_nome():
+    indice = IndiceNomes(FUNCIONARIOS)
+    assert indice.contem('ceica') == {'f3'}
+    assert indice.contem('ao') == {'f1', 'f3', 'f4'}
+
+def test_rota_busca_na_empresa_do_token(cliente, autorizacao, outra_empresa, cadastrar):
+    cadastrar('João da Silva')
+    cadastrar('Joana Souza')
+    nomes = [item['nome'] for item in cliente.get('/api/funcionarios/nome?nome=joao', headers=autorizacao).get_json()]
+    assert nomes == ['João da Silva']
+    assert cliente.get('/api/funcionarios/nome?nome=joao', headers=outra_empresa).get_json() == []
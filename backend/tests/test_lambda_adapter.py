@@ -0,0 +1,89 @@
+import base64
+import json
+import time
+
+import pytest
+from flask import Flask, Response, jsonify, request
+
+from lambda_adapter import lambda_response, montar_environ
+from paralelo import CHAVE_PRAZO
+
+BINARIO = bytes(range(256)) * 4  # Não é UTF-8 válido
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.route('/eco', methods=['POST'])
+    def eco():
+        foto = request.files['foto'].read()
+        return Response(foto, content_type='image/jpeg')
+
+    @app.route('/json', methods=['POST', 'GET'])
+    def json_():
+        return jsonify({
+            'corpo': request.get_json(silent=True), 'args': request.args.to_dict(flat=False),
+            'prazo': CHAVE_PRAZO in request.environ
+        })
+
+    @app.route('/cookies')
+    def cookies():
+        resposta = Response('ok', content_type='text/plain')
+        resposta.headers.add('Set-Cookie', 'a=1')
+        resposta.headers.add('Set-Cookie', 'b=2')
+        return resposta
+
+    @app.route('/gzip')
+    def gzip():
+        return Response(b'texto comprimido', content_type='text/plain', headers={'Content-Encoding': 'gzip'})
+
+    return app
+
+class Contexto:
+    def get_remaining_time_in_millis(self):
+        return 3000
+
+def _multipart(conteudo):
+    fronteira = 'xYzFronteira'
+    corpo = (
+        f'--{fronteira}\r\nContent-Disposition: form-data; name="foto"; filename="f.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + conteudo + f'\r\n--{fronteira}--\r\n'.encode()
+    return corpo, f'multipart/form-data; boundary={fronteira}'
+
+def test_foto_binaria_vai_e_volta_em_base64(app):
+    corpo, tipo = _multipart(BINARIO)
+    resposta = lambda_response(app, {
+        'httpMethod': 'POST', 'path': '/eco', 'headers': {'Content-Type': tipo},
+        'body': base64.b64encode(corpo).decode(), 'isBase64Encoded': True
+    }, None)
+    assert resposta['statusCode'] == 200
+    assert resposta['isBase64Encoded'] is True
+    assert base64.b64decode(resposta['body']) == BINARIO
+
+def test_texto_volta_como_texto(app):
+    resposta = lambda_response(app, {
+        'httpMethod': 'POST', 'path': '/json', 'headers': {'content-type': 'application/json'},
+        'body': json.dumps({'nome': 'João'}, ensure_ascii=False),
+        'multiValueQueryStringParameters': {'id': ['1', '2']}
+    }, Contexto())
+    assert resposta['isBase64Encoded'] is False
+    corpo = json.loads(resposta['body'])
+    assert corpo == {'corpo': {'nome': 'João'}, 'args': {'id': ['1', '2']}, 'prazo': True}
+    assert resposta['headers']['Access-Control-Allow-Origin'] == '*'
+
+def test_cabecalhos_repetidos_em_multi_value(app):
+    resposta = lambda_response(app, {'httpMethod': 'GET', 'path': '/cookies'}, None)
+    assert resposta['multiValueHeaders']['Set-Cookie'] == ['a=1', 'b=2']
+    assert 'Set-Cookie' not in resposta['headers']
+    assert resposta['body'] == 'ok'
+
+def test_texto_comprimido_volta_em_base64(app):
+    resposta = lambda_response(app, {'httpMethod': 'GET', 'path': '/gzip'}, None)
+    assert resposta['isBase64Encoded'] is True
+    assert base64.b64decode(resposta['body']) == b'texto comprimido'
+
+def test_prazo_vem_do_tempo_restante_do_lambda(app):
+    antes = time.monotonic()
+    environ = montar_environ({'httpMethod': 'GET', 'path': '/'}, Contexto())
+    assert antes + 2.4 <= environ[CHAVE_PRAZO] <= time.monotonic() + 2.5
@@ -0,0 +1,81 @@
+def _todas_as_paginas(cliente, caminho, autorizacao, chave='itens'):
+    paginas = []
+    cursor = None
+    while True:
+        url = f"{caminho}&cursor={cursor}" if cursor else caminho
+        resposta = cliente.get(url, headers=autorizacao)
+        assert resposta.status_code == 200, resposta.get_json()
+        corpo = resposta.get_json()
+        paginas.append(corpo)
+        cursor = corpo['next_cursor']
+        if not cursor:
+            return paginas
+
+def test_paginar_funcionario_percorre_tudo_sem_repetir(repos):
+    for hora in range(8, 15):
+        repos.registros.registrar_manual({
+            'registro_id': f'r{hora}', 'funcionario_id': 'ana', 'data_hora': f'2026-01-05 {hora:02d}:00:00',
+            'tipo': 'entrada', 'empresa_id': 'e1'
+        })
+    vistos = []
+    chave = None
+    while True:
+        pagina, chave = repos.registros.paginar_funcionario('ana', 3, chave)
+        vistos.extend(registro['registro_id'] for registro in pagina)
+        if not chave:
+            break
+    assert vistos == [f'r{hora}' for hora in range(8, 15)]
+
+def test_funcionarios_paginados_com_total(cliente, autorizacao, cadastrar):
+    nomes = ['Ana', 'Bia', 'Caio', 'Duda', 'Eva']
+    for nome in nomes:
+        cadastrar(nome)
+    paginas = _todas_as_paginas(cliente, '/api/funcionarios?limit=2', autorizacao)
+    assert [len(pagina['funcionarios']) for pagina in paginas] == [2, 2, 1]
+    # O total (COUNT) só vem na primeira página
+    assert [pagina.get('total_funcionarios') for pagina in paginas] == [5, None, None]
+    assert sorted(f['nome'] for pagina in paginas for f in pagina['funcionarios']) == nomes
+    assert cliente.get('/api/funcionarios', headers=autorizacao).get_json()['total_funcionarios'] == 5
+
+def test_registros_paginados_do_funcionario(cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    for hora in range(8, 13):
+        cliente.post('/api/registrar_ponto_manual', headers=autorizacao, json={
+            'funcionario_id': ana, 'data_hora': f'2026-01-05 {hora:02d}:00:00', 'tipo': 'entrada'
+        })
+    paginas = _todas_as_paginas(
+        cliente, f'/api/registros?funcionario_id={ana}&inicio=2026-01-01&fim=2026-01-31&limit=2', autorizacao
+    )
+    horas = [registro['data_hora'] for pagina in paginas for registro in pagina['itens']]
+    assert horas == [f'05-01-2026 {hora:02d}:00:00' for hora in range(8, 13)]
+
+def test_cursor_nao_vale_para_outro_filtro(cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    for hora in range(8, 11):
+        cliente.post('/api/registrar_ponto_manual', headers=autorizacao, json={
+            'funcionario_id': ana, 'data_hora': f'2026-01-05 {hora:02d}:00:00', 'tipo': 'entrada'
+        })
+    filtro = f'/api/registros?funcionario_id={ana}&inicio=2026-01-01&fim=2026-01-31&limit=1'
+    cursor = cliente.get(filtro, headers=autorizacao).get_json()['next_cursor']
+    assert cursor
+    outro_periodo = f'/api/registros?funcionario_id={ana}&inicio=2026-02-01&fim=2026-02-28&limit=1&cursor={cursor}'
+    assert cliente.get(outro_periodo, headers=autorizacao).status_code == 400
+    assert cliente.get(f'/api/funcionarios?limit=1&cursor={cursor}', headers=autorizacao).status_code == 400
+
+def test_resumo_de_horas_paginado_por_dia(cliente, autorizacao, cadastrar):
+    ana, bia = cadastrar('Ana'), cadastrar('Bia')
+    for funcionario_id in (ana, bia):
+        for dia in ('05', '06'):
+            for hora, tipo in (('08', 'entrada'), ('12', 'saída')):
+                cliente.post('/api/registrar_ponto_manual', headers=autorizacao, json={
+                    'funcionario_id': funcionario_id, 'data_hora': f'2026-01-{dia} {hora}:00:00', 'tipo': tipo
+                })
+    paginas = _todas_as_paginas(cliente, '/api/registros?inicio=2026-01-01&fim=2026-01-31&limit=3', autorizacao)
+    assert [len(pagina['itens']) for pagina in paginas] == [3, 1]
+    linhas = [(item['data'], item['funcionario_id'], item['horas_trabalhadas']) for pagina in paginas for item in pagina['itens']]
+    assert sorted(linhas) == sorted(
+        (f'2026-01-{dia}', funcionario_id, '4:00:00') for dia in ('05', '06') for funcionario_id in (ana, bia)
+    )
+    # Filtro por nome vale dentro da página
+    [pagina] = _todas_as_paginas(cliente, '/api/registros?inicio=2026-01-01&fim=2026-01-31&limit=3&nome=bia', autorizacao)
+    assert {item['funcionario_id'] for item in pagina['itens']} == {bia} and len(pagina['itens']) == 2
@@ -0,0 +1,51 @@
+import io
+from datetime import datetime, timedelta
+
+def _bater_ponto(cliente, cabecalhos, foto=b'Ana', **campos):
+    return cliente.post('/api/registrar_ponto', headers=cabecalhos,
+                        data={'foto': (io.BytesIO(foto), 'foto.jpg'), **campos})
+
+def _ontem():
+    return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def test_ponto_sem_token_e_recusado(repos, cliente, cadastrar):
+    ana = cadastrar('Ana')
+    assert _bater_ponto(cliente, {}).status_code == 401
+    # Empresa informada pelo cliente não substitui o token
+    empresa_id = repos.funcionarios.obter(ana)['empresa_id']
+    assert _bater_ponto(cliente, {'X-Empresa-Id': empresa_id}, empresa_id=empresa_id).status_code == 401
+    assert list(repos.registros.listar_funcionario(ana)) == []
+
+def test_quiosque_registra_na_propria_empresa(repos, cliente, quiosque, cadastrar):
+    ana = cadastrar('Ana')
+    resposta = _bater_ponto(cliente, quiosque)
+    assert resposta.status_code == 200, resposta.get_json()
+    [registro] = repos.registros.listar_funcionario(ana)
+    assert registro['empresa_id'] == repos.funcionarios.obter(ana)['empresa_id']
+
+def test_quiosque_de_outra_empresa_nao_reconhece(repos, cliente, cadastrar, outra_empresa):
+    ana = cadastrar('Ana')
+    # Nem pedindo a empresa da Ana pelo formulário
+    empresa_id = repos.funcionarios.obter(ana)['empresa_id']
+    token = cliente.post('/api/quiosques/token', headers=outra_empresa, json={}).get_json()['token']
+    resposta = _bater_ponto(cliente, {'Authorization': f'Bearer {token}'}, empresa_id=empresa_id)
+    assert resposta.status_code != 200
+    assert list(repos.registros.listar_funcionario(ana)) == []
+
+def test_token_de_quiosque_nao_abre_rotas_da_empresa(cliente, quiosque):
+    assert cliente.get('/api/funcionarios', headers=quiosque).status_code == 401
+    assert cliente.post('/api/quiosques/token', headers=quiosque, json={}).status_code == 401
+
+def test_reconhecer_sem_empresa_nao_consulta_nada(repos, cadastrar):
+    ana = cadastrar('Ana')
+    empresa_id = repos.funcionarios.obter(ana)['empresa_id']
+    assert repos.faces.reconhecer(b'Ana', empresa_id) == ana
+    assert repos.faces.reconhecer(b'Ana', None) is None
+
+def test_quiosque_sincroniza_lote(repos, cliente, quiosque, cadastrar):
+    ana = cadastrar('Ana')
+    pontos = '[{"chave": "k1", "data_hora": "%s 08:00:00", "foto": "f1"}]' % _ontem()
+    resposta = cliente.post('/api/registrar_ponto/lote', headers=quiosque,
+                            data={'pontos': pontos, 'f1': (io.BytesIO(b'Ana'), 'f1.jpg')})
+    assert resposta.get_json()['registrados'] == 1
+    assert len(list(repos.registros.listar_funcionario(ana))) == 1
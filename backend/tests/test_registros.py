@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+from regras_ponto import estado_do_registro
+from repositorios import ConflitoPonto
+
+def _registro(registro_id, data_hora, tipo='entrada', funcionario_id='ana'):
+    return {
+        'registro_id': registro_id, 'funcionario_id': funcionario_id, 'data_hora': data_hora,
+        'tipo': tipo, 'empresa_id': 'e1', 'empresa_nome': 'Empresa'
+    }
+
+def test_registrar_com_estado_aceita_o_estado_lido(repos):
+    primeiro = _registro('r1', '2026-01-05 08:00:00')
+    repos.registros.registrar_com_estado(primeiro, repos.registros.obter_estado('ana'))
+    repos.registros.registrar_com_estado(
+        _registro('r2', '2026-01-05 12:00:00', 'saída'), repos.registros.obter_estado('ana')
+    )
+    assert repos.registros.obter_estado('ana')['ultimo_registro_id'] == 'r2'
+    assert [r['tipo'] for r in repos.registros.listar_funcionario('ana')] == ['entrada', 'saída']
+
+def test_registrar_com_estado_recusa_estado_desatualizado(repos):
+    lido = repos.registros.obter_estado('ana')
+    repos.registros.registrar_com_estado(_registro('r1', '2026-01-05 08:00:00'), lido)
+    # Outra requisição leu o mesmo estado (nenhum ponto) antes desta gravação
+    with pytest.raises(ConflitoPonto):
+        repos.registros.registrar_com_estado(_registro('r2', '2026-01-05 08:00:01'), lido)
+    assert [r['registro_id'] for r in repos.registros.listar_funcionario('ana')] == ['r1']
+
+def test_registrar_com_estado_recusa_horario_repetido(repos):
+    primeiro = _registro('r1', '2026-01-05 08:00:00')
+    repos.registros.registrar_com_estado(primeiro, None)
+    with pytest.raises(ConflitoPonto):
+        repos.registros.registrar_com_estado(
+            _registro('r2', '2026-01-05 08:00:00', 'saída'), estado_do_registro(primeiro)
+        )
+
+def test_rota_tenta_de_novo_apos_conflito(repos, cliente, quiosque, cadastrar, monkeypatch):
+    ana = cadastrar('Ana')
+    original = repos.registros.registrar_com_estado
+    tentativas = []
+
+    def conflito_na_primeira(registro, estado):
+        tentativas.append(registro['registro_id'])
+        if len(tentativas) == 1:
+            raise ConflitoPonto(registro['funcionario_id'])
+        original(registro, estado)
+
+    monkeypatch.setattr(repos.registros, 'registrar_com_estado', conflito_na_primeira)
+    resposta = cliente.post('/api/registrar_ponto', data={'foto': (io.BytesIO(b'Ana'), 'foto.jpg')},
+                           headers=quiosque)
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()['tipo'] == 'entrada'
+    assert len(tentativas) == 2
+    assert len(list(repos.registros.listar_funcionario(ana))) == 1
+
+def test_rota_desiste_com_409_se_o_conflito_persiste(repos, cliente, quiosque, cadastrar, monkeypatch):
+    ana = cadastrar('Ana')
+
+    def sempre_conflito(registro, estado):
+        raise ConflitoPonto(registro['funcionario_id'])
+
+    monkeypatch.setattr(repos.registros, 'registrar_com_estado', sempre_conflito)
+    resposta = cliente.post('/api/registrar_ponto', data={'foto': (io.BytesIO(b'Ana'), 'foto.jpg')},
+                           headers=quiosque)
+    assert resposta.status_code == 409
+    assert list(repos.registros.listar_funcionario(ana)) == []
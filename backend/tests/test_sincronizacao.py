@@ -0,0 +1,74 @@
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+# Dentro dos DIAS_MAXIMOS aceitos e sem cair no futuro qualquer que seja a hora do teste
+DIA = (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d')
+
+def _enviar(cliente, autorizacao, pontos, fotos):
+    dados = {'pontos': json.dumps(pontos)}
+    for campo, conteudo in fotos.items():
+        dados[campo] = (io.BytesIO(conteudo), f'{campo}.jpg')
+    return cliente.post('/api/registrar_ponto/lote', data=dados, headers=autorizacao)
+
+def test_reenviar_o_lote_nao_duplica(repos, cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    pontos = [
+        {'chave': 'k1', 'data_hora': f'{DIA} 08:00:00', 'foto': 'f1'},
+        {'chave': 'k2', 'data_hora': f'{DIA} 12:00:00', 'foto': 'f2'}
+    ]
+    fotos = {'f1': b'Ana', 'f2': b'Ana'}
+    primeira = _enviar(cliente, autorizacao, pontos, fotos).get_json()
+    assert primeira['registrados'] == 2
+    assert [ponto['tipo'] for ponto in primeira['pontos']] == ['entrada', 'saída']
+
+    segunda = _enviar(cliente, autorizacao, pontos, fotos).get_json()
+    assert segunda['registrados'] == 0 and segunda['duplicados'] == 2
+    assert [ponto['registro_id'] for ponto in segunda['pontos']] == [ponto['registro_id'] for ponto in primeira['pontos']]
+    assert len(list(repos.registros.listar_funcionario(ana))) == 2
+
+def test_chave_repetida_no_lote(repos, cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    ponto = {'chave': 'k1', 'data_hora': f'{DIA} 08:00:00', 'foto': 'f1'}
+    corpo = _enviar(cliente, autorizacao, [ponto, ponto], {'f1': b'Ana'}).get_json()
+    assert [resultado['status'] for resultado in corpo['pontos']] == ['registrado', 'erro']
+    assert len(list(repos.registros.listar_funcionario(ana))) == 1
+
+def test_ponto_retroativo_refaz_os_tipos_seguintes(repos, cliente, autorizacao, cadastrar):
+    ana = cadastrar('Ana')
+    for hora, tipo in (('08:00', 'entrada'), ('12:00', 'saída'), ('13:00', 'entrada')):
+        cliente.post('/api/registrar_ponto_manual', headers=autorizacao, json={
+            'funcionario_id': ana, 'data_hora': f'{DIA} {hora}:00', 'tipo': tipo
+        })
+    corpo = _enviar(cliente, autorizacao, [{'chave': 'k1', 'data_hora': f'{DIA} 10:00:00', 'foto': 'f1'}],
+                    {'f1': b'Ana'}).get_json()
+    assert corpo['pontos'][0]['tipo'] == 'saída'
+    tipos = [(registro['data_hora'][11:16], registro['tipo']) for registro in repos.registros.listar_funcionario(ana)]
+    assert tipos == [('08:00', 'entrada'), ('10:00', 'saída'), ('12:00', 'entrada'), ('13:00', 'saída')]
+    assert repos.registros.obter_estado(ana)['ultimo_tipo'] == 'saída'
+
+def test_sem_token_nao_sincroniza(repos, cliente, cadastrar):
+    cadastrar('Ana')
+    resposta = _enviar(cliente, {}, [{'chave': 'k1', 'data_hora': f'{DIA} 08:00:00', 'foto': 'f1'}], {'f1': b'Ana'})
+    assert resposta.status_code == 401
+
+def test_ponto_nao_reconhecido_no_prazo_sai_como_erro(repos, cadastrar, monkeypatch):
+    from app import app
+    from paralelo import CHAVE_PRAZO
+    from sincronizacao_pontos import sincronizar
+
+    ana = cadastrar('Ana')
+    empresa_id = repos.funcionarios.obter(ana)['empresa_id']
+    reconhecer = repos.faces.reconhecer
+
+    def devagar(imagem, empresa_id=None):
+        time.sleep(0.2)
+        return reconhecer(imagem, empresa_id)
+
+    monkeypatch.setattr(repos.faces, 'reconhecer', devagar)
+    pontos = [{'chave': 'k1', 'data_hora': f'{DIA} 08:00:00', 'imagem': b'Ana'}]
+    with app.test_request_context(environ_base={CHAVE_PRAZO: time.monotonic() + 0.05}):
+        [resultado] = sincronizar(repos, pontos, empresa_id)
+    assert resultado['status'] == 'erro' and 'Tempo limite' in resultado['erro']
+    assert list(repos.registros.listar_funcionario(ana)) == []
@@ -209,6 +209,14 @@ function ConsultarRegistros() {
           <Autocomplete
             freeSolo
             options={opcoesNomes}
+            getOptionLabel={(opcao) => (typeof opcao === 'string' ? opcao : opcao.nome)}
+            // A API já filtra sem acentos/maiúsculas e ordena; não filtrar de novo aqui
+            filterOptions={(opcoes) => opcoes}
+            renderOption={(props, opcao) => (
+              <li {...props} key={opcao.id}>
+                {opcao.nome}
+              </li>
+            )}
             onInputChange={(event, value) => {
               setNome(value);
               if (value.length > 0) {
@@ -2,7 +2,7 @@ import React, { useEffect, useRef, useState } from 'react';
 import { View, StyleSheet, Modal, Image, Pressable, Animated } from 'react-native';
 import { CameraView, useCameraPermissions, CameraCapturedPicture } from 'expo-camera';
 import { Text, Card, ActivityIndicator } from 'react-native-paper';
-import axios from 'axios';
+import api, { QUIOSQUE_TOKEN } from '../services/api';
 import { Audio } from 'expo-av';
 
 export default function RegistroPonto() {
@@ -40,6 +40,13 @@ export default function RegistroPonto() {
 
   const capturarERegistrar = async () => {
     if (!cameraRef.current || isProcessing) return;
+    if (!QUIOSQUE_TOKEN) {
+      // Sem o token o servidor não sabe de que empresa é o quiosque
+      setMessage('⚙️ Quiosque não configurado (EXPO_PUBLIC_QUIOSQUE_TOKEN).');
+      setModalVisible(true);
+      setTimeout(() => setModalVisible(false), 5000);
+      return;
+    }
 
     setIsProcessing(true);
     playFlash();
@@ -59,7 +66,7 @@ export default function RegistroPonto() {
         type,
       } as any);
 
-      const response = await axios.post('http://192.168.1.105:5000/registrar_ponto', formData, {
+      const response = await api.post('/api/registrar_ponto', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
         timeout: 10000,
       });
@@ -78,6 +85,10 @@ export default function RegistroPonto() {
     } catch (error: any) {
       if (error.code === 'ECONNABORTED') {
         setMessage('⏳ Tempo de conexão esgotado.');
+      } else if (error.response?.status === 401 || error.response?.status === 403) {
+        setMessage('🔒 Token do quiosque inválido ou expirado.');
+      } else if (error.response?.data?.message) {
+        setMessage(error.response.data.message);
       } else {
         setMessage('❌ Erro na conexão.');
       }
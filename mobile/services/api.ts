@@ -1,7 +1,12 @@
 import axios from 'axios';
 
+// Definidos no build (.env ou eas.json): EXPO_PUBLIC_API_URL e o token do quiosque,
+// emitido por POST /api/quiosques/token com o login da empresa
+export const QUIOSQUE_TOKEN = process.env.EXPO_PUBLIC_QUIOSQUE_TOKEN;
+
 const api = axios.create({
-  baseURL: 'http://192.168.1.105:5000', // 👉 Seu IP na rede
+  baseURL: process.env.EXPO_PUBLIC_API_URL || 'http://192.168.1.105:5000', // 👉 Seu IP na rede
+  headers: QUIOSQUE_TOKEN ? { Authorization: `Bearer ${QUIOSQUE_TOKEN}` } : {},
 });
 
-export default api;
\ No newline at end of file
+export default api;